@@ -294,6 +294,11 @@ struct xi_session {
     PyThreadState *init_tstate;
     // This is true if init_tstate needs cleanup during exit.
     int own_init_tstate;
+    // The caller may set this before entering the session, to a tstate
+    // bound to the target interpreter and to the current OS thread.
+    // If switching interpreters, it is used instead of a new tstate,
+    // and the caller remains responsible for cleaning it up.
+    PyThreadState *given_tstate;
 
     // This is true if, while entering the session, init_thread took
     // "ownership" of the interpreter's __main__ module.  This means
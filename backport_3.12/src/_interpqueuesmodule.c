@@ -7,6 +7,11 @@
 
 #include "Python.h"
 #include "pycore_crossinterp.h"   // _PyXIData_t
+#include "pycore_time.h"          // _PyDeadline_Init()
+
+#ifdef MS_WINDOWS
+#  include <io.h>                 // _write()
+#endif
 
 #define REGISTERS_HEAP_TYPES
 #define HAS_UNBOUND_ITEMS
@@ -153,6 +158,10 @@ typedef struct {
     /* external types (added at runtime by interpreters module) */
     PyTypeObject *queue_type;
 
+    /* heap types */
+    PyTypeObject *QueueStatsType;
+    PyTypeObject *BytesViewType;
+
     /* QueueError (and its subclasses) */
     PyObject *QueueError;
     PyObject *QueueNotFoundError;
@@ -175,6 +184,10 @@ traverse_module_state(module_state *state, visitproc visit, void *arg)
     /* external types */
     Py_VISIT(state->queue_type);
 
+    /* heap types */
+    Py_VISIT(state->QueueStatsType);
+    Py_VISIT(state->BytesViewType);
+
     /* QueueError */
     Py_VISIT(state->QueueError);
     Py_VISIT(state->QueueNotFoundError);
@@ -193,6 +206,10 @@ clear_module_state(module_state *state)
     }
     Py_CLEAR(state->queue_type);
 
+    /* heap types */
+    Py_CLEAR(state->QueueStatsType);
+    Py_CLEAR(state->BytesViewType);
+
     /* QueueError */
     Py_CLEAR(state->QueueError);
     Py_CLEAR(state->QueueNotFoundError);
@@ -215,6 +232,7 @@ clear_module_state(module_state *state)
 #define ERR_QUEUE_EMPTY (-21)
 #define ERR_QUEUE_FULL (-22)
 #define ERR_QUEUE_NEVER_BOUND (-23)
+#define ERR_QUEUE_NOT_ORDERED (-24)
 
 static int ensure_external_exc_types(module_state *);
 
@@ -251,6 +269,11 @@ resolve_module_errcode(module_state *state, int errcode, int64_t qid,
         exctype = state->QueueError;
         msg = PyUnicode_FromFormat("queue %" PRId64 " never bound", qid);
         break;
+    case ERR_QUEUE_NOT_ORDERED:
+        exctype = state->QueueError;
+        msg = PyUnicode_FromFormat(
+                "queue %" PRId64 " is not ordered by priority", qid);
+        break;
     default:
         PyErr_Format(PyExc_ValueError,
                      "unsupported error code %d", errcode);
@@ -390,9 +413,142 @@ handle_queue_error(int err, PyObject *mod, int64_t qid)
 }
 
 
+/* zero-copy bytes **********************************************************/
+
+/* A bytes view keeps the cross-interpreter data for a bytes object
+   alive, so the receiver can use a read-only memoryview of the
+   original object rather than a copy.  The data (and thus the
+   object) is released once the view is.
+
+   Nothing can keep the object alive past its own interpreter, though,
+   and a view may be held onto for arbitrarily long.  So views are only
+   used for bytes put by the receiving interpreter itself.  For any
+   other interpreter the bytes are copied and the copy is wrapped in
+   a memoryview instead, so callers see the same type either way. */
+
+typedef struct {
+    PyObject_HEAD
+    _PyXIData_t *data;
+} bytesviewobject;
+
+static int
+_is_shared_bytes(_PyXIData_t *data)
+{
+    PyObject *obj = _PyXIData_OBJ(data);
+    // bytes is a static type, so this check works for any interpreter.
+    return obj != NULL && PyBytes_CheckExact(obj);
+}
+
+// This takes ownership of the data, even on failure.
+static PyObject *
+new_bytes_view(PyTypeObject *cls, _PyXIData_t *data)
+{
+    assert(_is_shared_bytes(data));
+    bytesviewobject *self = PyObject_New(bytesviewobject, cls);
+    if (self == NULL) {
+        (void)_release_xid_data(data, XID_IGNORE_EXC | XID_FREE);
+        return NULL;
+    }
+    self->data = data;
+    PyObject *view = PyMemoryView_FromObject((PyObject *)self);
+    Py_DECREF(self);
+    return view;
+}
+
+static void
+bytesview_dealloc(bytesviewobject *self)
+{
+    PyTypeObject *tp = Py_TYPE(self);
+    // It was allocated in queue_put(), so we free it.
+    (void)_release_xid_data(self->data, XID_IGNORE_EXC | XID_FREE);
+    tp->tp_free(self);
+    Py_DECREF(tp);
+}
+
+static int
+bytesview_getbuf(bytesviewobject *self, Py_buffer *view, int flags)
+{
+    // The object is immutable and we hold a reference to it
+    // (via the data), so it is safe to use from this interpreter.
+    PyObject *obj = _PyXIData_OBJ(self->data);
+    return PyBuffer_FillInfo(view, (PyObject *)self,
+                             PyBytes_AS_STRING(obj), PyBytes_GET_SIZE(obj),
+                             1, flags);
+}
+
+static PyType_Slot BytesViewType_slots[] = {
+    {Py_tp_dealloc, (destructor)bytesview_dealloc},
+    {Py_bf_getbuffer, (getbufferproc)bytesview_getbuf},
+    {0, NULL},
+};
+
+static PyType_Spec BytesViewType_spec = {
+    .name = MODULE_NAME_STR ".CrossInterpreterBytesView",
+    .basicsize = sizeof(bytesviewobject),
+    .flags = (Py_TPFLAGS_DEFAULT | Py_TPFLAGS_DISALLOW_INSTANTIATION |
+              Py_TPFLAGS_IMMUTABLETYPE),
+    .slots = BytesViewType_slots,
+};
+
+// Convert the data back to an object and free the data.  If there is
+// a view type then bytes are returned as a memoryview.  Bytes put by
+// the current interpreter are wrapped instead of being copied, and the
+// data is freed once the view is released.
+static PyObject *
+_new_object_from_xid(_PyXIData_t *data, PyTypeObject *viewtype)
+{
+    int asview = viewtype != NULL && _is_shared_bytes(data);
+    if (asview && _PyXIData_INTERPID(data)
+                    == PyInterpreterState_GetID(PyInterpreterState_Get()))
+    {
+        return new_bytes_view(viewtype, data);
+    }
+    PyObject *obj = _PyXIData_NewObject(data);
+    if (obj == NULL) {
+        assert(PyErr_Occurred());
+        // It was allocated in queue_put(), so we free it.
+        (void)_release_xid_data(data, XID_IGNORE_EXC | XID_FREE);
+        return NULL;
+    }
+    // It was allocated in queue_put(), so we free it.
+    if (_release_xid_data(data, XID_FREE) < 0) {
+        // The source interpreter has been destroyed already.
+        assert(PyErr_Occurred());
+        Py_DECREF(obj);
+        return NULL;
+    }
+    if (asview) {
+        Py_SETREF(obj, PyMemoryView_FromObject(obj));
+    }
+    return obj;
+}
+
+
 /* the basic queue **********************************************************/
 
-struct _queueitem;
+/* Items in a priority queue are ordered by priority (lowest first),
+   then by deadline (earliest first), then by when they were added.
+   FIFO queues ignore the key. */
+
+typedef struct _queueitemkey {
+    int64_t priority;
+    PyTime_t deadline;
+    uint64_t seq;
+} _queueitemkey;
+
+#define QUEUE_NO_DEADLINE PyTime_MAX
+
+static inline int
+_queueitemkey_lt(const _queueitemkey *a, const _queueitemkey *b)
+{
+    if (a->priority != b->priority) {
+        return a->priority < b->priority;
+    }
+    if (a->deadline != b->deadline) {
+        return a->deadline < b->deadline;
+    }
+    return a->seq < b->seq;
+}
 
 typedef struct _queueitem {
     /* The interpreter that added the item to the queue.
@@ -403,12 +559,13 @@ typedef struct _queueitem {
     _PyXIData_t *data;
     int fmt;
     int unboundop;
-    struct _queueitem *next;
+    _queueitemkey key;
 } _queueitem;
 
 static void
 _queueitem_init(_queueitem *item,
-                int64_t interpid, _PyXIData_t *data, int fmt, int unboundop)
+                int64_t interpid, _PyXIData_t *data, int fmt, int unboundop,
+                const _queueitemkey *key)
 {
     if (interpid < 0) {
         interpid = _get_interpid(data);
@@ -424,6 +581,7 @@ _queueitem_init(_queueitem *item,
         .data = data,
         .fmt = fmt,
         .unboundop = unboundop,
+        .key = *key,
     };
 }
 
@@ -434,46 +592,16 @@ _queueitem_clear_data(_queueitem *item)
         return;
     }
     // It was allocated in queue_put().
-    (void)_release_xid_data(item->data, XID_IGNORE_EXC & XID_FREE);
+    (void)_release_xid_data(item->data, XID_IGNORE_EXC | XID_FREE);
     item->data = NULL;
 }
 
 static void
 _queueitem_clear(_queueitem *item)
 {
-    item->next = NULL;
     _queueitem_clear_data(item);
 }
 
-static _queueitem *
-_queueitem_new(int64_t interpid, _PyXIData_t *data, int fmt, int unboundop)
-{
-    _queueitem *item = GLOBAL_MALLOC(_queueitem);
-    if (item == NULL) {
-        PyErr_NoMemory();
-        return NULL;
-    }
-    _queueitem_init(item, interpid, data, fmt, unboundop);
-    return item;
-}
-
-static void
-_queueitem_free(_queueitem *item)
-{
-    _queueitem_clear(item);
-    GLOBAL_FREE(item);
-}
-
-static void
-_queueitem_free_all(_queueitem *item)
-{
-    while (item != NULL) {
-        _queueitem *last = item;
-        item = item->next;
-        _queueitem_free(last);
-    }
-}
-
 static void
 _queueitem_popped(_queueitem *item,
                   _PyXIData_t **p_data, int *p_fmt, int *p_unboundop)
@@ -483,7 +611,7 @@ _queueitem_popped(_queueitem *item,
     *p_unboundop = item->unboundop;
     // We clear them here, so they won't be released in _queueitem_clear().
     item->data = NULL;
-    _queueitem_free(item);
+    _queueitem_clear(item);
 }
 
 static int
@@ -515,230 +643,1228 @@ _queueitem_clear_interpreter(_queueitem *item)
 }
 
 
-/* the queue */
+/* the items in a queue */
 
-typedef struct _queue {
-    Py_ssize_t num_waiters;  // protected by global lock
-    PyThread_type_lock mutex;
-    int alive;
-    struct _queueitems {
-        Py_ssize_t maxsize;
-        Py_ssize_t count;
-        _queueitem *first;
-        _queueitem *last;
-    } items;
-    struct {
-        int fmt;
-        int unboundop;
-    } defaults;
-} _queue;
+/* The items are stored by value in a ring buffer, so adding or removing
+   an item doesn't allocate anything.  Bounded queues (up to a point)
+   get all their slots up front.  Otherwise the buffer is grown (and
+   shrunk) by doubling, as needed.
 
-static int
-_queue_init(_queue *queue, Py_ssize_t maxsize, int fmt, int unboundop)
+   For priority queues the same buffer holds a binary heap instead,
+   always starting at the front of the buffer (i.e. "first" is 0). */
+
+#define QUEUE_MIN_CAPACITY 16
+#define QUEUE_MAX_PREALLOC 1024
+
+typedef struct _queueitems {
+    Py_ssize_t maxsize;
+    int ordered;  // by priority
+    uint64_t nextseq;
+    Py_ssize_t count;
+    Py_ssize_t capacity;
+    Py_ssize_t first;  // the index of the first item in the buffer
+    _queueitem *buffer;
+} _queueitems;
+
+static Py_ssize_t
+_queueitems_min_capacity(_queueitems *items)
 {
-    assert(check_unbound(unboundop));
-    PyThread_type_lock mutex = PyThread_allocate_lock();
-    if (mutex == NULL) {
-        return ERR_QUEUE_ALLOC;
+    if (items->maxsize > 0) {
+        return Py_MIN(items->maxsize, QUEUE_MAX_PREALLOC);
     }
-    *queue = (_queue){
-        .mutex = mutex,
-        .alive = 1,
-        .items = {
-            .maxsize = maxsize,
-        },
-        .defaults = {
-            .fmt = fmt,
-            .unboundop = unboundop,
-        },
+    return QUEUE_MIN_CAPACITY;
+}
+
+static int
+_queueitems_init(_queueitems *items, Py_ssize_t maxsize, int ordered)
+{
+    *items = (_queueitems){
+        .maxsize = maxsize,
+        .ordered = ordered,
     };
+    Py_ssize_t capacity = _queueitems_min_capacity(items);
+    _queueitem *buffer = PyMem_RawMalloc(sizeof(_queueitem) * capacity);
+    if (buffer == NULL) {
+        return -1;
+    }
+    items->capacity = capacity;
+    items->buffer = buffer;
     return 0;
 }
 
-static void
-_queue_clear(_queue *queue)
+static inline _queueitem *
+_queueitems_get(_queueitems *items, Py_ssize_t index)
 {
-    assert(!queue->alive);
-    assert(queue->num_waiters == 0);
-    _queueitem_free_all(queue->items.first);
-    assert(queue->mutex != NULL);
-    PyThread_free_lock(queue->mutex);
-    *queue = (_queue){0};
+    assert(index >= 0 && index < items->count);
+    return &items->buffer[(items->first + index) % items->capacity];
 }
 
-static void _queue_free(_queue *);
-
 static void
-_queue_kill_and_wait(_queue *queue)
+_queueitems_clear(_queueitems *items)
 {
-    // Mark it as dead.
-    PyThread_acquire_lock(queue->mutex, WAIT_LOCK);
-    assert(queue->alive);
-    queue->alive = 0;
-    PyThread_release_lock(queue->mutex);
+    for (Py_ssize_t i = 0; i < items->count; i++) {
+        _queueitem_clear(_queueitems_get(items, i));
+    }
+    PyMem_RawFree(items->buffer);
+    *items = (_queueitems){0};
+}
 
-    // Wait for all waiters to fail.
-    while (queue->num_waiters > 0) {
-        PyThread_acquire_lock(queue->mutex, WAIT_LOCK);
-        PyThread_release_lock(queue->mutex);
-    };
+static int
+_queueitems_resize(_queueitems *items, Py_ssize_t capacity)
+{
+    assert(capacity >= items->count);
+    _queueitem *buffer = PyMem_RawMalloc(sizeof(_queueitem) * capacity);
+    if (buffer == NULL) {
+        return -1;
+    }
+    // Copy the items over in order, starting at the front of the buffer.
+    Py_ssize_t tail = Py_MIN(items->count, items->capacity - items->first);
+    memcpy(buffer, &items->buffer[items->first], sizeof(_queueitem) * tail);
+    memcpy(&buffer[tail], items->buffer,
+           sizeof(_queueitem) * (items->count - tail));
+    PyMem_RawFree(items->buffer);
+    items->buffer = buffer;
+    items->capacity = capacity;
+    items->first = 0;
+    return 0;
 }
 
-static void
-_queue_mark_waiter(_queue *queue, PyThread_type_lock parent_mutex)
+static int
+_queueitems_ensure_slot(_queueitems *items)
 {
-    if (parent_mutex != NULL) {
-        PyThread_acquire_lock(parent_mutex, WAIT_LOCK);
-        queue->num_waiters += 1;
-        PyThread_release_lock(parent_mutex);
+    if (items->count < items->capacity) {
+        return 0;
     }
-    else {
-        // The caller must be holding the parent lock already.
-        queue->num_waiters += 1;
+    Py_ssize_t capacity = items->capacity * 2;
+    if (items->maxsize > 0 && capacity > items->maxsize) {
+        // The count can exceed maxsize; see _queue_unpop_items().
+        capacity = Py_MAX(items->maxsize, items->count + 1);
+    }
+    if (_queueitems_resize(items, capacity) < 0) {
+        PyErr_NoMemory();
+        return -1;
     }
+    return 0;
 }
 
 static void
-_queue_unmark_waiter(_queue *queue, PyThread_type_lock parent_mutex)
+_queueitems_maybe_shrink(_queueitems *items)
 {
-    if (parent_mutex != NULL) {
-        PyThread_acquire_lock(parent_mutex, WAIT_LOCK);
-        queue->num_waiters -= 1;
-        PyThread_release_lock(parent_mutex);
-    }
-    else {
-        // The caller must be holding the parent lock already.
-        queue->num_waiters -= 1;
+    Py_ssize_t capacity = items->capacity / 2;
+    if (items->count > capacity / 2
+            || capacity < _queueitems_min_capacity(items))
+    {
+        return;
     }
+    // If it fails then we simply keep the bigger buffer.
+    (void)_queueitems_resize(items, capacity);
 }
 
-static int
-_queue_lock(_queue *queue)
+static void
+_queueitems_sift_up(_queueitems *items, Py_ssize_t index)
 {
-    // The queue must be marked as a waiter already.
-    PyThread_acquire_lock(queue->mutex, WAIT_LOCK);
-    if (!queue->alive) {
-        PyThread_release_lock(queue->mutex);
-        return ERR_QUEUE_NOT_FOUND;
+    assert(items->ordered && items->first == 0);
+    _queueitem item = items->buffer[index];
+    while (index > 0) {
+        Py_ssize_t parent = (index - 1) / 2;
+        if (!_queueitemkey_lt(&item.key, &items->buffer[parent].key)) {
+            break;
+        }
+        items->buffer[index] = items->buffer[parent];
+        index = parent;
     }
-    return 0;
+    items->buffer[index] = item;
 }
 
 static void
-_queue_unlock(_queue *queue)
+_queueitems_sift_down(_queueitems *items, Py_ssize_t index)
 {
-    PyThread_release_lock(queue->mutex);
+    assert(items->ordered && items->first == 0);
+    _queueitem item = items->buffer[index];
+    while (1) {
+        Py_ssize_t child = 2 * index + 1;
+        if (child >= items->count) {
+            break;
+        }
+        if (child + 1 < items->count
+            && _queueitemkey_lt(&items->buffer[child + 1].key,
+                                &items->buffer[child].key))
+        {
+            child += 1;
+        }
+        if (!_queueitemkey_lt(&items->buffer[child].key, &item.key)) {
+            break;
+        }
+        items->buffer[index] = items->buffer[child];
+        index = child;
+    }
+    items->buffer[index] = item;
 }
 
+// Add an item to the end (or in order of its key, if any).
 static int
-_queue_add(_queue *queue, int64_t interpid, _PyXIData_t *data,
-           int fmt, int unboundop)
+_queueitems_push(_queueitems *items,
+                 int64_t interpid, _PyXIData_t *data, int fmt, int unboundop,
+                 const _queueitemkey *key)
 {
-    int err = _queue_lock(queue);
-    if (err < 0) {
-        return err;
-    }
-
-    Py_ssize_t maxsize = queue->items.maxsize;
-    if (maxsize <= 0) {
-        maxsize = PY_SSIZE_T_MAX;
+    if (_queueitems_ensure_slot(items) < 0) {
+        return -1;
     }
-    if (queue->items.count >= maxsize) {
-        _queue_unlock(queue);
-        return ERR_QUEUE_FULL;
+    items->count += 1;
+    _queueitem *item = _queueitems_get(items, items->count - 1);
+    if (!items->ordered) {
+        _queueitem_init(item, interpid, data, fmt, unboundop,
+                        &(_queueitemkey){0});
+        return 0;
     }
+    _queueitemkey seqkey = key != NULL
+        ? *key
+        : (_queueitemkey){.deadline = QUEUE_NO_DEADLINE};
+    seqkey.seq = items->nextseq;
+    items->nextseq += 1;
+    _queueitem_init(item, interpid, data, fmt, unboundop, &seqkey);
+    _queueitems_sift_up(items, items->count - 1);
+    return 0;
+}
 
-    _queueitem *item = _queueitem_new(interpid, data, fmt, unboundop);
-    if (item == NULL) {
-        _queue_unlock(queue);
+// Add an item back to the front (or in order of its original key).
+static int
+_queueitems_push_front(_queueitems *items,
+                       int64_t interpid, _PyXIData_t *data,
+                       int fmt, int unboundop, const _queueitemkey *key)
+{
+    if (_queueitems_ensure_slot(items) < 0) {
         return -1;
     }
-
-    queue->items.count += 1;
-    if (queue->items.first == NULL) {
-        queue->items.first = item;
-    }
-    else {
-        queue->items.last->next = item;
+    if (items->ordered) {
+        items->count += 1;
+        _queueitem *item = _queueitems_get(items, items->count - 1);
+        _queueitem_init(item, interpid, data, fmt, unboundop, key);
+        _queueitems_sift_up(items, items->count - 1);
+        return 0;
     }
-    queue->items.last = item;
-
-    _queue_unlock(queue);
+    items->first = (items->first + items->capacity - 1) % items->capacity;
+    items->count += 1;
+    _queueitem *item = _queueitems_get(items, 0);
+    _queueitem_init(item, interpid, data, fmt, unboundop, key);
     return 0;
 }
 
-static int
-_queue_next(_queue *queue,
-            _PyXIData_t **p_data, int *p_fmt, int *p_unboundop)
+// Clear (or remove) the items added by the given interpreter.
+// The remaining items are compacted in place, keeping their order.
+static Py_ssize_t
+_queueitems_clear_interpreter(_queueitems *items, int64_t interpid)
 {
-    int err = _queue_lock(queue);
-    if (err < 0) {
-        return err;
+    Py_ssize_t kept = 0;
+    for (Py_ssize_t i = 0; i < items->count; i++) {
+        _queueitem *item = _queueitems_get(items, i);
+        int remove = (item->interpid == interpid)
+            ? _queueitem_clear_interpreter(item)
+            : 0;
+        if (remove) {
+            _queueitem_clear(item);
+            continue;
+        }
+        if (kept < i) {
+            *_queueitems_get(items, kept) = *item;
+        }
+        kept += 1;
     }
-
-    assert(queue->items.count >= 0);
-    _queueitem *item = queue->items.first;
-    if (item == NULL) {
-        _queue_unlock(queue);
-        return ERR_QUEUE_EMPTY;
+    Py_ssize_t removed = items->count - kept;
+    items->count = kept;
+    if (kept == 0) {
+        items->first = 0;
     }
-    queue->items.first = item->next;
-    if (queue->items.last == item) {
-        queue->items.last = NULL;
+    if (items->ordered && removed > 0) {
+        // Restore the heap.
+        for (Py_ssize_t i = kept / 2 - 1; i >= 0; i--) {
+            _queueitems_sift_down(items, i);
+        }
     }
-    queue->items.count -= 1;
+    return removed;
+}
 
+// Remove the first item.
+static void
+_queueitems_pop(_queueitems *items, int64_t *p_interpid,
+                _PyXIData_t **p_data, int *p_fmt, int *p_unboundop,
+                _queueitemkey *p_key)
+{
+    assert(items->count > 0);
+    _queueitem *item = _queueitems_get(items, 0);
+    *p_interpid = item->interpid;
+    *p_key = item->key;
     _queueitem_popped(item, p_data, p_fmt, p_unboundop);
-
-    _queue_unlock(queue);
-    return 0;
+    items->count -= 1;
+    if (items->ordered) {
+        if (items->count > 0) {
+            items->buffer[0] = items->buffer[items->count];
+            _queueitems_sift_down(items, 0);
+        }
+    }
+    else {
+        items->first = (items->first + 1) % items->capacity;
+        if (items->count == 0) {
+            items->first = 0;
+        }
+    }
+    _queueitems_maybe_shrink(items);
 }
 
-static int
-_queue_get_maxsize(_queue *queue, Py_ssize_t *p_maxsize)
-{
-    int err = _queue_lock(queue);
-    if (err < 0) {
-        return err;
-    }
 
-    *p_maxsize = queue->items.maxsize;
+/* blocked threads */
 
-    _queue_unlock(queue);
-    return 0;
-}
+/* A waiter represents a thread blocked in put() or get().  Its lock
+   is held until another thread notifies it (while holding the queue's
+   lock), at which point it wakes up and tries again. */
+
+typedef struct _queuewaiter {
+    PyThread_type_lock mutex;
+    int notified;
+    struct _queuewaiter *next;
+} _queuewaiter;
 
 static int
-_queue_is_full(_queue *queue, int *p_is_full)
+_queuewaiter_init(_queuewaiter *waiter)
 {
-    int err = _queue_lock(queue);
-    if (err < 0) {
-        return err;
+    PyThread_type_lock mutex = PyThread_allocate_lock();
+    if (mutex == NULL) {
+        PyErr_NoMemory();
+        return -1;
     }
-
-    assert(queue->items.count <= queue->items.maxsize);
-    *p_is_full = queue->items.count == queue->items.maxsize;
-
-    _queue_unlock(queue);
+    // It stays locked until the waiter is notified.
+    PyThread_acquire_lock(mutex, NOWAIT_LOCK);
+    *waiter = (_queuewaiter){
+        .mutex = mutex,
+    };
     return 0;
 }
 
-static int
-_queue_get_count(_queue *queue, Py_ssize_t *p_count)
+static void
+_queuewaiter_clear(_queuewaiter *waiter)
 {
-    int err = _queue_lock(queue);
-    if (err < 0) {
-        return err;
+    assert(waiter->next == NULL);
+    if (waiter->mutex != NULL) {
+        PyThread_free_lock(waiter->mutex);
+        waiter->mutex = NULL;
     }
-
-    *p_count = queue->items.count;
-
-    _queue_unlock(queue);
-    return 0;
 }
 
-static void
-_queue_clear_interpreter(_queue *queue, int64_t interpid)
+// Returns 0 if notified, 1 if timed out, and -1 if interrupted.
+static int
+_queuewaiter_wait(_queuewaiter *waiter, PY_TIMEOUT_T timeout)
+{
+    // The GIL is released while blocked.
+    PyLockStatus res = PyThread_acquire_lock_timed_with_retries(
+                                                    waiter->mutex, timeout);
+    if (res == PY_LOCK_INTR) {
+        /* KeyboardInterrupt, etc. */
+        assert(PyErr_Occurred());
+        return -1;
+    }
+    else if (res == PY_LOCK_FAILURE) {
+        assert(!PyErr_Occurred());
+        assert(timeout > 0);
+        return 1;
+    }
+    assert(res == PY_LOCK_ACQUIRED);
+    return 0;
+}
+
+typedef struct _queuewaiters {
+    _queuewaiter *first;
+    _queuewaiter *last;
+} _queuewaiters;
+
+static void
+_queuewaiters_add(_queuewaiters *waiters, _queuewaiter *waiter)
+{
+    // The caller must be holding the queue's lock.
+    assert(waiter->next == NULL);
+    if (waiters->first == NULL) {
+        waiters->first = waiter;
+    }
+    else {
+        waiters->last->next = waiter;
+    }
+    waiters->last = waiter;
+}
+
+static void
+_queuewaiters_remove(_queuewaiters *waiters, _queuewaiter *waiter)
+{
+    // The caller must be holding the queue's lock.
+    _queuewaiter *prev = NULL;
+    _queuewaiter *cur = waiters->first;
+    while (cur != NULL && cur != waiter) {
+        prev = cur;
+        cur = cur->next;
+    }
+    if (cur == NULL) {
+        // It was already notified.
+        return;
+    }
+    if (prev == NULL) {
+        waiters->first = waiter->next;
+    }
+    else {
+        prev->next = waiter->next;
+    }
+    if (waiters->last == waiter) {
+        waiters->last = prev;
+    }
+    waiter->next = NULL;
+}
+
+// Wake up to "count" waiters, in the order they started waiting.
+// A negative count means all of them.
+static void
+_queuewaiters_notify(_queuewaiters *waiters, Py_ssize_t count)
+{
+    // The caller must be holding the queue's lock.
+    while (waiters->first != NULL && count != 0) {
+        _queuewaiter *waiter = waiters->first;
+        waiters->first = waiter->next;
+        if (waiters->first == NULL) {
+            waiters->last = NULL;
+        }
+        waiter->next = NULL;
+        waiter->notified = 1;
+        PyThread_release_lock(waiter->mutex);
+        if (count > 0) {
+            count -= 1;
+        }
+    }
+}
+
+
+/* readiness notifications */
+
+/* A selector represents a thread blocked waiting on several queues
+   at once.  Like a waiter, its lock is held until it is signaled,
+   but any number of queues may signal it, concurrently, so only the
+   first one actually releases the lock.  The selecting thread resets
+   it before checking the queues again. */
+
+typedef struct _queueselector {
+    PyThread_type_lock mutex;
+    int signaled;  // atomic
+} _queueselector;
+
+static int
+_queueselector_init(_queueselector *selector)
+{
+    PyThread_type_lock mutex = PyThread_allocate_lock();
+    if (mutex == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    // It stays locked until the selector is signaled.
+    PyThread_acquire_lock(mutex, NOWAIT_LOCK);
+    *selector = (_queueselector){
+        .mutex = mutex,
+    };
+    return 0;
+}
+
+static void
+_queueselector_clear(_queueselector *selector)
+{
+    if (selector->mutex != NULL) {
+        PyThread_free_lock(selector->mutex);
+        selector->mutex = NULL;
+    }
+}
+
+static void
+_queueselector_signal(_queueselector *selector)
+{
+    if (_Py_atomic_exchange_int(&selector->signaled, 1) == 0) {
+        PyThread_release_lock(selector->mutex);
+    }
+}
+
+// Returns 0 if signaled, 1 if timed out, and -1 if interrupted.
+static int
+_queueselector_wait(_queueselector *selector, PY_TIMEOUT_T timeout)
+{
+    // The GIL is released while blocked.
+    PyLockStatus res = PyThread_acquire_lock_timed_with_retries(
+                                                    selector->mutex, timeout);
+    if (res == PY_LOCK_INTR) {
+        /* KeyboardInterrupt, etc. */
+        assert(PyErr_Occurred());
+        return -1;
+    }
+    else if (res == PY_LOCK_FAILURE) {
+        assert(!PyErr_Occurred());
+        assert(timeout > 0);
+        return 1;
+    }
+    assert(res == PY_LOCK_ACQUIRED);
+    // The lock is held again, so it is ready for the next signal.
+    _Py_atomic_store_int(&selector->signaled, 0);
+    return 0;
+}
+
+/* A watcher is either a selector or a file descriptor (e.g. the write
+   end of a pipe) that gets a byte written to it whenever items are
+   added to or removed from the queue.  An fd lets an event loop wait
+   on any number of queues without blocking any threads.  The owner
+   of the fd is responsible for draining it and for making it
+   non-blocking. */
+
+typedef struct _queuewatcher {
+    int64_t interpid;
+    int fd;
+    _queueselector *selector;
+} _queuewatcher;
+
+typedef struct _queuewatchers {
+    _queuewatcher *watchers;
+    Py_ssize_t count;
+    Py_ssize_t size;
+} _queuewatchers;
+
+static void
+_queuewatchers_clear(_queuewatchers *watchers)
+{
+    if (watchers->watchers != NULL) {
+        PyMem_RawFree(watchers->watchers);
+    }
+    *watchers = (_queuewatchers){0};
+}
+
+static int
+_queuewatchers_add(_queuewatchers *watchers, int64_t interpid, int fd,
+                   _queueselector *selector)
+{
+    // The caller must be holding the queue's lock.
+    if (watchers->count == watchers->size) {
+        Py_ssize_t size = watchers->size > 0 ? watchers->size * 2 : 4;
+        _queuewatcher *resized = PyMem_RawRealloc(
+                            watchers->watchers, sizeof(_queuewatcher) * size);
+        if (resized == NULL) {
+            PyErr_NoMemory();
+            return -1;
+        }
+        watchers->watchers = resized;
+        watchers->size = size;
+    }
+    assert((fd < 0) != (selector == NULL));
+    watchers->watchers[watchers->count] = (_queuewatcher){
+        .interpid = interpid,
+        .fd = fd,
+        .selector = selector,
+    };
+    watchers->count += 1;
+    return 0;
+}
+
+// Remove the interpreter's watchers for the given selector or fd,
+// and return how many were removed.  If there is no selector and
+// the fd is negative then all of the interpreter's watchers match.
+static Py_ssize_t
+_queuewatchers_remove(_queuewatchers *watchers, int64_t interpid, int fd,
+                      _queueselector *selector)
+{
+    // The caller must be holding the queue's lock.
+    Py_ssize_t kept = 0;
+    for (Py_ssize_t i = 0; i < watchers->count; i++) {
+        _queuewatcher *watcher = &watchers->watchers[i];
+        int matches = selector != NULL
+            ? watcher->selector == selector
+            : fd < 0 || watcher->fd == fd;
+        if (watcher->interpid == interpid && matches) {
+            continue;
+        }
+        watchers->watchers[kept] = *watcher;
+        kept += 1;
+    }
+    Py_ssize_t removed = watchers->count - kept;
+    watchers->count = kept;
+    return removed;
+}
+
+static void
+_queuewatchers_notify(_queuewatchers *watchers)
+{
+    // The caller must be holding the queue's lock.
+    if (watchers->count == 0) {
+        return;
+    }
+    int saved_errno = errno;
+    for (Py_ssize_t i = 0; i < watchers->count; i++) {
+        _queuewatcher *watcher = &watchers->watchers[i];
+        if (watcher->selector != NULL) {
+            _queueselector_signal(watcher->selector);
+            continue;
+        }
+        // If the fd is already full then the watcher has yet to drain
+        // it, so it will be woken up anyway.  Errors are ignored.
+#ifdef MS_WINDOWS
+        (void)_write(watcher->fd, "", 1);
+#else
+        (void)write(watcher->fd, "", 1);
+#endif
+    }
+    errno = saved_errno;
+}
+
+
+/* queue statistics */
+
+/* The counters are only updated while the queue is locked, alongside
+   changes that are being made anyway, so they cost next to nothing.
+   The clock is only read for calls that actually had to wait. */
+
+// The buckets are <10us, <100us, <1ms, <10ms, <100ms, <1s, <10s, >=10s.
+#define QUEUE_NUM_WAIT_BUCKETS 8
+#define QUEUE_FIRST_WAIT_BOUND (10 * 1000)  // nanoseconds
+
+typedef struct _queuestats {
+    int64_t puts;
+    int64_t gets;
+    int64_t bytes_put;
+    int64_t dropped;
+    Py_ssize_t peak_count;
+    int64_t put_waits[QUEUE_NUM_WAIT_BUCKETS];
+    int64_t get_waits[QUEUE_NUM_WAIT_BUCKETS];
+} _queuestats;
+
+static void
+_queuestats_add_wait(int64_t *histogram, PyTime_t start)
+{
+    PyTime_t now;
+    (void)PyTime_MonotonicRaw(&now);
+    PyTime_t elapsed = now - start;
+    PyTime_t bound = QUEUE_FIRST_WAIT_BOUND;
+    int i = 0;
+    while (i < QUEUE_NUM_WAIT_BUCKETS - 1 && elapsed >= bound) {
+        bound *= 10;
+        i += 1;
+    }
+    histogram[i] += 1;
+}
+
+// Return the size of the object if it is bytes-like (e.g. pickled),
+// or a tuple of such objects (e.g. pickled with out-of-band buffers).
+static Py_ssize_t
+_get_payload_size(PyObject *obj)
+{
+    if (PyBytes_Check(obj)) {
+        return PyBytes_GET_SIZE(obj);
+    }
+    else if (PyMemoryView_Check(obj)) {
+        return PyMemoryView_GET_BUFFER(obj)->len;
+    }
+    else if (PyTuple_Check(obj)) {
+        Py_ssize_t size = 0;
+        for (Py_ssize_t i = 0; i < PyTuple_GET_SIZE(obj); i++) {
+            PyObject *item = PyTuple_GET_ITEM(obj, i);
+            if (PyBytes_Check(item)) {
+                size += PyBytes_GET_SIZE(item);
+            }
+            else if (PyMemoryView_Check(item)) {
+                size += PyMemoryView_GET_BUFFER(item)->len;
+            }
+        }
+        return size;
+    }
+    return 0;
+}
+
+
+/* the queue */
+
+typedef struct _queue {
+    Py_ssize_t num_waiters;  // atomic
+    PyThread_type_lock mutex;
+    int alive;
+    _queueitems items;
+    // Threads blocked in get() and put(), respectively.
+    _queuewaiters getters;
+    _queuewaiters putters;
+    // Event loops (etc.) waiting for a change.
+    _queuewatchers watchers;
+    _queuestats stats;
+    struct {
+        int fmt;
+        int unboundop;
+    } defaults;
+} _queue;
+
+static int
+_queue_init(_queue *queue, Py_ssize_t maxsize, int ordered,
+            int fmt, int unboundop)
+{
+    assert(check_unbound(unboundop));
+    PyThread_type_lock mutex = PyThread_allocate_lock();
+    if (mutex == NULL) {
+        return ERR_QUEUE_ALLOC;
+    }
+    *queue = (_queue){
+        .mutex = mutex,
+        .alive = 1,
+        .defaults = {
+            .fmt = fmt,
+            .unboundop = unboundop,
+        },
+    };
+    if (_queueitems_init(&queue->items, maxsize, ordered) < 0) {
+        PyThread_free_lock(mutex);
+        return ERR_QUEUE_ALLOC;
+    }
+    return 0;
+}
+
+static void
+_queue_clear(_queue *queue)
+{
+    assert(!queue->alive);
+    assert(queue->num_waiters == 0);
+    assert(queue->getters.first == NULL);
+    assert(queue->putters.first == NULL);
+    _queuewatchers_clear(&queue->watchers);
+    _queueitems_clear(&queue->items);
+    assert(queue->mutex != NULL);
+    PyThread_free_lock(queue->mutex);
+    *queue = (_queue){0};
+}
+
+static void _queue_free(_queue *);
+
+static void
+_queue_kill_and_wait(_queue *queue)
+{
+    // Mark it as dead.
+    PyThread_acquire_lock(queue->mutex, WAIT_LOCK);
+    assert(queue->alive);
+    queue->alive = 0;
+    // Any blocked threads will see the queue is gone.
+    _queuewaiters_notify(&queue->getters, -1);
+    _queuewaiters_notify(&queue->putters, -1);
+    _queuewatchers_notify(&queue->watchers);
+    PyThread_release_lock(queue->mutex);
+
+    // Wait for all waiters to fail.  A waiter that was blocked needs
+    // the GIL back before it can get there, and it might share the GIL
+    // with us, so we let go of the GIL (if we have it) meanwhile.
+    if (_Py_atomic_load_ssize(&queue->num_waiters) == 0) {
+        return;
+    }
+    PyThreadState *tstate = PyThreadState_GetUnchecked();
+    if (tstate != NULL) {
+        (void)PyEval_SaveThread();
+    }
+    while (_Py_atomic_load_ssize(&queue->num_waiters) > 0) {
+        PyThread_acquire_lock(queue->mutex, WAIT_LOCK);
+        PyThread_release_lock(queue->mutex);
+    }
+    if (tstate != NULL) {
+        PyEval_RestoreThread(tstate);
+    }
+}
+
+static void
+_queue_mark_waiter(_queue *queue)
+{
+    // The caller must be holding the lock of the queue's registry stripe,
+    // so the queue can't be removed in the meantime.
+    _Py_atomic_add_ssize(&queue->num_waiters, 1);
+}
+
+static void
+_queue_unmark_waiter(_queue *queue)
+{
+    _Py_atomic_add_ssize(&queue->num_waiters, -1);
+}
+
+static int
+_queue_lock(_queue *queue)
+{
+    // The queue must be marked as a waiter already.
+    PyThread_acquire_lock(queue->mutex, WAIT_LOCK);
+    if (!queue->alive) {
+        PyThread_release_lock(queue->mutex);
+        return ERR_QUEUE_NOT_FOUND;
+    }
+    return 0;
+}
+
+static void
+_queue_unlock(_queue *queue)
+{
+    PyThread_release_lock(queue->mutex);
+}
+
+// Block until notified by another thread or until the timeout expires.
+// The queue must be locked already.  On success it is still locked
+// and the timeout is updated with the time remaining.  Otherwise
+// the queue is unlocked.
+static int
+_queue_wait(_queue *queue, _queuewaiters *waiters, _queuewaiter *waiter,
+            PY_TIMEOUT_T *p_timeout, PyTime_t deadline)
+{
+    assert(*p_timeout != 0);
+    if (waiter->mutex == NULL) {
+        if (_queuewaiter_init(waiter) < 0) {
+            _queue_unlock(queue);
+            return -1;
+        }
+    }
+    _queuewaiters_add(waiters, waiter);
+    _queue_unlock(queue);
+
+    int res = _queuewaiter_wait(waiter, *p_timeout);
+
+    // We don't use _queue_lock() here, since the waiter must be
+    // unlinked even if the queue was destroyed in the meantime.
+    PyThread_acquire_lock(queue->mutex, WAIT_LOCK);
+    _queuewaiters_remove(waiters, waiter);
+    if (res != 0 && waiter->notified) {
+        // We were notified right as we gave up, so we re-arm the lock.
+        PyThread_acquire_lock(waiter->mutex, NOWAIT_LOCK);
+        if (res < 0) {
+            // Pass the notification on to the next waiter.
+            _queuewaiters_notify(waiters, 1);
+        }
+    }
+    waiter->notified = 0;
+
+    if (res < 0) {
+        PyThread_release_lock(queue->mutex);
+        return -1;
+    }
+    if (!queue->alive) {
+        PyThread_release_lock(queue->mutex);
+        return ERR_QUEUE_NOT_FOUND;
+    }
+    if (*p_timeout > 0) {
+        // We try one last time if the timeout expired.
+        PY_TIMEOUT_T remaining = res ? 0 : _PyDeadline_Get(deadline);
+        *p_timeout = remaining > 0 ? remaining : 0;
+    }
+    return 0;
+}
+
+static Py_ssize_t
+_queue_get_space(_queue *queue)
+{
+    // The queue must be locked already.
+    Py_ssize_t maxsize = queue->items.maxsize;
+    if (maxsize <= 0) {
+        return PY_SSIZE_T_MAX - queue->items.count;
+    }
+    // The count may briefly exceed maxsize; see _queue_unpop_items().
+    return queue->items.count < maxsize ? maxsize - queue->items.count : 0;
+}
+
+static int
+_queue_push_item(_queue *queue, int64_t interpid, _PyXIData_t *data,
+                 int fmt, int unboundop, const _queueitemkey *key)
+{
+    // The queue must be locked already and have space.
+    return _queueitems_push(&queue->items, interpid, data, fmt, unboundop,
+                            key);
+}
+
+typedef struct _queuepopped {
+    int64_t interpid;
+    _PyXIData_t *data;
+    int fmt;
+    int unboundop;
+    _queueitemkey key;
+} _queuepopped;
+
+static void
+_queue_pop_item(_queue *queue, _queuepopped *popped)
+{
+    // The queue must be locked already and not be empty.
+    _queueitems_pop(&queue->items, &popped->interpid,
+                    &popped->data, &popped->fmt, &popped->unboundop,
+                    &popped->key);
+}
+
+// Put popped items back at the front of the queue, in their original
+// order.  This is only used when a blocking call fails part way through,
+// so the items aren't lost.
+static void
+_queue_unpop_items(_queue *queue, _queuepopped *popped, Py_ssize_t count)
+{
+    PyThread_acquire_lock(queue->mutex, WAIT_LOCK);
+    for (Py_ssize_t i = count - 1; i >= 0; i--) {
+        if (!queue->alive
+            || _queueitems_push_front(&queue->items, popped[i].interpid,
+                                      popped[i].data, popped[i].fmt,
+                                      popped[i].unboundop,
+                                      &popped[i].key) < 0)
+        {
+            // The queue was destroyed or we ran out of memory.
+            PyErr_Clear();
+            if (popped[i].data != NULL) {
+                (void)_release_xid_data(popped[i].data,
+                                        XID_IGNORE_EXC | XID_FREE);
+            }
+        }
+    }
+    // They weren't actually received.
+    queue->stats.gets -= count;
+    if (queue->items.count > queue->stats.peak_count) {
+        queue->stats.peak_count = queue->items.count;
+    }
+    _queuewaiters_notify(&queue->getters, count);
+    _queuewatchers_notify(&queue->watchers);
+    PyThread_release_lock(queue->mutex);
+}
+
+// Add the items in order, all under a single acquisition of the lock
+// (unless we have to wait for space).  Once the timeout expires,
+// the number of items added so far is set.  If none were added
+// then fail with ERR_QUEUE_FULL.  "sizes" holds the payload size
+// of each item, for the stats.  For priority queues, all the items
+// get the same key.
+static int
+_queue_add_many(_queue *queue, int64_t interpid,
+                _PyXIData_t **data, const Py_ssize_t *sizes, Py_ssize_t count,
+                int fmt, int unboundop, const _queueitemkey *key,
+                PY_TIMEOUT_T timeout, Py_ssize_t *p_added)
+{
+    *p_added = 0;
+    int err = _queue_lock(queue);
+    if (err < 0) {
+        return err;
+    }
+
+    Py_ssize_t added = 0;
+    _queuewaiter waiter = {0};
+    PyTime_t deadline = timeout > 0 ? _PyDeadline_Init(timeout) : 0;
+    int waited = 0;
+    PyTime_t waitstart = 0;
+    while (added < count) {
+        Py_ssize_t space = _queue_get_space(queue);
+        if (space == 0) {
+            if (timeout == 0) {
+                break;
+            }
+            if (!waited) {
+                (void)PyTime_MonotonicRaw(&waitstart);
+                waited = 1;
+            }
+            err = _queue_wait(queue, &queue->putters, &waiter,
+                              &timeout, deadline);
+            if (err != 0) {
+                *p_added = added;
+                _queuewaiter_clear(&waiter);
+                return err;
+            }
+            continue;
+        }
+
+        Py_ssize_t pushed = 0;
+        for (; pushed < space && added < count; pushed++, added++) {
+            if (_queue_push_item(queue, interpid, data[added],
+                                 fmt, unboundop, key) < 0)
+            {
+                queue->stats.puts += pushed;
+                _queuewaiters_notify(&queue->getters, pushed);
+                if (pushed > 0) {
+                    _queuewatchers_notify(&queue->watchers);
+                }
+                _queue_unlock(queue);
+                *p_added = added;
+                _queuewaiter_clear(&waiter);
+                return -1;
+            }
+            queue->stats.bytes_put += sizes[added];
+        }
+        queue->stats.puts += pushed;
+        if (queue->items.count > queue->stats.peak_count) {
+            queue->stats.peak_count = queue->items.count;
+        }
+        _queuewaiters_notify(&queue->getters, pushed);
+        _queuewatchers_notify(&queue->watchers);
+    }
+    _queuewaiter_clear(&waiter);
+    if (waited) {
+        _queuestats_add_wait(queue->stats.put_waits, waitstart);
+    }
+
+    _queue_unlock(queue);
+    *p_added = added;
+    return added > 0 ? 0 : ERR_QUEUE_FULL;
+}
+
+static int
+_queue_add(_queue *queue, int64_t interpid, _PyXIData_t *data,
+           Py_ssize_t size, int fmt, int unboundop, const _queueitemkey *key,
+           PY_TIMEOUT_T timeout)
+{
+    Py_ssize_t added = 0;
+    return _queue_add_many(queue, interpid, &data, &size, 1,
+                           fmt, unboundop, key, timeout, &added);
+}
+
+// Pop off up to "max_items" items, all under a single acquisition
+// of the lock (unless we have to wait for more).  The popped items
+// are stored in *p_popped, which is grown as needed using the raw
+// allocator.  Once the timeout expires, the number of items popped so
+// far is set.  If there were none then fail with ERR_QUEUE_EMPTY.
+static int
+_queue_next_many(_queue *queue, Py_ssize_t max_items,
+                 _queuepopped **p_popped, Py_ssize_t *p_size,
+                 Py_ssize_t *p_count, PY_TIMEOUT_T timeout)
+{
+    assert(max_items > 0);
+    *p_count = 0;
+    int err = _queue_lock(queue);
+    if (err < 0) {
+        return err;
+    }
+
+    assert(queue->items.count >= 0);
+    Py_ssize_t count = 0;
+    _queuewaiter waiter = {0};
+    PyTime_t deadline = timeout > 0 ? _PyDeadline_Init(timeout) : 0;
+    int waited = 0;
+    PyTime_t waitstart = 0;
+    while (count < max_items) {
+        if (queue->items.count == 0) {
+            if (timeout == 0) {
+                break;
+            }
+            if (!waited) {
+                (void)PyTime_MonotonicRaw(&waitstart);
+                waited = 1;
+            }
+            err = _queue_wait(queue, &queue->getters, &waiter,
+                              &timeout, deadline);
+            if (err != 0) {
+                _queuewaiter_clear(&waiter);
+                if (count > 0) {
+                    PyObject *exc = PyErr_GetRaisedException();
+                    _queue_unpop_items(queue, *p_popped, count);
+                    PyErr_SetRaisedException(exc);
+                }
+                return err;
+            }
+            continue;
+        }
+
+        Py_ssize_t needed = Py_MIN(count + queue->items.count, max_items);
+        if (needed > *p_size) {
+            _queuepopped *popped = PyMem_RawRealloc(
+                            *p_popped, sizeof(_queuepopped) * needed);
+            if (popped == NULL) {
+                _queue_unlock(queue);
+                *p_count = count;
+                _queuewaiter_clear(&waiter);
+                PyErr_NoMemory();
+                return -1;
+            }
+            *p_popped = popped;
+            *p_size = needed;
+        }
+        Py_ssize_t numpopped = needed - count;
+        for (; count < needed; count++) {
+            _queue_pop_item(queue, &(*p_popped)[count]);
+        }
+        queue->stats.gets += numpopped;
+        _queuewaiters_notify(&queue->putters, numpopped);
+        _queuewatchers_notify(&queue->watchers);
+    }
+    _queuewaiter_clear(&waiter);
+    if (waited) {
+        _queuestats_add_wait(queue->stats.get_waits, waitstart);
+    }
+
+    _queue_unlock(queue);
+    *p_count = count;
+    return count > 0 ? 0 : ERR_QUEUE_EMPTY;
+}
+
+static int
+_queue_next(_queue *queue,
+            _PyXIData_t **p_data, int *p_fmt, int *p_unboundop,
+            PY_TIMEOUT_T timeout)
+{
+    _queuepopped popped = {0};
+    _queuepopped *p_popped = &popped;
+    Py_ssize_t size = 1;
+    Py_ssize_t count = 0;
+    int err = _queue_next_many(queue, 1, &p_popped, &size, &count, timeout);
+    assert(p_popped == &popped);
+    if (err != 0) {
+        assert(count == 0);
+        return err;
+    }
+    assert(count == 1);
+    *p_data = popped.data;
+    *p_fmt = popped.fmt;
+    *p_unboundop = popped.unboundop;
+    return 0;
+}
+
+static int
+_queue_get_maxsize(_queue *queue, Py_ssize_t *p_maxsize)
+{
+    int err = _queue_lock(queue);
+    if (err < 0) {
+        return err;
+    }
+
+    *p_maxsize = queue->items.maxsize;
+
+    _queue_unlock(queue);
+    return 0;
+}
+
+static int
+_queue_is_full(_queue *queue, int *p_is_full)
+{
+    int err = _queue_lock(queue);
+    if (err < 0) {
+        return err;
+    }
+
+    *p_is_full = _queue_get_space(queue) == 0;
+
+    _queue_unlock(queue);
+    return 0;
+}
+
+static int
+_queue_get_count(_queue *queue, Py_ssize_t *p_count)
+{
+    int err = _queue_lock(queue);
+    if (err < 0) {
+        return err;
+    }
+
+    *p_count = queue->items.count;
+
+    _queue_unlock(queue);
+    return 0;
+}
+
+struct queue_stats {
+    _queuestats stats;
+    Py_ssize_t count;
+    Py_ssize_t num_getters;
+    Py_ssize_t num_putters;
+};
+
+static Py_ssize_t
+_queuewaiters_count(_queuewaiters *waiters)
+{
+    // The caller must be holding the queue's lock.
+    Py_ssize_t count = 0;
+    for (_queuewaiter *waiter = waiters->first;
+            waiter != NULL; waiter = waiter->next)
+    {
+        count += 1;
+    }
+    return count;
+}
+
+static int
+_queue_get_stats(_queue *queue, struct queue_stats *stats)
+{
+    int err = _queue_lock(queue);
+    if (err < 0) {
+        return err;
+    }
+
+    *stats = (struct queue_stats){
+        .stats = queue->stats,
+        .count = queue->items.count,
+        .num_getters = _queuewaiters_count(&queue->getters),
+        .num_putters = _queuewaiters_count(&queue->putters),
+    };
+
+    _queue_unlock(queue);
+    return 0;
+}
+
+static int
+_queue_watch(_queue *queue, int64_t interpid, int fd)
+{
+    int err = _queue_lock(queue);
+    if (err < 0) {
+        return err;
+    }
+
+    err = _queuewatchers_add(&queue->watchers, interpid, fd, NULL);
+    if (err == 0 && queue->items.count > 0) {
+        // Let the watcher know there are items already.
+        _queuewatchers_notify(&queue->watchers);
+    }
+
+    _queue_unlock(queue);
+    return err;
+}
+
+static int
+_queue_unwatch(_queue *queue, int64_t interpid, int fd)
+{
+    int err = _queue_lock(queue);
+    if (err < 0) {
+        return err;
+    }
+
+    (void)_queuewatchers_remove(&queue->watchers, interpid, fd, NULL);
+
+    _queue_unlock(queue);
+    return 0;
+}
+
+#define QUEUE_EVENT_GET 1  // the queue has items
+#define QUEUE_EVENT_PUT 2  // the queue has space
+
+// Set which of the events are ready.  If there is a selector then it
+// starts watching the queue first, so no later changes are missed.
+static int
+_queue_poll(_queue *queue, int events, int *p_revents,
+            int64_t interpid, _queueselector *selector)
+{
+    int err = _queue_lock(queue);
+    if (err < 0) {
+        return err;
+    }
+
+    if (selector != NULL) {
+        if (_queuewatchers_add(&queue->watchers, interpid, -1,
+                               selector) < 0)
+        {
+            _queue_unlock(queue);
+            return -1;
+        }
+    }
+    int revents = 0;
+    if ((events & QUEUE_EVENT_GET) && queue->items.count > 0) {
+        revents |= QUEUE_EVENT_GET;
+    }
+    if ((events & QUEUE_EVENT_PUT) && _queue_get_space(queue) > 0) {
+        revents |= QUEUE_EVENT_PUT;
+    }
+    *p_revents = revents;
+
+    _queue_unlock(queue);
+    return 0;
+}
+
+static void
+_queue_unselect(_queue *queue, int64_t interpid, _queueselector *selector)
+{
+    // We don't use _queue_lock() here, since the selector must be
+    // removed even if the queue was destroyed in the meantime.
+    PyThread_acquire_lock(queue->mutex, WAIT_LOCK);
+    (void)_queuewatchers_remove(&queue->watchers, interpid, -1, selector);
+    PyThread_release_lock(queue->mutex);
+}
+
+static void
+_queue_clear_interpreter(_queue *queue, int64_t interpid)
 {
     int err = _queue_lock(queue);
     if (err == ERR_QUEUE_NOT_FOUND) {
@@ -748,28 +1874,15 @@ _queue_clear_interpreter(_queue *queue, int64_t interpid)
     }
     assert(err == 0);  // There should be no other errors.
 
-    _queueitem *prev = NULL;
-    _queueitem *next = queue->items.first;
-    while (next != NULL) {
-        _queueitem *item = next;
-        next = item->next;
-        int remove = (item->interpid == interpid)
-            ? _queueitem_clear_interpreter(item)
-            : 0;
-        if (remove) {
-            _queueitem_free(item);
-            if (prev == NULL) {
-                queue->items.first = next;
-            }
-            else {
-                prev->next = next;
-            }
-            queue->items.count -= 1;
-        }
-        else {
-            prev = item;
-        }
+    Py_ssize_t removed = _queueitems_clear_interpreter(&queue->items,
+                                                       interpid);
+    queue->stats.dropped += removed;
+    _queuewaiters_notify(&queue->putters, removed);
+    if (removed > 0) {
+        _queuewatchers_notify(&queue->watchers);
     }
+    // The interpreter's fds are no longer valid.
+    (void)_queuewatchers_remove(&queue->watchers, interpid, -1, NULL);
 
     _queue_unlock(queue);
 }
@@ -831,26 +1944,176 @@ _queuerefs_clear(_queueref *head)
 }
 
 
-/* a collection of queues ***************************************************/
+/* a stripe of the queue registry *******************************************/
 
-typedef struct _queues {
+/* The registry is split into a fixed number of stripes, each with its
+   own lock and its own hash table of refs, keyed by queue ID.  Queue IDs
+   are handed out sequentially, so consecutive queues land in different
+   stripes and lookups of different queues rarely contend. */
+
+#define QUEUES_NUM_STRIPES 32
+#define QUEUES_MIN_BUCKETS 8
+
+typedef struct _queuesstripe {
     PyThread_type_lock mutex;
-    _queueref *head;
+    _queueref **buckets;
+    Py_ssize_t numbuckets;  // always a power of 2
     int64_t count;
+} _queuesstripe;
+
+static inline _queuesstripe *
+_queues_get_stripe(_queuesstripe *stripes, int64_t qid)
+{
+    return &stripes[qid % QUEUES_NUM_STRIPES];
+}
+
+static inline _queueref **
+_queuesstripe_get_bucket(_queuesstripe *stripe, int64_t qid)
+{
+    // The low bits already picked the stripe.
+    size_t hash = (size_t)(qid / QUEUES_NUM_STRIPES);
+    return &stripe->buckets[hash & (stripe->numbuckets - 1)];
+}
+
+static int
+_queuesstripe_init(_queuesstripe *stripe)
+{
+    PyThread_type_lock mutex = PyThread_allocate_lock();
+    if (mutex == NULL) {
+        return -1;
+    }
+    _queueref **buckets = PyMem_RawCalloc(QUEUES_MIN_BUCKETS,
+                                          sizeof(_queueref *));
+    if (buckets == NULL) {
+        PyThread_free_lock(mutex);
+        return -1;
+    }
+    *stripe = (_queuesstripe){
+        .mutex = mutex,
+        .buckets = buckets,
+        .numbuckets = QUEUES_MIN_BUCKETS,
+    };
+    return 0;
+}
+
+static void
+_queuesstripe_fini(_queuesstripe *stripe)
+{
+    if (stripe->mutex == NULL) {
+        // It was never initialized.
+        return;
+    }
+    PyThread_acquire_lock(stripe->mutex, WAIT_LOCK);
+    for (Py_ssize_t i = 0; i < stripe->numbuckets; i++) {
+        if (stripe->buckets[i] != NULL) {
+            _queuerefs_clear(stripe->buckets[i]);
+        }
+    }
+    PyMem_RawFree(stripe->buckets);
+    PyThread_type_lock mutex = stripe->mutex;
+    *stripe = (_queuesstripe){0};
+    PyThread_release_lock(mutex);
+    PyThread_free_lock(mutex);
+}
+
+static void
+_queuesstripe_maybe_grow(_queuesstripe *stripe)  // needs lock
+{
+    if (stripe->count <= stripe->numbuckets * 2) {
+        return;
+    }
+    Py_ssize_t numbuckets = stripe->numbuckets * 2;
+    _queueref **buckets = PyMem_RawCalloc(numbuckets, sizeof(_queueref *));
+    if (buckets == NULL) {
+        // We simply keep using longer chains.
+        return;
+    }
+    _queueref **old = stripe->buckets;
+    Py_ssize_t oldnum = stripe->numbuckets;
+    stripe->buckets = buckets;
+    stripe->numbuckets = numbuckets;
+    for (Py_ssize_t i = 0; i < oldnum; i++) {
+        _queueref *ref = old[i];
+        while (ref != NULL) {
+            _queueref *next = ref->next;
+            _queueref **bucket = _queuesstripe_get_bucket(stripe, ref->qid);
+            ref->next = *bucket;
+            *bucket = ref;
+            ref = next;
+        }
+    }
+    PyMem_RawFree(old);
+}
+
+static _queueref *
+_queuesstripe_find(_queuesstripe *stripe, int64_t qid,  // needs lock
+                   _queueref **pprev)
+{
+    _queueref **bucket = _queuesstripe_get_bucket(stripe, qid);
+    return _queuerefs_find(*bucket, qid, pprev);
+}
+
+static void
+_queuesstripe_add(_queuesstripe *stripe, _queueref *ref)  // needs lock
+{
+    // We assume that the queue is a new one (not already in the table).
+    _queueref **bucket = _queuesstripe_get_bucket(stripe, ref->qid);
+    ref->next = *bucket;
+    *bucket = ref;
+    stripe->count += 1;
+    _queuesstripe_maybe_grow(stripe);
+}
+
+static void
+_queuesstripe_remove_ref(_queuesstripe *stripe,  // needs lock
+                         _queueref *ref, _queueref *prev, _queue **p_queue)
+{
+    assert(ref->queue != NULL);
+
+    if (prev == NULL) {
+        _queueref **bucket = _queuesstripe_get_bucket(stripe, ref->qid);
+        assert(*bucket == ref);
+        *bucket = ref->next;
+    }
+    else {
+        prev->next = ref->next;
+    }
+    ref->next = NULL;
+    stripe->count -= 1;
+
+    *p_queue = ref->queue;
+    ref->queue = NULL;
+    GLOBAL_FREE(ref);
+}
+
+
+/* a collection of queues ***************************************************/
+
+typedef struct _queues {
+    PyThread_type_lock mutex;  // only protects next_id
+    _queuesstripe stripes[QUEUES_NUM_STRIPES];
     int64_t next_id;
 } _queues;
 
-static void
+static void _queues_fini(_queues *, PyThread_type_lock *);
+
+static int
 _queues_init(_queues *queues, PyThread_type_lock mutex)
 {
     assert(mutex != NULL);
     assert(queues->mutex == NULL);
     *queues = (_queues){
         .mutex = mutex,
-        .head = NULL,
-        .count = 0,
         .next_id = 1,
     };
+    for (int i = 0; i < QUEUES_NUM_STRIPES; i++) {
+        if (_queuesstripe_init(&queues->stripes[i]) < 0) {
+            PyThread_type_lock unused;
+            _queues_fini(queues, &unused);
+            return ERR_QUEUES_ALLOC;
+        }
+    }
+    return 0;
 }
 
 static void
@@ -860,9 +2123,8 @@ _queues_fini(_queues *queues, PyThread_type_lock *p_mutex)
     assert(mutex != NULL);
 
     PyThread_acquire_lock(mutex, WAIT_LOCK);
-    if (queues->count > 0) {
-        assert(queues->head != NULL);
-        _queuerefs_clear(queues->head);
+    for (int i = 0; i < QUEUES_NUM_STRIPES; i++) {
+        _queuesstripe_fini(&queues->stripes[i]);
     }
     *queues = (_queues){0};
     PyThread_release_lock(mutex);
@@ -871,33 +2133,38 @@ _queues_fini(_queues *queues, PyThread_type_lock *p_mutex)
 }
 
 static int64_t
-_queues_next_id(_queues *queues)  // needs lock
+_queues_next_id(_queues *queues)
 {
+    PyThread_acquire_lock(queues->mutex, WAIT_LOCK);
     int64_t qid = queues->next_id;
     if (qid < 0) {
         /* overflow */
-        return ERR_NO_NEXT_QUEUE_ID;
+        qid = ERR_NO_NEXT_QUEUE_ID;
     }
-    queues->next_id += 1;
+    else {
+        queues->next_id += 1;
+    }
+    PyThread_release_lock(queues->mutex);
     return qid;
 }
 
 static int
 _queues_lookup(_queues *queues, int64_t qid, _queue **res)
 {
-    PyThread_acquire_lock(queues->mutex, WAIT_LOCK);
+    _queuesstripe *stripe = _queues_get_stripe(queues->stripes, qid);
+    PyThread_acquire_lock(stripe->mutex, WAIT_LOCK);
 
-    _queueref *ref = _queuerefs_find(queues->head, qid, NULL);
+    _queueref *ref = _queuesstripe_find(stripe, qid, NULL);
     if (ref == NULL) {
-        PyThread_release_lock(queues->mutex);
+        PyThread_release_lock(stripe->mutex);
         return ERR_QUEUE_NOT_FOUND;
     }
     assert(ref->queue != NULL);
     _queue *queue = ref->queue;
-    _queue_mark_waiter(queue, NULL);
+    _queue_mark_waiter(queue);
     // The caller must unmark it.
 
-    PyThread_release_lock(queues->mutex);
+    PyThread_release_lock(stripe->mutex);
 
     *res = queue;
     return 0;
@@ -906,70 +2173,45 @@ _queues_lookup(_queues *queues, int64_t qid, _queue **res)
 static int64_t
 _queues_add(_queues *queues, _queue *queue)
 {
-    int64_t qid = -1;
-    PyThread_acquire_lock(queues->mutex, WAIT_LOCK);
+    int64_t qid = _queues_next_id(queues);
+    if (qid < 0) {
+        return qid;
+    }
 
     // Create a new ref.
-    int64_t _qid = _queues_next_id(queues);
-    if (_qid < 0) {
-        goto done;
-    }
     _queueref *ref = GLOBAL_MALLOC(_queueref);
     if (ref == NULL) {
-        qid = ERR_QUEUE_ALLOC;
-        goto done;
+        return ERR_QUEUE_ALLOC;
     }
     *ref = (_queueref){
-        .qid = _qid,
+        .qid = qid,
         .queue = queue,
     };
 
-    // Add it to the list.
-    // We assume that the queue is a new one (not already in the list).
-    ref->next = queues->head;
-    queues->head = ref;
-    queues->count += 1;
+    // Add it to the table.
+    _queuesstripe *stripe = _queues_get_stripe(queues->stripes, qid);
+    PyThread_acquire_lock(stripe->mutex, WAIT_LOCK);
+    _queuesstripe_add(stripe, ref);
+    PyThread_release_lock(stripe->mutex);
 
-    qid = _qid;
-done:
-    PyThread_release_lock(queues->mutex);
     return qid;
 }
 
-static void
-_queues_remove_ref(_queues *queues, _queueref *ref, _queueref *prev,
-                   _queue **p_queue)
-{
-    assert(ref->queue != NULL);
-
-    if (ref == queues->head) {
-        queues->head = ref->next;
-    }
-    else {
-        prev->next = ref->next;
-    }
-    ref->next = NULL;
-    queues->count -= 1;
-
-    *p_queue = ref->queue;
-    ref->queue = NULL;
-    GLOBAL_FREE(ref);
-}
-
 static int
 _queues_remove(_queues *queues, int64_t qid, _queue **p_queue)
 {
-    PyThread_acquire_lock(queues->mutex, WAIT_LOCK);
+    _queuesstripe *stripe = _queues_get_stripe(queues->stripes, qid);
+    PyThread_acquire_lock(stripe->mutex, WAIT_LOCK);
 
     _queueref *prev = NULL;
-    _queueref *ref = _queuerefs_find(queues->head, qid, &prev);
+    _queueref *ref = _queuesstripe_find(stripe, qid, &prev);
     if (ref == NULL) {
-        PyThread_release_lock(queues->mutex);
+        PyThread_release_lock(stripe->mutex);
         return ERR_QUEUE_NOT_FOUND;
     }
 
-    _queues_remove_ref(queues, ref, prev, p_queue);
-    PyThread_release_lock(queues->mutex);
+    _queuesstripe_remove_ref(stripe, ref, prev, p_queue);
+    PyThread_release_lock(stripe->mutex);
 
     return 0;
 }
@@ -979,9 +2221,10 @@ _queues_incref(_queues *queues, int64_t qid)
 {
     // XXX Track interpreter IDs?
     int res = -1;
-    PyThread_acquire_lock(queues->mutex, WAIT_LOCK);
+    _queuesstripe *stripe = _queues_get_stripe(queues->stripes, qid);
+    PyThread_acquire_lock(stripe->mutex, WAIT_LOCK);
 
-    _queueref *ref = _queuerefs_find(queues->head, qid, NULL);
+    _queueref *ref = _queuesstripe_find(stripe, qid, NULL);
     if (ref == NULL) {
         assert(!PyErr_Occurred());
         res = ERR_QUEUE_NOT_FOUND;
@@ -991,7 +2234,7 @@ _queues_incref(_queues *queues, int64_t qid)
 
     res = 0;
 done:
-    PyThread_release_lock(queues->mutex);
+    PyThread_release_lock(stripe->mutex);
     return res;
 }
 
@@ -999,10 +2242,11 @@ static int
 _queues_decref(_queues *queues, int64_t qid)
 {
     int res = -1;
-    PyThread_acquire_lock(queues->mutex, WAIT_LOCK);
+    _queuesstripe *stripe = _queues_get_stripe(queues->stripes, qid);
+    PyThread_acquire_lock(stripe->mutex, WAIT_LOCK);
 
     _queueref *prev = NULL;
-    _queueref *ref = _queuerefs_find(queues->head, qid, &prev);
+    _queueref *ref = _queuesstripe_find(stripe, qid, &prev);
     if (ref == NULL) {
         assert(!PyErr_Occurred());
         res = ERR_QUEUE_NOT_FOUND;
@@ -1019,8 +2263,8 @@ _queues_decref(_queues *queues, int64_t qid)
     assert(ref->queue != NULL);
     if (ref->refcount == 0) {
         _queue *queue = NULL;
-        _queues_remove_ref(queues, ref, prev, &queue);
-        PyThread_release_lock(queues->mutex);
+        _queuesstripe_remove_ref(stripe, ref, prev, &queue);
+        PyThread_release_lock(stripe->mutex);
 
         _queue_kill_and_wait(queue);
         _queue_free(queue);
@@ -1029,7 +2273,7 @@ _queues_decref(_queues *queues, int64_t qid)
 
     res = 0;
 finally:
-    PyThread_release_lock(queues->mutex);
+    PyThread_release_lock(stripe->mutex);
     return res;
 }
 
@@ -1039,43 +2283,71 @@ struct queue_id_and_info {
     int unboundop;
 };
 
+static int
+_queue_id_and_info_cmp(const void *a, const void *b)
+{
+    // Newest first.
+    int64_t aid = ((const struct queue_id_and_info *)a)->id;
+    int64_t bid = ((const struct queue_id_and_info *)b)->id;
+    return (aid < bid) - (aid > bid);
+}
+
 static struct queue_id_and_info *
 _queues_list_all(_queues *queues, int64_t *p_count)
 {
-    struct queue_id_and_info *qids = NULL;
-    PyThread_acquire_lock(queues->mutex, WAIT_LOCK);
+    // Hold every stripe's lock, so we get a consistent snapshot.
+    int64_t count = 0;
+    for (int i = 0; i < QUEUES_NUM_STRIPES; i++) {
+        PyThread_acquire_lock(queues->stripes[i].mutex, WAIT_LOCK);
+        count += queues->stripes[i].count;
+    }
+
     struct queue_id_and_info *ids = PyMem_NEW(struct queue_id_and_info,
-                                              (Py_ssize_t)(queues->count));
+                                              (Py_ssize_t)count);
     if (ids == NULL) {
         goto done;
     }
-    _queueref *ref = queues->head;
-    for (int64_t i=0; ref != NULL; ref = ref->next, i++) {
-        ids[i].id = ref->qid;
-        assert(ref->queue != NULL);
-        ids[i].fmt = ref->queue->defaults.fmt;
-        ids[i].unboundop = ref->queue->defaults.unboundop;
+    int64_t n = 0;
+    for (int i = 0; i < QUEUES_NUM_STRIPES; i++) {
+        _queuesstripe *stripe = &queues->stripes[i];
+        for (Py_ssize_t b = 0; b < stripe->numbuckets; b++) {
+            _queueref *ref = stripe->buckets[b];
+            for (; ref != NULL; ref = ref->next, n++) {
+                ids[n].id = ref->qid;
+                assert(ref->queue != NULL);
+                ids[n].fmt = ref->queue->defaults.fmt;
+                ids[n].unboundop = ref->queue->defaults.unboundop;
+            }
+        }
     }
-    *p_count = queues->count;
+    assert(n == count);
+    *p_count = count;
 
-    qids = ids;
 done:
-    PyThread_release_lock(queues->mutex);
-    return qids;
+    for (int i = QUEUES_NUM_STRIPES - 1; i >= 0; i--) {
+        PyThread_release_lock(queues->stripes[i].mutex);
+    }
+    if (ids != NULL) {
+        qsort(ids, (size_t)count, sizeof(*ids), _queue_id_and_info_cmp);
+    }
+    return ids;
 }
 
 static void
 _queues_clear_interpreter(_queues *queues, int64_t interpid)
 {
-    PyThread_acquire_lock(queues->mutex, WAIT_LOCK);
-
-    _queueref *ref = queues->head;
-    for (; ref != NULL; ref = ref->next) {
-        assert(ref->queue != NULL);
-        _queue_clear_interpreter(ref->queue, interpid);
+    for (int i = 0; i < QUEUES_NUM_STRIPES; i++) {
+        _queuesstripe *stripe = &queues->stripes[i];
+        PyThread_acquire_lock(stripe->mutex, WAIT_LOCK);
+        for (Py_ssize_t b = 0; b < stripe->numbuckets; b++) {
+            _queueref *ref = stripe->buckets[b];
+            for (; ref != NULL; ref = ref->next) {
+                assert(ref->queue != NULL);
+                _queue_clear_interpreter(ref->queue, interpid);
+            }
+        }
+        PyThread_release_lock(stripe->mutex);
     }
-
-    PyThread_release_lock(queues->mutex);
 }
 
 
@@ -1090,13 +2362,14 @@ _queue_free(_queue *queue)
 
 // Create a new queue.
 static int64_t
-queue_create(_queues *queues, Py_ssize_t maxsize, int fmt, int unboundop)
+queue_create(_queues *queues, Py_ssize_t maxsize, int ordered,
+             int fmt, int unboundop)
 {
     _queue *queue = GLOBAL_MALLOC(_queue);
     if (queue == NULL) {
         return ERR_QUEUE_ALLOC;
     }
-    int err = _queue_init(queue, maxsize, fmt, unboundop);
+    int err = _queue_init(queue, maxsize, ordered, fmt, unboundop);
     if (err < 0) {
         GLOBAL_FREE(queue);
         return (int64_t)err;
@@ -1124,8 +2397,11 @@ queue_destroy(_queues *queues, int64_t qid)
 }
 
 // Push an object onto the queue.
+// If the queue is full then block until the timeout expires.
+// The key is only allowed for priority queues, where it is optional.
 static int
-queue_put(_queues *queues, int64_t qid, PyObject *obj, int fmt, int unboundop)
+queue_put(_queues *queues, int64_t qid, PyObject *obj, int fmt, int unboundop,
+          const _queueitemkey *key, PY_TIMEOUT_T timeout)
 {
     PyInterpreterState *interp = PyInterpreterState_Get();
     _PyXIData_lookup_context_t ctx;
@@ -1140,15 +2416,19 @@ queue_put(_queues *queues, int64_t qid, PyObject *obj, int fmt, int unboundop)
         return err;
     }
     assert(queue != NULL);
+    if (key != NULL && !queue->items.ordered) {
+        _queue_unmark_waiter(queue);
+        return ERR_QUEUE_NOT_ORDERED;
+    }
 
     // Convert the object to cross-interpreter data.
     _PyXIData_t *data = GLOBAL_MALLOC(_PyXIData_t);
     if (data == NULL) {
-        _queue_unmark_waiter(queue, queues->mutex);
+        _queue_unmark_waiter(queue);
         return -1;
     }
     if (_PyObject_GetXIData(&ctx, obj, data) != 0) {
-        _queue_unmark_waiter(queue, queues->mutex);
+        _queue_unmark_waiter(queue);
         GLOBAL_FREE(data);
         return -1;
     }
@@ -1156,8 +2436,10 @@ queue_put(_queues *queues, int64_t qid, PyObject *obj, int fmt, int unboundop)
 
     // Add the data to the queue.
     int64_t interpid = -1;  // _queueitem_init() will set it.
-    int res = _queue_add(queue, interpid, data, fmt, unboundop);
-    _queue_unmark_waiter(queue, queues->mutex);
+    Py_ssize_t size = _get_payload_size(obj);
+    int res = _queue_add(queue, interpid, data, size, fmt, unboundop, key,
+                         timeout);
+    _queue_unmark_waiter(queue);
     if (res != 0) {
         // We may chain an exception here:
         (void)_release_xid_data(data, 0);
@@ -1168,11 +2450,11 @@ queue_put(_queues *queues, int64_t qid, PyObject *obj, int fmt, int unboundop)
     return 0;
 }
 
-// Pop the next object off the queue.  Fail if empty.
-// XXX Support a "wait" mutex?
+// Pop the next object off the queue.
+// If the queue is empty then block until the timeout expires.
 static int
-queue_get(_queues *queues, int64_t qid,
-          PyObject **res, int *p_fmt, int *p_unboundop)
+queue_get(_queues *queues, int64_t qid, PyTypeObject *viewtype,
+          PyObject **res, int *p_fmt, int *p_unboundop, PY_TIMEOUT_T timeout)
 {
     int err;
     *res = NULL;
@@ -1188,8 +2470,8 @@ queue_get(_queues *queues, int64_t qid,
 
     // Pop off the next item from the queue.
     _PyXIData_t *data = NULL;
-    err = _queue_next(queue, &data, p_fmt, p_unboundop);
-    _queue_unmark_waiter(queue, queues->mutex);
+    err = _queue_next(queue, &data, p_fmt, p_unboundop, timeout);
+    _queue_unmark_waiter(queue);
     if (err != 0) {
         return err;
     }
@@ -1199,62 +2481,331 @@ queue_get(_queues *queues, int64_t qid,
     }
 
     // Convert the data back to an object.
-    PyObject *obj = _PyXIData_NewObject(data);
+    PyObject *obj = _new_object_from_xid(data, viewtype);
     if (obj == NULL) {
-        assert(PyErr_Occurred());
-        // It was allocated in queue_put(), so we free it.
-        (void)_release_xid_data(data, XID_IGNORE_EXC | XID_FREE);
         return -1;
     }
-    // It was allocated in queue_put(), so we free it.
-    int release_res = _release_xid_data(data, XID_FREE);
-    if (release_res < 0) {
-        // The source interpreter has been destroyed already.
-        assert(PyErr_Occurred());
-        Py_DECREF(obj);
+
+    *res = obj;
+    return 0;
+}
+
+// Push each of the objects onto the queue, in order.
+// The objects are all converted before the queue is locked.
+static int
+queue_put_many(_queues *queues, int64_t qid, PyObject *seq,
+               int fmt, int unboundop, const _queueitemkey *key,
+               PY_TIMEOUT_T timeout, Py_ssize_t *p_added)
+{
+    *p_added = 0;
+    PyInterpreterState *interp = PyInterpreterState_Get();
+    _PyXIData_lookup_context_t ctx;
+    if (_PyXIData_GetLookupContext(interp, &ctx) < 0) {
         return -1;
     }
 
-    *res = obj;
-    return 0;
+    Py_ssize_t count = PySequence_Fast_GET_SIZE(seq);
+    PyObject **objs = PySequence_Fast_ITEMS(seq);
+    if (count == 0) {
+        return 0;
+    }
+
+    // Look up the queue.
+    _queue *queue = NULL;
+    int err = _queues_lookup(queues, qid, &queue);
+    if (err != 0) {
+        return err;
+    }
+    assert(queue != NULL);
+    if (key != NULL && !queue->items.ordered) {
+        _queue_unmark_waiter(queue);
+        return ERR_QUEUE_NOT_ORDERED;
+    }
+
+    // Convert the objects to cross-interpreter data.
+    Py_ssize_t converted = 0;
+    _PyXIData_t **data = PyMem_RawMalloc(sizeof(_PyXIData_t *) * count);
+    Py_ssize_t *sizes = PyMem_RawMalloc(sizeof(Py_ssize_t) * count);
+    if (data == NULL || sizes == NULL) {
+        PyErr_NoMemory();
+        err = -1;
+        goto finally;
+    }
+    for (; converted < count; converted++) {
+        _PyXIData_t *xidata = GLOBAL_MALLOC(_PyXIData_t);
+        if (xidata == NULL) {
+            PyErr_NoMemory();
+            err = -1;
+            goto finally;
+        }
+        if (_PyObject_GetXIData(&ctx, objs[converted], xidata) != 0) {
+            GLOBAL_FREE(xidata);
+            err = -1;
+            goto finally;
+        }
+        assert(_PyXIData_INTERPID(xidata) == PyInterpreterState_GetID(interp));
+        data[converted] = xidata;
+        sizes[converted] = _get_payload_size(objs[converted]);
+    }
+
+    // Add the data to the queue.
+    int64_t interpid = -1;  // _queueitem_init() will set it.
+    err = _queue_add_many(queue, interpid, data, sizes, count,
+                          fmt, unboundop, key, timeout, p_added);
+
+finally:
+    _queue_unmark_waiter(queue);
+    if (data != NULL) {
+        // Release whatever didn't make it into the queue.
+        for (Py_ssize_t i = *p_added; i < converted; i++) {
+            (void)_release_xid_data(data[i], XID_IGNORE_EXC | XID_FREE);
+        }
+        PyMem_RawFree(data);
+    }
+    if (sizes != NULL) {
+        PyMem_RawFree(sizes);
+    }
+    return err;
+}
+
+// Pop up to "max_items" objects off the queue, as a list of
+// (obj, fmt, unboundop) tuples like queuesmod_get() returns.
+static int
+queue_get_many(_queues *queues, int64_t qid, Py_ssize_t max_items,
+               PyTypeObject *viewtype, PY_TIMEOUT_T timeout, PyObject **res)
+{
+    *res = NULL;
+
+    // Look up the queue.
+    _queue *queue = NULL;
+    int err = _queues_lookup(queues, qid, &queue);
+    if (err != 0) {
+        return err;
+    }
+    assert(queue != NULL);
+
+    // Pop off the items from the queue.
+    _queuepopped *popped = NULL;
+    Py_ssize_t size = 0;
+    Py_ssize_t count = 0;
+    err = _queue_next_many(queue, max_items, &popped, &size, &count, timeout);
+    _queue_unmark_waiter(queue);
+    if (err != 0) {
+        assert(count == 0);
+        PyMem_RawFree(popped);
+        return err;
+    }
+
+    // Convert the data back to objects.
+    Py_ssize_t i = 0;
+    PyObject *items = PyList_New(count);
+    if (items == NULL) {
+        err = -1;
+        goto finally;
+    }
+    for (; i < count; i++) {
+        _PyXIData_t *data = popped[i].data;
+        PyObject *item;
+        if (data == NULL) {
+            item = Py_BuildValue("Oii", Py_None, popped[i].fmt,
+                                 popped[i].unboundop);
+        }
+        else {
+            popped[i].data = NULL;
+            PyObject *obj = _new_object_from_xid(data, viewtype);
+            if (obj == NULL) {
+                err = -1;
+                goto finally;
+            }
+            item = Py_BuildValue("OiO", obj, popped[i].fmt, Py_None);
+            Py_DECREF(obj);
+        }
+        if (item == NULL) {
+            err = -1;
+            goto finally;
+        }
+        PyList_SET_ITEM(items, i, item);
+    }
+    *res = items;
+    items = NULL;
+
+finally:
+    assert((err == 0) == (*res != NULL));
+    Py_XDECREF(items);
+    for (; i < count; i++) {
+        if (popped[i].data != NULL) {
+            (void)_release_xid_data(popped[i].data, XID_IGNORE_EXC | XID_FREE);
+        }
+    }
+    PyMem_RawFree(popped);
+    return err;
+}
+
+static int
+queue_get_maxsize(_queues *queues, int64_t qid, Py_ssize_t *p_maxsize)
+{
+    _queue *queue = NULL;
+    int err = _queues_lookup(queues, qid, &queue);
+    if (err < 0) {
+        return err;
+    }
+    err = _queue_get_maxsize(queue, p_maxsize);
+    _queue_unmark_waiter(queue);
+    return err;
+}
+
+static int
+queue_is_full(_queues *queues, int64_t qid, int *p_is_full)
+{
+    _queue *queue = NULL;
+    int err = _queues_lookup(queues, qid, &queue);
+    if (err < 0) {
+        return err;
+    }
+    err = _queue_is_full(queue, p_is_full);
+    _queue_unmark_waiter(queue);
+    return err;
+}
+
+static int
+queue_get_count(_queues *queues, int64_t qid, Py_ssize_t *p_count)
+{
+    _queue *queue = NULL;
+    int err = _queues_lookup(queues, qid, &queue);
+    if (err < 0) {
+        return err;
+    }
+    err = _queue_get_count(queue, p_count);
+    _queue_unmark_waiter(queue);
+    return err;
 }
 
 static int
-queue_get_maxsize(_queues *queues, int64_t qid, Py_ssize_t *p_maxsize)
+queue_get_stats(_queues *queues, int64_t qid, struct queue_stats *stats)
 {
     _queue *queue = NULL;
     int err = _queues_lookup(queues, qid, &queue);
     if (err < 0) {
         return err;
     }
-    err = _queue_get_maxsize(queue, p_maxsize);
-    _queue_unmark_waiter(queue, queues->mutex);
+    err = _queue_get_stats(queue, stats);
+    _queue_unmark_waiter(queue);
     return err;
 }
 
+// Wait until any of the queues is ready for any of its events, or
+// until the timeout expires.  The ready events of each queue are set
+// in "revents".  If a queue isn't found then its index is set.
 static int
-queue_is_full(_queues *queues, int64_t qid, int *p_is_full)
+queue_poll(_queues *queues, const int64_t *qids, const int *events,
+           Py_ssize_t count, PY_TIMEOUT_T timeout,
+           int *revents, Py_ssize_t *p_failed)
+{
+    *p_failed = -1;
+    if (count == 0) {
+        return 0;
+    }
+    int64_t interpid = PyInterpreterState_GetID(_get_current_interp());
+    _queue **found = PyMem_RawCalloc(count, sizeof(_queue *));
+    if (found == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    int err = 0;
+    Py_ssize_t numfound = 0;
+    Py_ssize_t numwatched = 0;
+    _queueselector selector = {0};
+    PyTime_t deadline = timeout > 0 ? _PyDeadline_Init(timeout) : 0;
+
+    // Look up the queues.
+    for (; numfound < count; numfound++) {
+        err = _queues_lookup(queues, qids[numfound], &found[numfound]);
+        if (err < 0) {
+            *p_failed = numfound;
+            goto finally;
+        }
+    }
+    if (timeout != 0) {
+        if (_queueselector_init(&selector) < 0) {
+            err = -1;
+            goto finally;
+        }
+    }
+
+    while (1) {
+        int ready = 0;
+        for (Py_ssize_t i = 0; i < count; i++) {
+            // Each queue is watched starting with the first check.
+            _queueselector *watch = NULL;
+            if (selector.mutex != NULL && i == numwatched) {
+                watch = &selector;
+            }
+            err = _queue_poll(found[i], events[i], &revents[i],
+                              interpid, watch);
+            if (err < 0) {
+                *p_failed = i;
+                goto finally;
+            }
+            if (watch != NULL) {
+                numwatched += 1;
+            }
+            if (revents[i] != 0) {
+                ready = 1;
+            }
+        }
+        if (ready || timeout == 0) {
+            break;
+        }
+
+        int res = _queueselector_wait(&selector, timeout);
+        if (res < 0) {
+            err = -1;
+            goto finally;
+        }
+        if (timeout > 0) {
+            // We check one last time if the timeout expired.
+            PY_TIMEOUT_T remaining = res ? 0 : _PyDeadline_Get(deadline);
+            timeout = remaining > 0 ? remaining : 0;
+        }
+    }
+
+finally:
+    for (Py_ssize_t i = 0; i < numwatched; i++) {
+        _queue_unselect(found[i], interpid, &selector);
+    }
+    for (Py_ssize_t i = 0; i < numfound; i++) {
+        _queue_unmark_waiter(found[i]);
+    }
+    _queueselector_clear(&selector);
+    PyMem_RawFree(found);
+    return err;
+}
+
+static int
+queue_watch(_queues *queues, int64_t qid, int fd)
 {
     _queue *queue = NULL;
     int err = _queues_lookup(queues, qid, &queue);
     if (err < 0) {
         return err;
     }
-    err = _queue_is_full(queue, p_is_full);
-    _queue_unmark_waiter(queue, queues->mutex);
+    int64_t interpid = PyInterpreterState_GetID(_get_current_interp());
+    err = _queue_watch(queue, interpid, fd);
+    _queue_unmark_waiter(queue);
     return err;
 }
 
 static int
-queue_get_count(_queues *queues, int64_t qid, Py_ssize_t *p_count)
+queue_unwatch(_queues *queues, int64_t qid, int fd)
 {
     _queue *queue = NULL;
     int err = _queues_lookup(queues, qid, &queue);
     if (err < 0) {
         return err;
     }
-    err = _queue_get_count(queue, p_count);
-    _queue_unmark_waiter(queue, queues->mutex);
+    int64_t interpid = PyInterpreterState_GetID(_get_current_interp());
+    err = _queue_unwatch(queue, interpid, fd);
+    _queue_unmark_waiter(queue);
     return err;
 }
 
@@ -1420,7 +2971,12 @@ _globals_init(void)
             PyMutex_Unlock(&_globals.mutex);
             return ERR_QUEUES_ALLOC;
         }
-        _queues_init(&_globals.queues, mutex);
+        if (_queues_init(&_globals.queues, mutex) < 0) {
+            PyThread_free_lock(mutex);
+            _globals.module_count--;
+            PyMutex_Unlock(&_globals.mutex);
+            return ERR_QUEUES_ALLOC;
+        }
     }
     PyMutex_Unlock(&_globals.mutex);
     return 0;
@@ -1474,15 +3030,41 @@ qidarg_converter(PyObject *arg, void *ptr)
 }
 
 
+// Returns 1 if there is a key, 0 if not, and -1 on error.
+static int
+parse_item_key(PyObject *priority_obj, PyObject *deadline_obj,
+               _queueitemkey *key)
+{
+    *key = (_queueitemkey){.deadline = QUEUE_NO_DEADLINE};
+    int haskey = 0;
+    if (priority_obj != NULL && priority_obj != Py_None) {
+        key->priority = PyLong_AsLongLong(priority_obj);
+        if (key->priority == -1 && PyErr_Occurred()) {
+            return -1;
+        }
+        haskey = 1;
+    }
+    if (deadline_obj != NULL && deadline_obj != Py_None) {
+        if (_PyTime_FromSecondsObject(&key->deadline, deadline_obj,
+                                      _PyTime_ROUND_CEILING) < 0)
+        {
+            return -1;
+        }
+        haskey = 1;
+    }
+    return haskey;
+}
+
 static PyObject *
 queuesmod_create(PyObject *self, PyObject *args, PyObject *kwds)
 {
-    static char *kwlist[] = {"maxsize", "fmt", "unboundop", NULL};
+    static char *kwlist[] = {"maxsize", "fmt", "unboundop", "ordered", NULL};
     Py_ssize_t maxsize;
     int fmt;
     int unboundop;
-    if (!PyArg_ParseTupleAndKeywords(args, kwds, "nii:create", kwlist,
-                                     &maxsize, &fmt, &unboundop))
+    int ordered = 0;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "nii|$p:create", kwlist,
+                                     &maxsize, &fmt, &unboundop, &ordered))
     {
         return NULL;
     }
@@ -1492,7 +3074,8 @@ queuesmod_create(PyObject *self, PyObject *args, PyObject *kwds)
         return NULL;
     }
 
-    int64_t qid = queue_create(&_globals.queues, maxsize, fmt, unboundop);
+    int64_t qid = queue_create(&_globals.queues, maxsize, ordered,
+                               fmt, unboundop);
     if (qid < 0) {
         (void)handle_queue_error((int)qid, self, qid);
         return NULL;
@@ -1514,11 +3097,14 @@ queuesmod_create(PyObject *self, PyObject *args, PyObject *kwds)
 }
 
 PyDoc_STRVAR(queuesmod_create_doc,
-"create(maxsize, fmt, unboundop) -> qid\n\
+"create(maxsize, fmt, unboundop, *, ordered=False) -> qid\n\
 \n\
 Create a new cross-interpreter queue and return its unique generated ID.\n\
 It is a new reference as though bind() had been called on the queue.\n\
 \n\
+If \"ordered\" is true then items come out in order of priority,\n\
+then deadline, rather than in the order they were added.\n\
+\n\
 The caller is responsible for calling destroy() for the new queue\n\
 before the runtime is finalized.");
 
@@ -1586,14 +3172,21 @@ Each corresponding default format is also included.");
 static PyObject *
 queuesmod_put(PyObject *self, PyObject *args, PyObject *kwds)
 {
-    static char *kwlist[] = {"qid", "obj", "fmt", "unboundop", NULL};
+    static char *kwlist[] = {"qid", "obj", "fmt", "unboundop",
+                             "blocking", "timeout", "priority", "deadline",
+                             NULL};
     qidarg_converter_data qidarg = {0};
     PyObject *obj;
     int fmt;
     int unboundop;
-    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O&Oii:put", kwlist,
+    int blocking = 0;
+    PyObject *timeout_obj = NULL;
+    PyObject *priority_obj = NULL;
+    PyObject *deadline_obj = NULL;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O&Oii|$pOOO:put", kwlist,
                                      qidarg_converter, &qidarg, &obj, &fmt,
-                                     &unboundop))
+                                     &unboundop, &blocking, &timeout_obj,
+                                     &priority_obj, &deadline_obj))
     {
         return NULL;
     }
@@ -1603,9 +3196,19 @@ queuesmod_put(PyObject *self, PyObject *args, PyObject *kwds)
                      "unsupported unboundop %d", unboundop);
         return NULL;
     }
+    PY_TIMEOUT_T timeout;
+    if (PyThread_ParseTimeoutArg(timeout_obj, blocking, &timeout) < 0) {
+        return NULL;
+    }
+    _queueitemkey key;
+    int haskey = parse_item_key(priority_obj, deadline_obj, &key);
+    if (haskey < 0) {
+        return NULL;
+    }
 
     /* Queue up the object. */
-    int err = queue_put(&_globals.queues, qid, obj, fmt, unboundop);
+    int err = queue_put(&_globals.queues, qid, obj, fmt, unboundop,
+                        haskey ? &key : NULL, timeout);
     // This is the only place that raises QueueFull.
     if (handle_queue_error(err, self, qid)) {
         return NULL;
@@ -1615,25 +3218,46 @@ queuesmod_put(PyObject *self, PyObject *args, PyObject *kwds)
 }
 
 PyDoc_STRVAR(queuesmod_put_doc,
-"put(qid, obj, fmt)\n\
+"put(qid, obj, fmt, unboundop, *, blocking=False, timeout=None,\n\
+    priority=None, deadline=None)\n\
+\n\
+Add the object's data to the queue.\n\
 \n\
-Add the object's data to the queue.");
+If the queue is full then raise QueueFull, unless \"blocking\" is true.\n\
+In that case wait (without the GIL) until there is space in the queue\n\
+or the timeout (in seconds) expires.\n\
+\n\
+The priority (an int, lowest first, default 0) and the deadline\n\
+(in seconds, on the time.monotonic() clock, earliest first) are only\n\
+allowed for ordered queues.");
 
 static PyObject *
 queuesmod_get(PyObject *self, PyObject *args, PyObject *kwds)
 {
-    static char *kwlist[] = {"qid", NULL};
+    static char *kwlist[] = {"qid", "blocking", "timeout", "view", NULL};
     qidarg_converter_data qidarg = {0};
-    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O&:get", kwlist,
-                                     qidarg_converter, &qidarg)) {
+    int blocking = 0;
+    PyObject *timeout_obj = NULL;
+    int view = 0;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O&|$pOp:get", kwlist,
+                                     qidarg_converter, &qidarg,
+                                     &blocking, &timeout_obj, &view)) {
         return NULL;
     }
     int64_t qid = qidarg.id;
+    PY_TIMEOUT_T timeout;
+    if (PyThread_ParseTimeoutArg(timeout_obj, blocking, &timeout) < 0) {
+        return NULL;
+    }
 
     PyObject *obj = NULL;
     int fmt = 0;
     int unboundop = 0;
-    int err = queue_get(&_globals.queues, qid, &obj, &fmt, &unboundop);
+    PyTypeObject *viewtype = view
+        ? get_module_state(self)->BytesViewType
+        : NULL;
+    int err = queue_get(&_globals.queues, qid, viewtype,
+                        &obj, &fmt, &unboundop, timeout);
     // This is the only place that raises QueueEmpty.
     if (handle_queue_error(err, self, qid)) {
         return NULL;
@@ -1648,12 +3272,136 @@ queuesmod_get(PyObject *self, PyObject *args, PyObject *kwds)
 }
 
 PyDoc_STRVAR(queuesmod_get_doc,
-"get(qid) -> (obj, fmt)\n\
+"get(qid, *, blocking=False, timeout=None, view=False) -> (obj, fmt)\n\
 \n\
 Return a new object from the data at the front of the queue.\n\
 The object's format is also returned.\n\
 \n\
-If there is nothing to receive then raise QueueEmpty.");
+If there is nothing to receive then raise QueueEmpty, unless\n\
+\"blocking\" is true.  In that case wait (without the GIL) until\n\
+an item is added or the timeout (in seconds) expires.\n\
+\n\
+If \"view\" is true then a bytes object is returned as a read-only\n\
+memoryview.  If the bytes were put by the current interpreter then\n\
+the view is of the original object, which is kept alive until the\n\
+view is released, instead of a copy.");
+
+static PyObject *
+queuesmod_put_many(PyObject *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"qid", "objs", "fmt", "unboundop",
+                             "blocking", "timeout", "priority", "deadline",
+                             NULL};
+    qidarg_converter_data qidarg = {0};
+    PyObject *objs;
+    int fmt;
+    int unboundop;
+    int blocking = 0;
+    PyObject *timeout_obj = NULL;
+    PyObject *priority_obj = NULL;
+    PyObject *deadline_obj = NULL;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O&Oii|$pOOO:put_many",
+                                     kwlist,
+                                     qidarg_converter, &qidarg, &objs, &fmt,
+                                     &unboundop, &blocking, &timeout_obj,
+                                     &priority_obj, &deadline_obj))
+    {
+        return NULL;
+    }
+    int64_t qid = qidarg.id;
+    if (!check_unbound(unboundop)) {
+        PyErr_Format(PyExc_ValueError,
+                     "unsupported unboundop %d", unboundop);
+        return NULL;
+    }
+    PY_TIMEOUT_T timeout;
+    if (PyThread_ParseTimeoutArg(timeout_obj, blocking, &timeout) < 0) {
+        return NULL;
+    }
+    _queueitemkey key;
+    int haskey = parse_item_key(priority_obj, deadline_obj, &key);
+    if (haskey < 0) {
+        return NULL;
+    }
+    PyObject *seq = PySequence_Fast(objs, "expected an iterable of objects");
+    if (seq == NULL) {
+        return NULL;
+    }
+
+    /* Queue up the objects. */
+    Py_ssize_t added = 0;
+    int err = queue_put_many(&_globals.queues, qid, seq, fmt, unboundop,
+                             haskey ? &key : NULL, timeout, &added);
+    Py_DECREF(seq);
+    if (handle_queue_error(err, self, qid)) {
+        return NULL;
+    }
+
+    return PyLong_FromSsize_t(added);
+}
+
+PyDoc_STRVAR(queuesmod_put_many_doc,
+"put_many(qid, objs, fmt, unboundop, *, blocking=False, timeout=None,\n\
+         priority=None, deadline=None) -> count\n\
+\n\
+Add each object's data to the queue, in order, under a single\n\
+acquisition of the queue's lock (unless waiting for space).\n\
+\n\
+Return the number of objects added.  Fewer than all of them are added\n\
+only if the queue fills up and the timeout expires (or \"blocking\"\n\
+is false).  If none could be added then raise QueueFull.\n\
+\n\
+The priority and deadline apply to all the objects, as for put().");
+
+static PyObject *
+queuesmod_get_many(PyObject *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"qid", "max_items", "blocking", "timeout",
+                             "view", NULL};
+    qidarg_converter_data qidarg = {0};
+    Py_ssize_t max_items;
+    int blocking = 0;
+    PyObject *timeout_obj = NULL;
+    int view = 0;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O&n|$pOp:get_many", kwlist,
+                                     qidarg_converter, &qidarg, &max_items,
+                                     &blocking, &timeout_obj, &view)) {
+        return NULL;
+    }
+    int64_t qid = qidarg.id;
+    if (max_items <= 0) {
+        PyErr_Format(PyExc_ValueError,
+                     "max_items must be positive, got %zd", max_items);
+        return NULL;
+    }
+    PY_TIMEOUT_T timeout;
+    if (PyThread_ParseTimeoutArg(timeout_obj, blocking, &timeout) < 0) {
+        return NULL;
+    }
+
+    PyTypeObject *viewtype = view
+        ? get_module_state(self)->BytesViewType
+        : NULL;
+    PyObject *items = NULL;
+    int err = queue_get_many(&_globals.queues, qid, max_items, viewtype,
+                             timeout, &items);
+    if (handle_queue_error(err, self, qid)) {
+        return NULL;
+    }
+    return items;
+}
+
+PyDoc_STRVAR(queuesmod_get_many_doc,
+"get_many(qid, max_items, *, blocking=False, timeout=None, view=False)\n\
+    -> [(obj, fmt)]\n\
+\n\
+Return new objects from the data at the front of the queue, in order,\n\
+popped under a single acquisition of the queue's lock (unless waiting\n\
+for more).  Each item is the same as what get() returns.\n\
+\n\
+If \"blocking\" is true then wait until there are \"max_items\" or\n\
+the timeout expires, and return what there is.  If there is nothing\n\
+to receive then raise QueueEmpty.");
 
 static PyObject *
 queuesmod_bind(PyObject *self, PyObject *args, PyObject *kwds)
@@ -1758,7 +3506,7 @@ queuesmod_get_queue_defaults(PyObject *self, PyObject *args, PyObject *kwds)
     }
     int fmt = queue->defaults.fmt;
     int unboundop = queue->defaults.unboundop;
-    _queue_unmark_waiter(queue, _globals.queues.mutex);
+    _queue_unmark_waiter(queue);
 
     PyObject *defaults = Py_BuildValue("ii", fmt, unboundop);
     return defaults;
@@ -1823,6 +3571,267 @@ PyDoc_STRVAR(queuesmod_get_count_doc,
 \n\
 Return the number of items in the queue.");
 
+PyDoc_STRVAR(queue_stats_doc,
+"QueueStats\n\
+\n\
+A named tuple of a queue's statistics.\n\
+\n\
+The wait-time histograms only count calls that had to block.\n\
+Their buckets are <10us, <100us, <1ms, <10ms, <100ms, <1s, <10s,\n\
+and >=10s.");
+
+static PyStructSequence_Field queue_stats_fields[] = {
+    {"count", "items currently in the queue"},
+    {"peak_count", "most items the queue has held at once"},
+    {"num_puts", "items added to the queue"},
+    {"num_gets", "items removed from the queue"},
+    {"bytes_put", "total size of the bytes-like items added (e.g. pickled)"},
+    {"num_dropped", "items removed because their interpreter was destroyed"},
+    {"num_blocked_getters", "threads currently blocked waiting for items"},
+    {"num_blocked_putters", "threads currently blocked waiting for space"},
+    {"put_waits", "histogram of how long blocking puts waited"},
+    {"get_waits", "histogram of how long blocking gets waited"},
+    {0}
+};
+
+static PyStructSequence_Desc queue_stats_desc = {
+    .name = MODULE_NAME_STR ".QueueStats",
+    .doc = queue_stats_doc,
+    .fields = queue_stats_fields,
+    .n_in_sequence = 10,
+};
+
+static PyObject *
+_new_wait_histogram(int64_t *histogram)
+{
+    PyObject *res = PyTuple_New(QUEUE_NUM_WAIT_BUCKETS);
+    if (res == NULL) {
+        return NULL;
+    }
+    for (int i = 0; i < QUEUE_NUM_WAIT_BUCKETS; i++) {
+        PyObject *count = PyLong_FromLongLong(histogram[i]);
+        if (count == NULL) {
+            Py_DECREF(res);
+            return NULL;
+        }
+        PyTuple_SET_ITEM(res, i, count);
+    }
+    return res;
+}
+
+static PyObject *
+new_queue_stats(PyObject *mod, struct queue_stats *stats)
+{
+    module_state *state = get_module_state(mod);
+    assert(state->QueueStatsType != NULL);
+    PyObject *self = PyStructSequence_New(state->QueueStatsType);
+    if (self == NULL) {
+        return NULL;
+    }
+
+    int pos = 0;
+#define SET_ITEM(obj) \
+    do { \
+        PyObject *item = obj; \
+        if (item == NULL) { \
+            Py_CLEAR(self); \
+            return NULL; \
+        } \
+        PyStructSequence_SET_ITEM(self, pos++, item); \
+    } while(0)
+#define SET_COUNT(val) SET_ITEM(PyLong_FromLongLong(val))
+    SET_COUNT(stats->count);
+    SET_COUNT(stats->stats.peak_count);
+    SET_COUNT(stats->stats.puts);
+    SET_COUNT(stats->stats.gets);
+    SET_COUNT(stats->stats.bytes_put);
+    SET_COUNT(stats->stats.dropped);
+    SET_COUNT(stats->num_getters);
+    SET_COUNT(stats->num_putters);
+    SET_ITEM(_new_wait_histogram(stats->stats.put_waits));
+    SET_ITEM(_new_wait_histogram(stats->stats.get_waits));
+#undef SET_COUNT
+#undef SET_ITEM
+    assert(!PyErr_Occurred());
+    return self;
+}
+
+static PyObject *
+queuesmod_get_stats(PyObject *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"qid", NULL};
+    qidarg_converter_data qidarg = {0};
+    if (!PyArg_ParseTupleAndKeywords(args, kwds,
+                                     "O&:get_stats", kwlist,
+                                     qidarg_converter, &qidarg)) {
+        return NULL;
+    }
+    int64_t qid = qidarg.id;
+
+    struct queue_stats stats = {0};
+    int err = queue_get_stats(&_globals.queues, qid, &stats);
+    if (handle_queue_error(err, self, qid)) {
+        return NULL;
+    }
+    return new_queue_stats(self, &stats);
+}
+
+PyDoc_STRVAR(queuesmod_get_stats_doc,
+"get_stats(qid) -> QueueStats\n\
+\n\
+Return the queue's statistics.");
+
+static PyObject *
+queuesmod_poll(PyObject *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"items", "blocking", "timeout", NULL};
+    PyObject *items_obj;
+    int blocking = 0;
+    PyObject *timeout_obj = NULL;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O|$pO:poll", kwlist,
+                                     &items_obj,
+                                     &blocking, &timeout_obj)) {
+        return NULL;
+    }
+    PY_TIMEOUT_T timeout;
+    if (PyThread_ParseTimeoutArg(timeout_obj, blocking, &timeout) < 0) {
+        return NULL;
+    }
+
+    PyObject *seq = PySequence_Fast(items_obj, "expected a sequence of items");
+    if (seq == NULL) {
+        return NULL;
+    }
+    PyObject *res = NULL;
+    Py_ssize_t count = PySequence_Fast_GET_SIZE(seq);
+    int64_t *qids = PyMem_Malloc(sizeof(int64_t) * (count + 1));
+    int *events = PyMem_Malloc(sizeof(int) * (count + 1));
+    int *revents = PyMem_Malloc(sizeof(int) * (count + 1));
+    if (qids == NULL || events == NULL || revents == NULL) {
+        PyErr_NoMemory();
+        goto finally;
+    }
+    for (Py_ssize_t i = 0; i < count; i++) {
+        PyObject *item = PySequence_Fast_GET_ITEM(seq, i);
+        qidarg_converter_data qidarg = {0};
+        if (!PyArg_ParseTuple(item, "O&i:poll", qidarg_converter, &qidarg,
+                              &events[i]))
+        {
+            goto finally;
+        }
+        if (events[i] <= 0
+            || (events[i] & ~(QUEUE_EVENT_GET | QUEUE_EVENT_PUT)) != 0)
+        {
+            PyErr_Format(PyExc_ValueError,
+                         "invalid events %d for queue %lld",
+                         events[i], (long long)qidarg.id);
+            goto finally;
+        }
+        qids[i] = qidarg.id;
+    }
+
+    Py_ssize_t failed = -1;
+    int err = queue_poll(&_globals.queues, qids, events, count, timeout,
+                         revents, &failed);
+    if (handle_queue_error(err, self, failed < 0 ? -1 : qids[failed])) {
+        goto finally;
+    }
+
+    res = PyList_New(0);
+    if (res == NULL) {
+        goto finally;
+    }
+    for (Py_ssize_t i = 0; i < count; i++) {
+        if (revents[i] == 0) {
+            continue;
+        }
+        PyObject *ready = Py_BuildValue("Li", qids[i], revents[i]);
+        if (ready == NULL || PyList_Append(res, ready) < 0) {
+            Py_XDECREF(ready);
+            Py_CLEAR(res);
+            goto finally;
+        }
+        Py_DECREF(ready);
+    }
+
+finally:
+    PyMem_Free(qids);
+    PyMem_Free(events);
+    PyMem_Free(revents);
+    Py_DECREF(seq);
+    return res;
+}
+
+PyDoc_STRVAR(queuesmod_poll_doc,
+"poll(items, *, blocking=False, timeout=None) -> [(qid, events)]\n\
+\n\
+Return the (qid, events) pair of each queue that is ready, where\n\
+\"items\" is a sequence of (qid, events) pairs.  The events are\n\
+a bitmask: 1 means the queue has items and 2 means it has space.\n\
+\n\
+If no queue is ready then return an empty list, unless \"blocking\"\n\
+is true.  In that case wait (without the GIL) until one is ready\n\
+or the timeout (in seconds) expires.");
+
+static PyObject *
+queuesmod_watch(PyObject *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"qid", "fd", NULL};
+    qidarg_converter_data qidarg = {0};
+    int fd;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds,
+                                     "O&i:watch", kwlist,
+                                     qidarg_converter, &qidarg, &fd)) {
+        return NULL;
+    }
+    int64_t qid = qidarg.id;
+    if (fd < 0) {
+        PyErr_Format(PyExc_ValueError, "invalid fd %d", fd);
+        return NULL;
+    }
+
+    int err = queue_watch(&_globals.queues, qid, fd);
+    if (handle_queue_error(err, self, qid)) {
+        return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(queuesmod_watch_doc,
+"watch(qid, fd)\n\
+\n\
+Write a byte to the file descriptor whenever items are added to\n\
+or removed from the queue, or the queue is destroyed.  If the queue\n\
+isn't empty then a byte is written right away.\n\
+\n\
+The fd should be non-blocking (e.g. the write end of a pipe).\n\
+It is unregistered if the current interpreter is destroyed.");
+
+static PyObject *
+queuesmod_unwatch(PyObject *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"qid", "fd", NULL};
+    qidarg_converter_data qidarg = {0};
+    int fd;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds,
+                                     "O&i:unwatch", kwlist,
+                                     qidarg_converter, &qidarg, &fd)) {
+        return NULL;
+    }
+    int64_t qid = qidarg.id;
+
+    int err = queue_unwatch(&_globals.queues, qid, fd);
+    if (handle_queue_error(err, self, qid)) {
+        return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(queuesmod_unwatch_doc,
+"unwatch(qid, fd)\n\
+\n\
+Stop writing to the file descriptor when the queue changes.");
+
 static PyObject *
 queuesmod__register_heap_types(PyObject *self, PyObject *args, PyObject *kwds)
 {
@@ -1874,6 +3883,12 @@ static PyMethodDef module_functions[] = {
      METH_VARARGS | METH_KEYWORDS, queuesmod_put_doc},
     {"get",                        _PyCFunction_CAST(queuesmod_get),
      METH_VARARGS | METH_KEYWORDS, queuesmod_get_doc},
+    {"put_many",                   _PyCFunction_CAST(queuesmod_put_many),
+     METH_VARARGS | METH_KEYWORDS, queuesmod_put_many_doc},
+    {"get_many",                   _PyCFunction_CAST(queuesmod_get_many),
+     METH_VARARGS | METH_KEYWORDS, queuesmod_get_many_doc},
+    {"poll",                       _PyCFunction_CAST(queuesmod_poll),
+     METH_VARARGS | METH_KEYWORDS, queuesmod_poll_doc},
     {"bind",                       _PyCFunction_CAST(queuesmod_bind),
      METH_VARARGS | METH_KEYWORDS, queuesmod_bind_doc},
     {"release",                    _PyCFunction_CAST(queuesmod_release),
@@ -1886,6 +3901,12 @@ static PyMethodDef module_functions[] = {
      METH_VARARGS | METH_KEYWORDS, queuesmod_is_full_doc},
     {"get_count",                  _PyCFunction_CAST(queuesmod_get_count),
      METH_VARARGS | METH_KEYWORDS, queuesmod_get_count_doc},
+    {"get_stats",                  _PyCFunction_CAST(queuesmod_get_stats),
+     METH_VARARGS | METH_KEYWORDS, queuesmod_get_stats_doc},
+    {"watch",                      _PyCFunction_CAST(queuesmod_watch),
+     METH_VARARGS | METH_KEYWORDS, queuesmod_watch_doc},
+    {"unwatch",                    _PyCFunction_CAST(queuesmod_unwatch),
+     METH_VARARGS | METH_KEYWORDS, queuesmod_unwatch_doc},
     {"_register_heap_types",       _PyCFunction_CAST(queuesmod__register_heap_types),
      METH_VARARGS | METH_KEYWORDS, NULL},
 
@@ -1912,6 +3933,28 @@ module_exec(PyObject *mod)
         goto error;
     }
 
+    /* Add other types */
+
+    // QueueStats
+    module_state *state = get_module_state(mod);
+    state->QueueStatsType = PyStructSequence_NewType(&queue_stats_desc);
+    if (state->QueueStatsType == NULL) {
+        goto error;
+    }
+    if (PyModule_AddType(mod, state->QueueStatsType) < 0) {
+        goto error;
+    }
+
+    // CrossInterpreterBytesView
+    state->BytesViewType = (PyTypeObject *)PyType_FromModuleAndSpec(
+                mod, &BytesViewType_spec, NULL);
+    if (state->BytesViewType == NULL) {
+        goto error;
+    }
+    if (PyModule_AddType(mod, state->BytesViewType) < 0) {
+        goto error;
+    }
+
     /* Make sure queues drop objects owned by this interpreter. */
     PyInterpreterState *interp = _get_current_interp();
     PyUnstable_AtExit(interp, clear_interpreter, (void *)interp);
@@ -20,6 +20,8 @@
 
 // cpython/pytime.h
 #define PyTime_t _PyTime_t
+#define PyTime_MIN _PyTime_MIN
+#define PyTime_MAX _PyTime_MAX
 
 // pycore_typeobject.h
 #define _PyStaticType_FiniBuiltin _PyStaticType_Dealloc
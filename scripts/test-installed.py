@@ -8,4 +8,305 @@ print('importing concurrent.futures.InterpreterPoolExecutor')
 from interpreters_backport.concurrent.futures import InterpreterPoolExecutor
 
 
-# XXX Actually exercize the modules?
+import asyncio
+import gc
+import threading
+import time
+
+
+# How long to wait for something that should happen right away.
+TIMEOUT = 10
+
+
+def run_blocked(func, wake):
+    """Call func() in a thread, then wake() once it is blocked.
+
+    Return what func() returned or raised.
+    """
+    result = []
+    def task():
+        try:
+            result.append(func())
+        except BaseException as exc:
+            result.append(exc)
+    t = threading.Thread(target=task)
+    t.start()
+    time.sleep(0.1)
+    assert not result, result
+    wake()
+    t.join(TIMEOUT)
+    assert not t.is_alive(), 'still blocked'
+    return result[0]
+
+
+def add(a, b=0):
+    return a + b
+
+
+def spam(*args, **kwargs):
+    return (args, kwargs)
+
+
+#############################
+# queues
+
+print('testing queues: get() and put()')
+queue = queues.create(1)
+queue.put('spam')
+try:
+    queue.put('eggs', timeout=0.01)
+except queues.QueueFull:
+    pass
+else:
+    raise AssertionError('put() did not time out')
+assert queue.get() == 'spam'
+try:
+    queue.get(timeout=0.01)
+except queues.QueueEmpty:
+    pass
+else:
+    raise AssertionError('get() did not time out')
+res = run_blocked(queue.get, lambda: queue.put('ham'))
+assert res == 'ham', res
+
+print('testing queues: get_many() and put_many()')
+queue = queues.create()
+assert queue.put_many([1, 2, 3]) == 3
+assert queue.get_many(2) == [1, 2]
+assert queue.get_many(2, timeout=0.01) == [3]
+
+print('testing queues: priority order')
+queue = queues.create(order='priority')
+queue.put('low', priority=2)
+queue.put('high', priority=1)
+queue.put('later', priority=1, deadline=2)
+queue.put('sooner', priority=1, deadline=1)
+assert [queue.get() for _ in range(4)] == ['sooner', 'later', 'high', 'low']
+
+print('testing queues: out-of-band buffers')
+queue = queues.create(outofband=True)
+data = bytearray(range(256)) * 64
+queue.put(data)
+assert queue.get() == data
+
+print('testing queues: get(view=True)')
+queue = queues.create(syncobj=True)
+queue.put(b'spam')
+view = queue.get(view=True)
+assert isinstance(view, memoryview), view
+assert bytes(view) == b'spam'
+
+print('testing queues: stats()')
+queue = queues.create()
+queue.put(1)
+queue.put(2)
+queue.get()
+stats = queue.stats()
+assert stats.count == 1, stats
+assert stats.num_puts == 2, stats
+assert stats.num_gets == 1, stats
+
+print('testing queues: poll() and select()')
+queue1 = queues.create()
+queue2 = queues.create()
+assert queues.select([queue1, queue2], timeout=0.01) == []
+queue2.put(None)
+assert queues.select([queue1, queue2]) == [queue2]
+ready = queues.poll([(queue1, queues.EVENT_GET | queues.EVENT_PUT),
+                     (queue2, queues.EVENT_GET)], timeout=0)
+assert ready == [(queue1, queues.EVENT_PUT), (queue2, queues.EVENT_GET)], ready
+
+print('testing queues: aget() and aput()')
+async def main():
+    queue = queues.create(1)
+    await queue.aput('spam')
+    try:
+        await queue.aput('eggs', timeout=0.01)
+    except queues.QueueFull:
+        pass
+    else:
+        raise AssertionError('aput() did not time out')
+    assert await queue.aget() == 'spam'
+    getting = asyncio.create_task(queue.aget())
+    await asyncio.sleep(0.01)
+    await queue.aput('ham')
+    assert await asyncio.wait_for(getting, TIMEOUT) == 'ham'
+asyncio.run(main())
+
+print('testing queues: destroy while blocked')
+queue = queues.create()
+res = run_blocked(queue.get, lambda: queues._queues.destroy(queue.id))
+assert isinstance(res, queues.QueueNotFoundError), res
+
+
+#############################
+# channels
+
+print('testing channels: recv() and send()')
+rch, sch = channels.create()
+try:
+    rch.recv(timeout=0.01)
+except TimeoutError:
+    pass
+else:
+    raise AssertionError('recv() did not time out')
+res = run_blocked(rch.recv, lambda: sch.send_nowait('spam'))
+assert res == 'spam', res
+
+print('testing channels: maxsize')
+rch, sch = channels.create(maxsize=1)
+sch.send_nowait(1)
+try:
+    sch.send_nowait(2)
+except channels.ChannelFullError:
+    pass
+else:
+    raise AssertionError('send_nowait() did not fail')
+assert rch.recv() == 1
+
+print('testing channels: recv_many() and send_many()')
+rch, sch = channels.create()
+assert sch.send_many([1, 2, 3]) == 3
+assert rch.recv_many(2) == [1, 2]
+assert rch.recv_many(2, timeout=0.01) == [3]
+
+print('testing channels: select()')
+rch1, sch1 = channels.create()
+rch2, sch2 = channels.create(maxsize=1)
+assert channels.select([rch1, rch2], timeout=0.01) is None
+sch2.send_nowait('spam')
+assert channels.select([rch1, rch2]) == (rch2, 'spam')
+assert channels.select(send=[(sch2, 'eggs')]) == (sch2, None)
+assert channels.select(send=[(sch2, 'ham')], timeout=0.01) is None
+assert rch2.recv() == 'eggs'
+
+print('testing channels: stats()')
+rch, sch = channels.create()
+sch.send_nowait(1)
+sch.send_nowait(2)
+rch.recv()
+info = channels.stats()[int(rch.id)]
+assert info.count == 1, info
+assert info.num_sent == 2, info
+assert info.num_received == 1, info
+
+print('testing channels: arecv() and asend()')
+async def main():
+    rch, sch = channels.create()
+    try:
+        await rch.arecv(timeout=0.01)
+    except TimeoutError:
+        pass
+    else:
+        raise AssertionError('arecv() did not time out')
+    sending = asyncio.create_task(sch.asend('spam'))
+    assert await asyncio.wait_for(rch.arecv(), TIMEOUT) == 'spam'
+    await asyncio.wait_for(sending, TIMEOUT)
+asyncio.run(main())
+
+print('testing channels: BufferPool')
+pool = channels.BufferPool(16, 1)
+rch, sch = channels.create()
+buf = pool.acquire()
+assert pool.available == 0
+try:
+    pool.acquire(blocking=False)
+except BufferError:
+    pass
+else:
+    raise AssertionError('acquire() did not fail')
+memoryview(buf)[:4] = b'spam'
+sch.send_buffer_nowait(buf)
+assert buf.sent
+received = rch.recv()
+assert bytes(memoryview(received)[:4]) == b'spam'
+del buf, received
+gc.collect()
+assert pool.available == 1
+
+print('testing channels: destroy while blocked')
+rch, sch = channels.create()
+res = run_blocked(rch.recv, lambda: channels._channels.destroy(rch.id))
+assert isinstance(res, (channels.ChannelClosedError,
+                        channels.ChannelNotFoundError)), res
+rch, sch = channels.create()
+res = run_blocked(lambda: sch.send('spam'),
+                  lambda: channels._channels.destroy(sch.id))
+assert isinstance(res, (channels.ChannelClosedError,
+                        channels.ChannelNotFoundError)), res
+# blocked on a full channel
+for name, obj in [('send', 'eggs'), ('send_many', ['eggs'])]:
+    rch, sch = channels.create(maxsize=1)
+    sch.send_nowait('spam')
+    send = getattr(sch, name)
+    res = run_blocked(lambda: send(obj),
+                      lambda: channels._channels.destroy(sch.id))
+    assert isinstance(res, (channels.ChannelClosedError,
+                            channels.ChannelNotFoundError)), res
+
+
+#############################
+# interpreters
+
+print('testing interpreters: call()')
+interp = interpreters.create()
+assert interp.call(add, 1, b=2) == 3
+# These are pickled.
+assert interp.call(spam, [1], x={}) == (([1],), {'x': {}})
+
+print('testing interpreters: cache_thread_states()')
+interp.cache_thread_states()
+for _ in range(3):
+    interp.exec('x = 1')
+interp.cache_thread_states(False)
+
+print('testing interpreters: code_cache_info()')
+interp.exec('y = 2')
+before = interp.code_cache_info()
+interp.exec('y = 2')
+after = interp.code_cache_info()
+assert after.hits == before.hits + 1, (before, after)
+interp.set_code_cache_size(0)
+assert interp.code_cache_info().maxsize == 0
+
+print('testing interpreters: submit() and call_async()')
+assert interp.submit(add, 1, 2).result(TIMEOUT) == 3
+async def main():
+    return await interp.call_async(add, 3, 4)
+assert asyncio.run(main()) == 7
+interp.close()
+# close() from one of the submit() threads
+interp = interpreters.create()
+closed = threading.Event()
+def close(fut):
+    interp.close()
+    closed.set()
+interp.submit(add, 1).add_done_callback(close)
+assert closed.wait(TIMEOUT)
+
+print('testing interpreters: create(config)')
+interp = interpreters.create(interpreters.new_config('legacy'))
+assert not interp.config.own_gil
+interp.close()
+interp = interpreters.create({'allow_threads': False})
+assert interp.config.own_gil
+assert not interp.config.allow_threads
+interp.close()
+config = interpreters.resolve_config({'own_gil': False})
+assert not config.own_gil
+
+print('testing interpreters: InterpreterPool')
+try:
+    interpreters.InterpreterPool(preload=['os; import sys'])
+except ValueError:
+    pass
+else:
+    raise AssertionError('preload name not checked')
+with interpreters.InterpreterPool(1, preload=['json']) as pool:
+    interp = pool.get()
+    interp.exec('import sys; assert "json" in sys.modules')
+    interp.close()
+
+print('testing InterpreterPoolExecutor: config')
+with InterpreterPoolExecutor(1, config='isolated') as executor:
+    executor.submit('x = 1').result(TIMEOUT)
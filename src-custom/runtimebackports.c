@@ -380,6 +380,12 @@ PyTime_TimeRaw(PyTime_t *result)
     return 0;
 }
 
+double
+PyTime_AsSecondsDouble(PyTime_t t)
+{
+    return _PyTime_AsSecondsDouble(t);
+}
+
 
 //*************************************
 // Objects/dictobject.c
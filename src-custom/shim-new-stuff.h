@@ -44,6 +44,9 @@
 // pyport.h
 #define _Py_FALLTHROUGH do { } while (0)
 
+// cpython/pystate.h
+#define PyThreadState_GetUnchecked _PyThreadState_UncheckedGet
+
 // pymacro.h
 #define _Py_CONTAINER_OF(ptr, type, member) \
     (type*)((char*)ptr - offsetof(type, member))
@@ -142,6 +145,7 @@ extern PyLockStatus PyThread_acquire_lock_timed_with_retries(PyThread_type_lock,
 // pycore_pytime.h
 extern int PyTime_MonotonicRaw(PyTime_t *);
 extern int PyTime_TimeRaw(PyTime_t *);
+extern double PyTime_AsSecondsDouble(PyTime_t);
 
 // pycore_pybuffer.h
 // XXX Needs to add larger pending calls queue?
@@ -9,10 +9,12 @@
 #include "pycore_crossinterp.h"   // _PyXIData_t
 #include "pycore_interp.h"        // _PyInterpreterState_LookUpID()
 #include "pycore_pystate.h"       // _PyInterpreterState_GetIDObject()
+#include "pycore_time.h"          // _PyDeadline_Init()
 
 #ifdef MS_WINDOWS
 #define WIN32_LEAN_AND_MEAN
 #include <windows.h>        // SwitchToThread()
+#include <io.h>             // _write()
 #elif defined(HAVE_SCHED_H)
 #include <sched.h>          // sched_yield()
 #endif
@@ -31,10 +33,13 @@ _globals (static struct globals):
     mutex (PyMutex)
     module_count (int)
     channels (struct _channels):
-        numopen (int64_t)
         next_id; (int64_t)
         mutex (PyThread_type_lock)
-        head (linked list of struct _channelref *):
+        stripes (array of struct _channelsstripe):
+          mutex (PyThread_type_lock)
+          count (int64_t)
+          numbuckets (Py_ssize_t)
+          buckets (array of linked list of struct _channelref *):
             cid (int64_t)
             objcount (Py_ssize_t)
             next (struct _channelref *):
@@ -42,6 +47,22 @@ _globals (static struct globals):
             chan (struct _channel *):
                 open (int)
                 mutex (PyThread_type_lock)
+                maxsize (Py_ssize_t)
+                num_waiters (Py_ssize_t)
+                recvwaiters (struct _channelwaiters):
+                    first (struct _channelwaiter *):
+                        mutex (PyThread_type_lock)
+                        notified (int)
+                        next (struct _channelwaiter *)
+                    last (struct _channelwaiter *)
+                sendwaiters (struct _channelwaiters):
+                    ...
+                selects (linked list of struct _channelselect *):
+                    selector (struct _channelselector *):
+                        mutex (PyThread_type_lock)
+                        signaled (int)
+                    chan (struct _channel *)
+                    next (struct _channelselect *)
                 closing (struct _channel_closing *):
                     ref (struct _channelref *):
                         ...
@@ -70,7 +91,15 @@ _globals (static struct globals):
 
 The above state includes the following allocations by the module:
 
-* 1 top-level mutex (to protect the rest of the state)
+* 1 top-level mutex (to protect the next channel ID)
+* for each buffer pool:
+   * 1 struct _bufferpool
+   * 1 mutex
+   * 1 block of buffer memory
+   * 1 array of struct _bufferslot
+* for each registry stripe:
+   * 1 mutex
+   * 1 array of buckets
 * for each channel:
    * 1 struct _channelref
    * 1 struct _channel
@@ -207,7 +236,7 @@ wait_for_lock(PyThread_type_lock mutex, PY_TIMEOUT_T timeout)
     }
     else if (res == PY_LOCK_FAILURE) {
         assert(!PyErr_Occurred());
-        assert(timeout > 0);
+        assert(timeout >= 0);
         PyErr_SetString(PyExc_TimeoutError, "timed out");
         return -1;
     }
@@ -227,6 +256,9 @@ typedef struct {
     /* heap types */
     PyTypeObject *ChannelInfoType;
     PyTypeObject *ChannelIDType;
+    PyTypeObject *BufferPoolType;
+    PyTypeObject *PooledBufferType;
+    PyTypeObject *PendingSendType;
 
     /* exceptions */
     PyObject *ChannelError;
@@ -234,6 +266,7 @@ typedef struct {
     PyObject *ChannelClosedError;
     PyObject *ChannelEmptyError;
     PyObject *ChannelNotEmptyError;
+    PyObject *ChannelFullError;
 } module_state;
 
 static inline module_state *
@@ -270,6 +303,9 @@ traverse_module_state(module_state *state, visitproc visit, void *arg)
     /* heap types */
     Py_VISIT(state->ChannelInfoType);
     Py_VISIT(state->ChannelIDType);
+    Py_VISIT(state->BufferPoolType);
+    Py_VISIT(state->PooledBufferType);
+    Py_VISIT(state->PendingSendType);
 
     /* exceptions */
     Py_VISIT(state->ChannelError);
@@ -277,6 +313,7 @@ traverse_module_state(module_state *state, visitproc visit, void *arg)
     Py_VISIT(state->ChannelClosedError);
     Py_VISIT(state->ChannelEmptyError);
     Py_VISIT(state->ChannelNotEmptyError);
+    Py_VISIT(state->ChannelFullError);
 
     return 0;
 }
@@ -299,6 +336,10 @@ clear_xid_types(module_state *state)
         (void)clear_xid_class(state->ChannelIDType);
         Py_CLEAR(state->ChannelIDType);
     }
+    if (state->PooledBufferType != NULL) {
+        (void)clear_xid_class(state->PooledBufferType);
+        Py_CLEAR(state->PooledBufferType);
+    }
 }
 
 static int
@@ -308,6 +349,8 @@ clear_module_state(module_state *state)
 
     /* heap types */
     Py_CLEAR(state->ChannelInfoType);
+    Py_CLEAR(state->BufferPoolType);
+    Py_CLEAR(state->PendingSendType);
 
     /* exceptions */
     Py_CLEAR(state->ChannelError);
@@ -315,6 +358,7 @@ clear_module_state(module_state *state)
     Py_CLEAR(state->ChannelClosedError);
     Py_CLEAR(state->ChannelEmptyError);
     Py_CLEAR(state->ChannelNotEmptyError);
+    Py_CLEAR(state->ChannelFullError);
 
     return 0;
 }
@@ -338,6 +382,7 @@ clear_module_state(module_state *state)
 #define ERR_CHANNELS_MUTEX_INIT -8
 #define ERR_NO_NEXT_CHANNEL_ID -9
 #define ERR_CHANNEL_CLOSED_WAITING -10
+#define ERR_CHANNEL_FULL -11
 
 static int
 exceptions_init(PyObject *mod)
@@ -366,6 +411,8 @@ exceptions_init(PyObject *mod)
     ADD(ChannelEmptyError, state->ChannelError);
     // An operation tried to close a non-empty channel.
     ADD(ChannelNotEmptyError, state->ChannelError);
+    // An operation tried to push onto a full channel.
+    ADD(ChannelFullError, state->ChannelError);
 #undef ADD
 
     return 0;
@@ -407,6 +454,10 @@ handle_channel_error(int err, PyObject *mod, int64_t cid)
                      "if not empty (try force=True)",
                      cid);
     }
+    else if (err == ERR_CHANNEL_FULL) {
+        PyErr_Format(state->ChannelFullError,
+                     "channel %" PRId64 " is full", cid);
+    }
     else if (err == ERR_CHANNEL_MUTEX_INIT) {
         PyErr_SetString(state->ChannelError,
                         "can't initialize mutex for new channel");
@@ -426,6 +477,23 @@ handle_channel_error(int err, PyObject *mod, int64_t cid)
 }
 
 
+/* readiness notifications */
+
+// Write a byte to the fd, ignoring errors.  If the fd is already full
+// then its owner has yet to drain it, so it will be woken up anyway.
+static void
+_notify_fd(int fd)
+{
+    int saved_errno = errno;
+#ifdef MS_WINDOWS
+    (void)_write(fd, "", 1);
+#else
+    (void)write(fd, "", 1);
+#endif
+    errno = saved_errno;
+}
+
+
 /* the channel queue */
 
 typedef uintptr_t _channelitem_id_t;
@@ -439,7 +507,13 @@ typedef struct wait_info {
         WAITING_RELEASED = 3,
     } status;
     int received;
+    // This is reset to 0 (while holding the channel's lock)
+    // once the item is no longer in the channel's queue.
     _channelitem_id_t itemid;
+    // If set, a byte is written to it once the item is released.
+    int fd;
+    // When the sender started waiting (for space or to be received).
+    PyTime_t since;
 } _waiting_t;
 
 static int
@@ -454,6 +528,7 @@ _waiting_init(_waiting_t *waiting)
     *waiting = (_waiting_t){
         .mutex = mutex,
         .status = WAITING_NO_STATUS,
+        .fd = -1,
     };
     return 0;
 }
@@ -496,6 +571,10 @@ _waiting_release(_waiting_t *waiting, int received)
         assert(received == 1);
         waiting->received = received;
     }
+    if (waiting->fd >= 0) {
+        // This must happen before the sender can see the new status.
+        _notify_fd(waiting->fd);
+    }
     waiting->status = WAITING_RELEASED;
 }
 
@@ -522,6 +601,9 @@ typedef struct _channelitem {
     _PyXIData_t *data;
     _waiting_t *waiting;
     int unboundop;
+    // When the item was added to the queue.
+    PyTime_t queued;
+    struct _channelitem *prev;
     struct _channelitem *next;
 } _channelitem;
 
@@ -531,6 +613,12 @@ _channelitem_ID(_channelitem *item)
     return (_channelitem_id_t)item;
 }
 
+static inline _channelitem *
+_channelitem_from_ID(_channelitem_id_t itemid)
+{
+    return (_channelitem *)itemid;
+}
+
 static void
 _channelitem_init(_channelitem *item,
                   int64_t interpid, _PyXIData_t *data,
@@ -560,11 +648,13 @@ _channelitem_clear_data(_channelitem *item, int removed)
 {
     if (item->data != NULL) {
         // It was allocated in channel_send().
-        (void)_release_xid_data(item->data, XID_IGNORE_EXC & XID_FREE);
+        (void)_release_xid_data(item->data, XID_IGNORE_EXC | XID_FREE);
         item->data = NULL;
     }
 
     if (item->waiting != NULL && removed) {
+        // This must happen before the sender is released.
+        item->waiting->itemid = 0;
         if (item->waiting->status == WAITING_ACQUIRED) {
             _waiting_release(item->waiting, 0);
         }
@@ -575,6 +665,7 @@ _channelitem_clear_data(_channelitem *item, int removed)
 static void
 _channelitem_clear(_channelitem *item)
 {
+    item->prev = NULL;
     item->next = NULL;
     _channelitem_clear_data(item, 1);
 }
@@ -618,6 +709,10 @@ _channelitem_popped(_channelitem *item,
     *p_data = item->data;
     *p_waiting = item->waiting;
     *p_unboundop = item->unboundop;
+    if (item->waiting != NULL) {
+        // The sender can no longer find the item in the queue.
+        item->waiting->itemid = 0;
+    }
     // We clear them here, so they won't be released in _channelitem_clear().
     item->data = NULL;
     item->waiting = NULL;
@@ -704,6 +799,7 @@ _channelqueue_put(_channelqueue *queue,
         queue->first = item;
     }
     else {
+        item->prev = queue->last;
         queue->last->next = item;
     }
     queue->last = item;
@@ -715,6 +811,31 @@ _channelqueue_put(_channelqueue *queue,
     return 0;
 }
 
+// The items are doubly linked, so any item can be unlinked in O(1).
+static void
+_channelqueue_unlink(_channelqueue *queue, _channelitem *item)
+{
+    if (item->prev == NULL) {
+        assert(queue->first == item);
+        queue->first = item->next;
+    }
+    else {
+        assert(item->prev->next == item);
+        item->prev->next = item->next;
+    }
+    if (item->next == NULL) {
+        assert(queue->last == item);
+        queue->last = item->prev;
+    }
+    else {
+        assert(item->next->prev == item);
+        item->next->prev = item->prev;
+    }
+    item->prev = NULL;
+    item->next = NULL;
+    queue->count -= 1;
+}
+
 static int
 _channelqueue_get(_channelqueue *queue,
                   _PyXIData_t **p_data, _waiting_t **p_waiting,
@@ -724,77 +845,27 @@ _channelqueue_get(_channelqueue *queue,
     if (item == NULL) {
         return ERR_CHANNEL_EMPTY;
     }
-    queue->first = item->next;
-    if (queue->last == item) {
-        queue->last = NULL;
-    }
-    queue->count -= 1;
+    _channelqueue_unlink(queue, item);
 
     _channelitem_popped(item, p_data, p_waiting, p_unboundop);
     return 0;
 }
 
-static int
-_channelqueue_find(_channelqueue *queue, _channelitem_id_t itemid,
-                   _channelitem **p_item, _channelitem **p_prev)
-{
-    _channelitem *prev = NULL;
-    _channelitem *item = NULL;
-    if (queue->first != NULL) {
-        if (_channelitem_ID(queue->first) == itemid) {
-            item = queue->first;
-        }
-        else {
-            prev = queue->first;
-            while (prev->next != NULL) {
-                if (_channelitem_ID(prev->next) == itemid) {
-                    item = prev->next;
-                    break;
-                }
-                prev = prev->next;
-            }
-            if (item == NULL) {
-                prev = NULL;
-            }
-        }
-    }
-    if (p_item != NULL) {
-        *p_item = item;
-    }
-    if (p_prev != NULL) {
-        *p_prev = prev;
-    }
-    return (item != NULL);
-}
-
+// The item is found directly from its ID, rather than by searching
+// the queue.  That's only safe because the sender's _waiting_t has its
+// item ID reset when the item is popped or otherwise freed.
 static void
-_channelqueue_remove(_channelqueue *queue, _channelitem_id_t itemid,
+_channelqueue_remove(_channelqueue *queue, _waiting_t *sent,
                      _PyXIData_t **p_data, _waiting_t **p_waiting)
 {
-    _channelitem *prev = NULL;
-    _channelitem *item = NULL;
-    int found = _channelqueue_find(queue, itemid, &item, &prev);
-    if (!found) {
+    _channelitem *item = _channelitem_from_ID(_waiting_get_itemid(sent));
+    if (item == NULL) {
+        // It was already received, etc.
         return;
     }
-
-    assert(item->waiting != NULL);
+    assert(item->waiting == sent);
     assert(!item->waiting->received);
-    if (prev == NULL) {
-        assert(queue->first == item);
-        queue->first = item->next;
-    }
-    else {
-        assert(queue->first != item);
-        assert(prev->next == item);
-        prev->next = item->next;
-    }
-    item->next = NULL;
-
-    if (queue->last == item) {
-        queue->last = prev;
-    }
-    queue->count -= 1;
+    _channelqueue_unlink(queue, item);
 
     int unboundop;
     _channelitem_popped(item, p_data, p_waiting, &unboundop);
@@ -803,7 +874,6 @@ _channelqueue_remove(_channelqueue *queue, _channelitem_id_t itemid,
 static void
 _channelqueue_clear_interpreter(_channelqueue *queue, int64_t interpid)
 {
-    _channelitem *prev = NULL;
     _channelitem *next = queue->first;
     while (next != NULL) {
         _channelitem *item = next;
@@ -812,17 +882,8 @@ _channelqueue_clear_interpreter(_channelqueue *queue, int64_t interpid)
             ? _channelitem_clear_interpreter(item)
             : 0;
         if (remove) {
+            _channelqueue_unlink(queue, item);
             _channelitem_free(item);
-            if (prev == NULL) {
-                queue->first = next;
-            }
-            else {
-                prev->next = next;
-            }
-            queue->count -= 1;
-        }
-        else {
-            prev = item;
         }
     }
 }
@@ -1072,6 +1133,295 @@ _channelends_clear_interpreter(_channelends *ends, int64_t interpid)
 
 /* each channel's state */
 
+/* blocked threads */
+
+/* A waiter represents a thread blocked in recv(), or in send() on a full
+   channel.  Its lock is held until another thread notifies it (while
+   holding the channel's lock), at which point it wakes up and tries
+   again. */
+
+typedef struct _channelwaiter {
+    PyThread_type_lock mutex;
+    int notified;
+    // When a sender started waiting, for the channel's stats.
+    PyTime_t since;
+    struct _channelwaiter *next;
+} _channelwaiter;
+
+static int
+_channelwaiter_init(_channelwaiter *waiter)
+{
+    PyThread_type_lock mutex = PyThread_allocate_lock();
+    if (mutex == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    // It stays locked until the waiter is notified.
+    PyThread_acquire_lock(mutex, NOWAIT_LOCK);
+    *waiter = (_channelwaiter){
+        .mutex = mutex,
+    };
+    return 0;
+}
+
+static void
+_channelwaiter_clear(_channelwaiter *waiter)
+{
+    assert(waiter->next == NULL);
+    if (waiter->mutex != NULL) {
+        PyThread_free_lock(waiter->mutex);
+        waiter->mutex = NULL;
+    }
+}
+
+// Returns 0 if notified, 1 if timed out, and -1 if interrupted.
+static int
+_channelwaiter_wait(_channelwaiter *waiter, PY_TIMEOUT_T timeout)
+{
+    // The GIL is released while blocked.
+    PyLockStatus res = PyThread_acquire_lock_timed_with_retries(
+                                                    waiter->mutex, timeout);
+    if (res == PY_LOCK_INTR) {
+        /* KeyboardInterrupt, etc. */
+        assert(PyErr_Occurred());
+        return -1;
+    }
+    else if (res == PY_LOCK_FAILURE) {
+        assert(!PyErr_Occurred());
+        assert(timeout > 0);
+        return 1;
+    }
+    assert(res == PY_LOCK_ACQUIRED);
+    return 0;
+}
+
+typedef struct _channelwaiters {
+    _channelwaiter *first;
+    _channelwaiter *last;
+} _channelwaiters;
+
+static void
+_channelwaiters_add(_channelwaiters *waiters, _channelwaiter *waiter)
+{
+    // The caller must be holding the channel's lock.
+    assert(waiter->next == NULL);
+    if (waiters->first == NULL) {
+        waiters->first = waiter;
+    }
+    else {
+        waiters->last->next = waiter;
+    }
+    waiters->last = waiter;
+}
+
+static void
+_channelwaiters_remove(_channelwaiters *waiters, _channelwaiter *waiter)
+{
+    // The caller must be holding the channel's lock.
+    _channelwaiter *prev = NULL;
+    _channelwaiter *cur = waiters->first;
+    while (cur != NULL && cur != waiter) {
+        prev = cur;
+        cur = cur->next;
+    }
+    if (cur == NULL) {
+        // It was already notified.
+        return;
+    }
+    if (prev == NULL) {
+        waiters->first = waiter->next;
+    }
+    else {
+        prev->next = waiter->next;
+    }
+    if (waiters->last == waiter) {
+        waiters->last = prev;
+    }
+    waiter->next = NULL;
+}
+
+// Wake up to "count" waiters, in the order they started waiting.
+// A negative count means all of them.
+static void
+_channelwaiters_notify(_channelwaiters *waiters, Py_ssize_t count)
+{
+    // The caller must be holding the channel's lock.
+    while (waiters->first != NULL && count != 0) {
+        _channelwaiter *waiter = waiters->first;
+        waiters->first = waiter->next;
+        if (waiters->first == NULL) {
+            waiters->last = NULL;
+        }
+        waiter->next = NULL;
+        waiter->notified = 1;
+        PyThread_release_lock(waiter->mutex);
+        if (count > 0) {
+            count -= 1;
+        }
+    }
+}
+
+/* A selector represents a thread blocked in select(), waiting on
+   several channels at once.  Like a waiter, its lock is held until it
+   is signaled, but any number of channels may signal it, concurrently,
+   so only the first one actually releases the lock.  The selecting
+   thread resets it before checking the channels again. */
+
+typedef struct _channelselector {
+    PyThread_type_lock mutex;
+    int signaled;  // atomic
+} _channelselector;
+
+static int
+_channelselector_init(_channelselector *selector)
+{
+    PyThread_type_lock mutex = PyThread_allocate_lock();
+    if (mutex == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    // It stays locked until the selector is signaled.
+    PyThread_acquire_lock(mutex, NOWAIT_LOCK);
+    *selector = (_channelselector){
+        .mutex = mutex,
+    };
+    return 0;
+}
+
+static void
+_channelselector_clear(_channelselector *selector)
+{
+    if (selector->mutex != NULL) {
+        PyThread_free_lock(selector->mutex);
+        selector->mutex = NULL;
+    }
+}
+
+static void
+_channelselector_signal(_channelselector *selector)
+{
+    if (_Py_atomic_exchange_int(&selector->signaled, 1) == 0) {
+        PyThread_release_lock(selector->mutex);
+    }
+}
+
+/* Each channel a selector is waiting on has its own link to it. */
+
+struct _channel;
+
+typedef struct _channelselect {
+    _channelselector *selector;
+    // This is set while the link is registered with the channel.
+    struct _channel *chan;
+    struct _channelselect *next;
+} _channelselect;
+
+static void
+_channelselects_signal(_channelselect *first)
+{
+    // The caller must be holding the channel's lock.
+    for (_channelselect *link = first; link != NULL; link = link->next) {
+        _channelselector_signal(link->selector);
+    }
+}
+
+
+/* A watcher is a file descriptor (e.g. the write end of a pipe) that
+   gets a byte written to it whenever items are added to or removed
+   from the channel, or it is closed.  That lets an event loop wait on
+   any number of channels without blocking any threads.  The owner of
+   the fd is responsible for draining it and for making it
+   non-blocking. */
+
+typedef struct _channelwatcher {
+    int64_t interpid;
+    int fd;
+} _channelwatcher;
+
+typedef struct _channelwatchers {
+    _channelwatcher *watchers;
+    Py_ssize_t count;
+    Py_ssize_t size;
+} _channelwatchers;
+
+static void
+_channelwatchers_clear(_channelwatchers *watchers)
+{
+    if (watchers->watchers != NULL) {
+        PyMem_RawFree(watchers->watchers);
+    }
+    *watchers = (_channelwatchers){0};
+}
+
+static int
+_channelwatchers_add(_channelwatchers *watchers, int64_t interpid, int fd)
+{
+    // The caller must be holding the channel's lock.
+    if (watchers->count == watchers->size) {
+        Py_ssize_t size = watchers->size > 0 ? watchers->size * 2 : 4;
+        _channelwatcher *resized = PyMem_RawRealloc(
+                        watchers->watchers, sizeof(_channelwatcher) * size);
+        if (resized == NULL) {
+            PyErr_NoMemory();
+            return -1;
+        }
+        watchers->watchers = resized;
+        watchers->size = size;
+    }
+    watchers->watchers[watchers->count] = (_channelwatcher){
+        .interpid = interpid,
+        .fd = fd,
+    };
+    watchers->count += 1;
+    return 0;
+}
+
+// Returns the number of watchers removed.  A negative fd matches any.
+static Py_ssize_t
+_channelwatchers_remove(_channelwatchers *watchers, int64_t interpid, int fd)
+{
+    // The caller must be holding the channel's lock.
+    Py_ssize_t kept = 0;
+    for (Py_ssize_t i = 0; i < watchers->count; i++) {
+        _channelwatcher *watcher = &watchers->watchers[i];
+        if (watcher->interpid == interpid && (fd < 0 || watcher->fd == fd)) {
+            continue;
+        }
+        watchers->watchers[kept] = *watcher;
+        kept += 1;
+    }
+    Py_ssize_t removed = watchers->count - kept;
+    watchers->count = kept;
+    return removed;
+}
+
+static void
+_channelwatchers_notify(_channelwatchers *watchers)
+{
+    // The caller must be holding the channel's lock.
+    for (Py_ssize_t i = 0; i < watchers->count; i++) {
+        _notify_fd(watchers->watchers[i].fd);
+    }
+}
+
+
+/* channel statistics */
+
+/* The counters are only updated while the channel is locked, alongside
+   changes that are being made anyway.  The clock is read once per
+   send, to know how long items have been queued and senders have
+   been waiting. */
+
+typedef struct _channelstats {
+    int64_t sent;
+    int64_t received;
+    // Only objects shared as buffers (e.g. send_buffer()) are counted.
+    int64_t buffer_bytes_sent;
+} _channelstats;
+
+
+/* the channel */
+
 struct _channel;
 struct _channel_closing;
 static void _channel_clear_closing(struct _channel *);
@@ -1086,10 +1436,23 @@ typedef struct _channel {
     } defaults;
     int open;
     struct _channel_closing *closing;
+    // Zero (or less) means unbounded.
+    Py_ssize_t maxsize;
+    // Threads blocked in recv(), waiting for an item, and in send(),
+    // waiting for space.  Both also wait for the channel to close.
+    // The channel is not freed until they are done with it.
+    _channelwaiters recvwaiters;
+    _channelwaiters sendwaiters;
+    // Threads blocked in select() on the channel.
+    _channelselect *selects;
+    // Event loops (etc.) waiting for a change.
+    _channelwatchers watchers;
+    _channelstats stats;
+    Py_ssize_t num_waiters;
 } _channel_state;
 
 static _channel_state *
-_channel_new(PyThread_type_lock mutex, int unboundop)
+_channel_new(PyThread_type_lock mutex, int unboundop, Py_ssize_t maxsize)
 {
     _channel_state *chan = GLOBAL_MALLOC(_channel_state);
     if (chan == NULL) {
@@ -1110,27 +1473,89 @@ _channel_new(PyThread_type_lock mutex, int unboundop)
     chan->defaults.unboundop = unboundop;
     chan->open = 1;
     chan->closing = NULL;
+    chan->maxsize = maxsize;
+    chan->recvwaiters = (_channelwaiters){0};
+    chan->sendwaiters = (_channelwaiters){0};
+    chan->selects = NULL;
+    chan->watchers = (_channelwatchers){0};
+    chan->stats = (_channelstats){0};
+    chan->num_waiters = 0;
     return chan;
 }
 
+// "count" items were added.
+static void
+_channel_notify_recv(_channel_state *chan, Py_ssize_t count)
+{
+    // The caller must be holding the channel's lock.
+    _channelwaiters_notify(&chan->recvwaiters, count);
+    _channelselects_signal(chan->selects);
+    _channelwatchers_notify(&chan->watchers);
+}
+
+// Up to "count" items were removed.  A negative count means any number.
+static void
+_channel_notify_send(_channel_state *chan, Py_ssize_t count)
+{
+    // The caller must be holding the channel's lock.
+    _channelwaiters_notify(&chan->sendwaiters, count);
+    _channelselects_signal(chan->selects);
+    _channelwatchers_notify(&chan->watchers);
+}
+
+static void
+_channel_notify_all(_channel_state *chan)
+{
+    // The caller must be holding the channel's lock.
+    _channelwaiters_notify(&chan->recvwaiters, -1);
+    _channelwaiters_notify(&chan->sendwaiters, -1);
+    _channelselects_signal(chan->selects);
+    _channelwatchers_notify(&chan->watchers);
+}
+
 static void
 _channel_free(_channel_state *chan)
 {
     _channel_clear_closing(chan);
+
+    // Any blocked threads will see the channel is gone.
+    PyThread_acquire_lock(chan->mutex, WAIT_LOCK);
+    _channel_notify_all(chan);
+    PyThread_release_lock(chan->mutex);
+    // Wait for them to let go of the channel.  They do that without
+    // needing the GIL or any registry lock (see _channel_wait() and
+    // _channel_select_wait()), so we may be holding either here.
+    while (_Py_atomic_load_ssize(&chan->num_waiters) > 0) {
+        PyThread_acquire_lock(chan->mutex, WAIT_LOCK);
+        PyThread_release_lock(chan->mutex);
+    }
+
     PyThread_acquire_lock(chan->mutex, WAIT_LOCK);
     _channelqueue_free(chan->queue);
     _channelends_free(chan->ends);
+    _channelwatchers_clear(&chan->watchers);
     PyThread_release_lock(chan->mutex);
 
     PyThread_free_lock(chan->mutex);
     GLOBAL_FREE(chan);
 }
 
+// If the channel is full and a waiter is provided then it is
+// registered with the channel, to be notified when space frees up
+// or the channel is closed, and the channel is set on p_waitchan.
+// See _channel_wait().
 static int
 _channel_add(_channel_state *chan, int64_t interpid,
-             _PyXIData_t *data, _waiting_t *waiting, int unboundop)
+             _PyXIData_t *data, Py_ssize_t nbytes,
+             _waiting_t *waiting, int unboundop,
+             _channelwaiter *waiter, _channel_state **p_waitchan)
 {
     int res = -1;
+    PyTime_t now;
+    (void)PyTime_MonotonicRaw(&now);
+    if (waiting != NULL && waiting->since == 0) {
+        waiting->since = now;
+    }
     PyThread_acquire_lock(chan->mutex, WAIT_LOCK);
 
     if (!chan->open) {
@@ -1141,11 +1566,30 @@ _channel_add(_channel_state *chan, int64_t interpid,
         res = ERR_CHANNEL_INTERP_CLOSED;
         goto done;
     }
+    if (chan->maxsize > 0 && chan->queue->count >= chan->maxsize) {
+        if (waiter != NULL) {
+            if (waiter->mutex == NULL && _channelwaiter_init(waiter) < 0) {
+                goto done;
+            }
+            waiter->since = waiting != NULL ? waiting->since : now;
+            _channelwaiters_add(&chan->sendwaiters, waiter);
+            // The channel can't be freed until the waiter is done with it.
+            _Py_atomic_add_ssize(&chan->num_waiters, 1);
+            *p_waitchan = chan;
+        }
+        res = ERR_CHANNEL_FULL;
+        goto done;
+    }
 
     if (_channelqueue_put(chan->queue, interpid, data, waiting, unboundop) != 0) {
         goto done;
     }
     // Any errors past this point must cause a _waiting_release() call.
+    chan->queue->last->queued = now;
+    chan->stats.sent += 1;
+    chan->stats.buffer_bytes_sent += nbytes;
+
+    _channel_notify_recv(chan, 1);
 
     res = 0;
 done:
@@ -1153,49 +1597,310 @@ done:
     return res;
 }
 
+// Push as many of the items as fit, in order, all under a single
+// acquisition of the channel's lock.  The number added is set on
+// p_added.  If none fit then this fails with ERR_CHANNEL_FULL and
+// the waiter (if any) is registered, as with _channel_add().
 static int
-_channel_next(_channel_state *chan, int64_t interpid,
-              _PyXIData_t **p_data, _waiting_t **p_waiting, int *p_unboundop)
+_channel_add_many(_channel_state *chan, int64_t interpid,
+                  _PyXIData_t **data, Py_ssize_t count, int unboundop,
+                  _channelwaiter *waiter, _channel_state **p_waitchan,
+                  Py_ssize_t *p_added)
 {
-    int err = 0;
+    *p_added = 0;
+    int res = -1;
+    PyTime_t now;
+    (void)PyTime_MonotonicRaw(&now);
     PyThread_acquire_lock(chan->mutex, WAIT_LOCK);
 
     if (!chan->open) {
-        err = ERR_CHANNEL_CLOSED;
+        res = ERR_CHANNEL_CLOSED;
         goto done;
     }
-    if (_channelends_associate(chan->ends, interpid, 0) != 0) {
-        err = ERR_CHANNEL_INTERP_CLOSED;
+    if (_channelends_associate(chan->ends, interpid, 1) != 0) {
+        res = ERR_CHANNEL_INTERP_CLOSED;
         goto done;
     }
 
-    int empty = _channelqueue_get(chan->queue, p_data, p_waiting, p_unboundop);
-    assert(!PyErr_Occurred());
-    if (empty) {
-        assert(empty == ERR_CHANNEL_EMPTY);
-        if (chan->closing != NULL) {
-            chan->open = 0;
+    Py_ssize_t added = 0;
+    res = 0;
+    for (; added < count; added++) {
+        if (chan->maxsize > 0 && chan->queue->count >= chan->maxsize) {
+            break;
         }
-        err = ERR_CHANNEL_EMPTY;
-        goto done;
+        if (_channelqueue_put(chan->queue, interpid, data[added],
+                              NULL, unboundop) != 0)
+        {
+            res = -1;
+            break;
+        }
+        chan->queue->last->queued = now;
+    }
+    if (added > 0) {
+        chan->stats.sent += added;
+        _channel_notify_recv(chan, added);
+    }
+    else if (res == 0) {
+        if (waiter != NULL) {
+            if (waiter->mutex == NULL && _channelwaiter_init(waiter) < 0) {
+                res = -1;
+                goto done;
+            }
+            waiter->since = now;
+            _channelwaiters_add(&chan->sendwaiters, waiter);
+            // The channel can't be freed until the waiter is done with it.
+            _Py_atomic_add_ssize(&chan->num_waiters, 1);
+            *p_waitchan = chan;
+        }
+        res = ERR_CHANNEL_FULL;
     }
+    *p_added = added;
 
 done:
     PyThread_release_lock(chan->mutex);
-    if (chan->queue->count == 0) {
-        _channel_finish_closing(chan);
-    }
-    return err;
+    return res;
 }
 
-static void
-_channel_remove(_channel_state *chan, _channelitem_id_t itemid)
+typedef struct _channelpopped {
+    _PyXIData_t *data;
+    _waiting_t *waiting;
+    int unboundop;
+} _channelpopped;
+
+// Pop up to "max_items" items off the channel, all under a single
+// acquisition of the channel's lock, and set the number popped on
+// p_count.  If the channel is empty and a waiter is provided then it
+// is registered with the channel, to be notified when an item is added
+// or the channel is closed, and the channel is set on p_waitchan.
+// See _channel_wait().
+static int
+_channel_next_many(_channel_state *chan, int64_t interpid,
+                   Py_ssize_t max_items,
+                   _channelwaiter *waiter, _channel_state **p_waitchan,
+                   _channelpopped *popped, Py_ssize_t *p_count)
 {
-    _PyXIData_t *data = NULL;
-    _waiting_t *waiting = NULL;
-
+    int err = 0;
+    Py_ssize_t count = 0;
     PyThread_acquire_lock(chan->mutex, WAIT_LOCK);
-    _channelqueue_remove(chan->queue, itemid, &data, &waiting);
+
+    if (!chan->open) {
+        err = ERR_CHANNEL_CLOSED;
+        goto done;
+    }
+    if (_channelends_associate(chan->ends, interpid, 0) != 0) {
+        err = ERR_CHANNEL_INTERP_CLOSED;
+        goto done;
+    }
+
+    for (; count < max_items; count++) {
+        _channelpopped *item = &popped[count];
+        if (_channelqueue_get(chan->queue, &item->data, &item->waiting,
+                              &item->unboundop) != 0)
+        {
+            break;
+        }
+    }
+    assert(!PyErr_Occurred());
+    if (count > 0) {
+        chan->stats.received += count;
+        _channel_notify_send(chan, count);
+    }
+    else {
+        if (chan->closing != NULL) {
+            chan->open = 0;
+        }
+        else if (waiter != NULL) {
+            _channelwaiters_add(&chan->recvwaiters, waiter);
+            // The channel can't be freed until the waiter is done with it.
+            _Py_atomic_add_ssize(&chan->num_waiters, 1);
+            *p_waitchan = chan;
+        }
+        err = ERR_CHANNEL_EMPTY;
+        goto done;
+    }
+
+done:
+    PyThread_release_lock(chan->mutex);
+    if (chan->queue->count == 0) {
+        _channel_finish_closing(chan);
+    }
+    *p_count = count;
+    return err;
+}
+
+// If the channel is empty and a waiter is provided then it is
+// registered with the channel, to be notified when an item is added
+// or the channel is closed, and the channel is set on p_waitchan.
+// See _channel_wait().
+static int
+_channel_next(_channel_state *chan, int64_t interpid,
+              _channelwaiter *waiter, _channel_state **p_waitchan,
+              _PyXIData_t **p_data, _waiting_t **p_waiting, int *p_unboundop)
+{
+    _channelpopped popped;
+    Py_ssize_t count;
+    int err = _channel_next_many(chan, interpid, 1, waiter, p_waitchan,
+                                 &popped, &count);
+    if (err != 0) {
+        return err;
+    }
+    assert(count == 1);
+    *p_data = popped.data;
+    *p_waiting = popped.waiting;
+    *p_unboundop = popped.unboundop;
+    return 0;
+}
+
+// Run any pending signal handlers after an interrupted wait.
+// Return 0 (as though woken up early) or -1 if a handler raised.
+static int
+_handle_interrupted_wait(void)
+{
+    if (Py_MakePendingCalls() < 0) {
+        assert(PyErr_Occurred());
+        return -1;
+    }
+    return 0;
+}
+
+// Block until notified by another thread or until the timeout expires.
+// The waiter must have been registered by _channel_next() (for "recv")
+// or _channel_add() (for "send") already, or their "many" variants.
+// Once this returns, the channel may no longer be used by the caller.
+// Returns 0 if notified (or woken up early), 1 if timed out,
+// and -1 if interrupted.
+//
+// The waiter lets go of the channel before it takes the GIL back.
+// Otherwise a thread sharing the GIL that frees the channel (e.g. by
+// closing it) would wait on us in _channel_free() forever.
+static int
+_channel_wait(_channel_state *chan, int send, _channelwaiter *waiter,
+              PY_TIMEOUT_T timeout)
+{
+    _channelwaiters *waiters = send ? &chan->sendwaiters : &chan->recvwaiters;
+    PyLockStatus res;
+
+    Py_BEGIN_ALLOW_THREADS
+    res = PyThread_acquire_lock_timed(waiter->mutex, timeout, 1);
+
+    PyThread_acquire_lock(chan->mutex, WAIT_LOCK);
+    _channelwaiters_remove(waiters, waiter);
+    if (res != PY_LOCK_ACQUIRED && waiter->notified) {
+        // We were notified right as we gave up, so we re-arm the lock.
+        PyThread_acquire_lock(waiter->mutex, NOWAIT_LOCK);
+        if (res == PY_LOCK_INTR) {
+            // Pass the notification on to the next waiter.
+            _channelwaiters_notify(waiters, 1);
+        }
+    }
+    waiter->notified = 0;
+    PyThread_release_lock(chan->mutex);
+
+    // This must come last, since _channel_free() may proceed right away.
+    _Py_atomic_add_ssize(&chan->num_waiters, -1);
+    Py_END_ALLOW_THREADS
+
+    if (res == PY_LOCK_INTR) {
+        return _handle_interrupted_wait();
+    }
+    return res == PY_LOCK_ACQUIRED ? 0 : 1;
+}
+
+// Return true if recv() (or send()) would not fail with
+// ERR_CHANNEL_EMPTY (or ERR_CHANNEL_FULL).  If not ready and a link
+// is provided then it is registered with the channel, to be signaled
+// whenever that might have changed.
+static int
+_channel_select(_channel_state *chan, int send, _channelselect *link)
+{
+    PyThread_acquire_lock(chan->mutex, WAIT_LOCK);
+
+    int ready;
+    if (!chan->open || chan->closing != NULL) {
+        // The operation will fail (or finish closing the channel).
+        ready = 1;
+    }
+    else if (send) {
+        ready = chan->maxsize <= 0 || chan->queue->count < chan->maxsize;
+    }
+    else {
+        ready = chan->queue->count > 0;
+    }
+    if (!ready && link != NULL) {
+        assert(link->chan == NULL);
+        link->chan = chan;
+        link->next = chan->selects;
+        chan->selects = link;
+        // The channel can't be freed until the link is unregistered.
+        _Py_atomic_add_ssize(&chan->num_waiters, 1);
+    }
+
+    PyThread_release_lock(chan->mutex);
+    return ready;
+}
+
+static void
+_channel_unselect(_channelselect *link)
+{
+    _channel_state *chan = link->chan;
+    if (chan == NULL) {
+        return;
+    }
+    PyThread_acquire_lock(chan->mutex, WAIT_LOCK);
+    _channelselect **p_link = &chan->selects;
+    while (*p_link != link) {
+        assert(*p_link != NULL);
+        p_link = &(*p_link)->next;
+    }
+    *p_link = link->next;
+    PyThread_release_lock(chan->mutex);
+
+    link->chan = NULL;
+    link->next = NULL;
+    // This must come last, since _channel_free() may proceed right away.
+    _Py_atomic_add_ssize(&chan->num_waiters, -1);
+}
+
+// Block until the selector is signaled or the timeout expires, and then
+// unregister all its links.  Returns 0 if signaled (or woken up early),
+// 1 if timed out, and -1 if interrupted.  Like _channel_wait(), the
+// links are unregistered before the GIL is taken back.
+static int
+_channel_select_wait(_channelselector *selector,
+                     _channelselect *links, Py_ssize_t count,
+                     PY_TIMEOUT_T timeout)
+{
+    PyLockStatus res;
+
+    Py_BEGIN_ALLOW_THREADS
+    res = PyThread_acquire_lock_timed(selector->mutex, timeout, 1);
+    for (Py_ssize_t i = 0; i < count; i++) {
+        _channel_unselect(&links[i]);
+    }
+    Py_END_ALLOW_THREADS
+
+    if (res == PY_LOCK_ACQUIRED) {
+        // The lock is held again, so it is ready for the next signal.
+        _Py_atomic_store_int(&selector->signaled, 0);
+        return 0;
+    }
+    if (res == PY_LOCK_INTR) {
+        return _handle_interrupted_wait();
+    }
+    return 1;
+}
+
+static void
+_channel_remove(_channel_state *chan, _waiting_t *sent)
+{
+    _PyXIData_t *data = NULL;
+    _waiting_t *waiting = NULL;
+
+    PyThread_acquire_lock(chan->mutex, WAIT_LOCK);
+    _channelqueue_remove(chan->queue, sent, &data, &waiting);
+    if (waiting != NULL) {
+        _channel_notify_send(chan, 1);
+    }
     PyThread_release_lock(chan->mutex);
 
     (void)_release_xid_data(data, XID_IGNORE_EXC | XID_FREE);
@@ -1223,6 +1928,9 @@ _channel_release_interpreter(_channel_state *chan, int64_t interpid, int end)
         goto done;
     }
     chan->open = _channelends_is_open(chan->ends);
+    if (!chan->open) {
+        _channel_notify_all(chan);
+    }
     // XXX Clear the queue if not empty?
     // XXX Activate the "closing" mechanism?
 
@@ -1250,6 +1958,7 @@ _channel_release_all(_channel_state *chan, int end, int force)
     // XXX Clear the queue?
 
     chan->open = 0;
+    _channel_notify_all(chan);
 
     // We *could* also just leave these in place, since we've marked
     // the channel as closed already.
@@ -1269,7 +1978,37 @@ _channel_clear_interpreter(_channel_state *chan, int64_t interpid)
     _channelqueue_clear_interpreter(chan->queue, interpid);
     _channelends_clear_interpreter(chan->ends, interpid);
     chan->open = _channelends_is_open(chan->ends);
+    if (!chan->open) {
+        _channel_notify_all(chan);
+    }
+    else {
+        // Some items may have been removed.
+        _channel_notify_send(chan, -1);
+    }
+    // The interpreter's fds are no longer valid.
+    (void)_channelwatchers_remove(&chan->watchers, interpid, -1);
+
+    PyThread_release_lock(chan->mutex);
+}
+
+static int
+_channel_watch(_channel_state *chan, int64_t interpid, int fd)
+{
+    PyThread_acquire_lock(chan->mutex, WAIT_LOCK);
+    int err = _channelwatchers_add(&chan->watchers, interpid, fd);
+    if (err == 0 && chan->queue->count > 0) {
+        // Let the watcher know there are items already.
+        _notify_fd(fd);
+    }
+    PyThread_release_lock(chan->mutex);
+    return err;
+}
 
+static void
+_channel_unwatch(_channel_state *chan, int64_t interpid, int fd)
+{
+    PyThread_acquire_lock(chan->mutex, WAIT_LOCK);
+    (void)_channelwatchers_remove(&chan->watchers, interpid, fd);
     PyThread_release_lock(chan->mutex);
 }
 
@@ -1338,24 +2077,176 @@ _channelref_find(_channelref *first, int64_t cid, _channelref **pprev)
 }
 
 
-typedef struct _channels {
+
+/* a stripe of the channel registry *****************************************/
+
+/* The registry is split into a fixed number of stripes, each with its
+   own lock and its own hash table of refs, keyed by channel ID.  Channel
+   IDs are handed out sequentially, so consecutive channels land in
+   different stripes and operations on different channels rarely contend.
+   As before, a channel's stripe stays locked while the channel is
+   operated on (but not while blocking). */
+
+#define CHANNELS_NUM_STRIPES 32
+#define CHANNELS_MIN_BUCKETS 8
+
+typedef struct _channelsstripe {
     PyThread_type_lock mutex;
-    _channelref *head;
-    int64_t numopen;
+    _channelref **buckets;
+    Py_ssize_t numbuckets;  // always a power of 2
+    int64_t count;
+} _channelsstripe;
+
+static inline _channelsstripe *
+_channels_get_stripe(_channelsstripe *stripes, int64_t cid)
+{
+    return &stripes[cid % CHANNELS_NUM_STRIPES];
+}
+
+static inline _channelref **
+_channelsstripe_get_bucket(_channelsstripe *stripe, int64_t cid)
+{
+    // The low bits already picked the stripe.
+    size_t hash = (size_t)(cid / CHANNELS_NUM_STRIPES);
+    return &stripe->buckets[hash & (stripe->numbuckets - 1)];
+}
+
+static int
+_channelsstripe_init(_channelsstripe *stripe)
+{
+    PyThread_type_lock mutex = PyThread_allocate_lock();
+    if (mutex == NULL) {
+        return -1;
+    }
+    _channelref **buckets = PyMem_RawCalloc(CHANNELS_MIN_BUCKETS,
+                                            sizeof(_channelref *));
+    if (buckets == NULL) {
+        PyThread_free_lock(mutex);
+        return -1;
+    }
+    *stripe = (_channelsstripe){
+        .mutex = mutex,
+        .buckets = buckets,
+        .numbuckets = CHANNELS_MIN_BUCKETS,
+    };
+    return 0;
+}
+
+static void
+_channelsstripe_fini(_channelsstripe *stripe)
+{
+    if (stripe->mutex == NULL) {
+        // It was never initialized.
+        return;
+    }
+    PyThread_acquire_lock(stripe->mutex, WAIT_LOCK);
+    assert(stripe->count == 0);
+    PyMem_RawFree(stripe->buckets);
+    PyThread_type_lock mutex = stripe->mutex;
+    *stripe = (_channelsstripe){0};
+    PyThread_release_lock(mutex);
+    PyThread_free_lock(mutex);
+}
+
+static void
+_channelsstripe_maybe_grow(_channelsstripe *stripe)  // needs lock
+{
+    if (stripe->count <= stripe->numbuckets * 2) {
+        return;
+    }
+    Py_ssize_t numbuckets = stripe->numbuckets * 2;
+    _channelref **buckets = PyMem_RawCalloc(numbuckets,
+                                            sizeof(_channelref *));
+    if (buckets == NULL) {
+        // We simply keep using longer chains.
+        return;
+    }
+    _channelref **old = stripe->buckets;
+    Py_ssize_t oldnum = stripe->numbuckets;
+    stripe->buckets = buckets;
+    stripe->numbuckets = numbuckets;
+    for (Py_ssize_t i = 0; i < oldnum; i++) {
+        _channelref *ref = old[i];
+        while (ref != NULL) {
+            _channelref *next = ref->next;
+            _channelref **bucket = _channelsstripe_get_bucket(stripe, ref->cid);
+            ref->next = *bucket;
+            *bucket = ref;
+            ref = next;
+        }
+    }
+    PyMem_RawFree(old);
+}
+
+static _channelref *
+_channelsstripe_find(_channelsstripe *stripe, int64_t cid,  // needs lock
+                     _channelref **pprev)
+{
+    _channelref **bucket = _channelsstripe_get_bucket(stripe, cid);
+    return _channelref_find(*bucket, cid, pprev);
+}
+
+static void
+_channelsstripe_add(_channelsstripe *stripe, _channelref *ref)  // needs lock
+{
+    // We assume that the channel is a new one (not already in the table).
+    _channelref **bucket = _channelsstripe_get_bucket(stripe, ref->cid);
+    ref->next = *bucket;
+    *bucket = ref;
+    stripe->count += 1;
+    _channelsstripe_maybe_grow(stripe);
+}
+
+static void
+_channelsstripe_remove_ref(_channelsstripe *stripe,  // needs lock
+                           _channelref *ref, _channelref *prev,
+                           _channel_state **pchan)
+{
+    if (prev == NULL) {
+        _channelref **bucket = _channelsstripe_get_bucket(stripe, ref->cid);
+        assert(*bucket == ref);
+        *bucket = ref->next;
+    }
+    else {
+        prev->next = ref->next;
+    }
+    ref->next = NULL;
+    stripe->count -= 1;
+
+    if (pchan != NULL) {
+        *pchan = ref->chan;
+    }
+    _channelref_free(ref);
+}
+
+
+/* a collection of channels *************************************************/
+
+typedef struct _channels {
+    PyThread_type_lock mutex;  // only protects next_id
+    _channelsstripe stripes[CHANNELS_NUM_STRIPES];
     int64_t next_id;
 } _channels;
 
-static void
+static void _channels_fini(_channels *, PyThread_type_lock *);
+
+static int
 _channels_init(_channels *channels, PyThread_type_lock mutex)
 {
     assert(mutex != NULL);
     assert(channels->mutex == NULL);
     *channels = (_channels){
         .mutex = mutex,
-        .head = NULL,
-        .numopen = 0,
         .next_id = 0,
     };
+    for (int i = 0; i < CHANNELS_NUM_STRIPES; i++) {
+        if (_channelsstripe_init(&channels->stripes[i]) < 0) {
+            PyThread_type_lock unused;
+            _channels_fini(channels, &unused);
+            return -1;
+        }
+    }
+    return 0;
 }
 
 static void
@@ -1365,8 +2256,9 @@ _channels_fini(_channels *channels, PyThread_type_lock *p_mutex)
     assert(mutex != NULL);
 
     PyThread_acquire_lock(mutex, WAIT_LOCK);
-    assert(channels->numopen == 0);
-    assert(channels->head == NULL);
+    for (int i = 0; i < CHANNELS_NUM_STRIPES; i++) {
+        _channelsstripe_fini(&channels->stripes[i]);
+    }
     *channels = (_channels){0};
     PyThread_release_lock(mutex);
 
@@ -1374,29 +2266,37 @@ _channels_fini(_channels *channels, PyThread_type_lock *p_mutex)
 }
 
 static int64_t
-_channels_next_id(_channels *channels)  // needs lock
+_channels_next_id(_channels *channels)
 {
+    PyThread_acquire_lock(channels->mutex, WAIT_LOCK);
     int64_t cid = channels->next_id;
     if (cid < 0) {
         /* overflow */
-        return -1;
+        cid = -1;
     }
-    channels->next_id += 1;
+    else {
+        channels->next_id += 1;
+    }
+    PyThread_release_lock(channels->mutex);
     return cid;
 }
 
+// On success, if pmutex is provided then the channel's registry stripe
+// is left locked and its mutex is set on pmutex.  The caller must
+// release it when done with the channel.
 static int
 _channels_lookup(_channels *channels, int64_t cid, PyThread_type_lock *pmutex,
                  _channel_state **res)
 {
     int err = -1;
     _channel_state *chan = NULL;
-    PyThread_acquire_lock(channels->mutex, WAIT_LOCK);
+    _channelsstripe *stripe = _channels_get_stripe(channels->stripes, cid);
+    PyThread_acquire_lock(stripe->mutex, WAIT_LOCK);
     if (pmutex != NULL) {
         *pmutex = NULL;
     }
 
-    _channelref *ref = _channelref_find(channels->head, cid, NULL);
+    _channelref *ref = _channelsstripe_find(stripe, cid, NULL);
     if (ref == NULL) {
         err = ERR_CHANNEL_NOT_FOUND;
         goto done;
@@ -1408,7 +2308,7 @@ _channels_lookup(_channels *channels, int64_t cid, PyThread_type_lock *pmutex,
 
     if (pmutex != NULL) {
         // The mutex will be closed by the caller.
-        *pmutex = channels->mutex;
+        *pmutex = stripe->mutex;
     }
 
     chan = ref->chan;
@@ -1416,7 +2316,7 @@ _channels_lookup(_channels *channels, int64_t cid, PyThread_type_lock *pmutex,
 
 done:
     if (pmutex == NULL || *pmutex == NULL) {
-        PyThread_release_lock(channels->mutex);
+        PyThread_release_lock(stripe->mutex);
     }
     *res = chan;
     return err;
@@ -1425,29 +2325,23 @@ done:
 static int64_t
 _channels_add(_channels *channels, _channel_state *chan)
 {
-    int64_t cid = -1;
-    PyThread_acquire_lock(channels->mutex, WAIT_LOCK);
+    int64_t cid = _channels_next_id(channels);
+    if (cid < 0) {
+        return ERR_NO_NEXT_CHANNEL_ID;
+    }
 
     // Create a new ref.
-    int64_t _cid = _channels_next_id(channels);
-    if (_cid < 0) {
-        cid = ERR_NO_NEXT_CHANNEL_ID;
-        goto done;
-    }
-    _channelref *ref = _channelref_new(_cid, chan);
+    _channelref *ref = _channelref_new(cid, chan);
     if (ref == NULL) {
-        goto done;
+        return -1;
     }
 
-    // Add it to the list.
-    // We assume that the channel is a new one (not already in the list).
-    ref->next = channels->head;
-    channels->head = ref;
-    channels->numopen += 1;
+    // Add it to the table.
+    _channelsstripe *stripe = _channels_get_stripe(channels->stripes, cid);
+    PyThread_acquire_lock(stripe->mutex, WAIT_LOCK);
+    _channelsstripe_add(stripe, ref);
+    PyThread_release_lock(stripe->mutex);
 
-    cid = _cid;
-done:
-    PyThread_release_lock(channels->mutex);
     return cid;
 }
 
@@ -1459,12 +2353,13 @@ _channels_close(_channels *channels, int64_t cid, _channel_state **pchan,
                 int end, int force)
 {
     int res = -1;
-    PyThread_acquire_lock(channels->mutex, WAIT_LOCK);
+    _channelsstripe *stripe = _channels_get_stripe(channels->stripes, cid);
+    PyThread_acquire_lock(stripe->mutex, WAIT_LOCK);
     if (pchan != NULL) {
         *pchan = NULL;
     }
 
-    _channelref *ref = _channelref_find(channels->head, cid, NULL);
+    _channelref *ref = _channelsstripe_find(stripe, cid, NULL);
     if (ref == NULL) {
         res = ERR_CHANNEL_NOT_FOUND;
         goto done;
@@ -1489,7 +2384,7 @@ _channels_close(_channels *channels, int64_t cid, _channel_state **pchan,
                 // Mark the channel as closing and return.  The channel
                 // will be cleaned up in _channel_next().
                 PyErr_Clear();
-                int err = _channel_set_closing(ref, channels->mutex);
+                int err = _channel_set_closing(ref, stripe->mutex);
                 if (err != 0) {
                     res = err;
                     goto done;
@@ -1515,50 +2410,33 @@ _channels_close(_channels *channels, int64_t cid, _channel_state **pchan,
 
     res = 0;
 done:
-    PyThread_release_lock(channels->mutex);
+    PyThread_release_lock(stripe->mutex);
     return res;
 }
 
-static void
-_channels_remove_ref(_channels *channels, _channelref *ref, _channelref *prev,
-                     _channel_state **pchan)
-{
-    if (ref == channels->head) {
-        channels->head = ref->next;
-    }
-    else {
-        prev->next = ref->next;
-    }
-    channels->numopen -= 1;
-
-    if (pchan != NULL) {
-        *pchan = ref->chan;
-    }
-    _channelref_free(ref);
-}
-
 static int
 _channels_remove(_channels *channels, int64_t cid, _channel_state **pchan)
 {
     int res = -1;
-    PyThread_acquire_lock(channels->mutex, WAIT_LOCK);
+    _channelsstripe *stripe = _channels_get_stripe(channels->stripes, cid);
+    PyThread_acquire_lock(stripe->mutex, WAIT_LOCK);
 
     if (pchan != NULL) {
         *pchan = NULL;
     }
 
     _channelref *prev = NULL;
-    _channelref *ref = _channelref_find(channels->head, cid, &prev);
+    _channelref *ref = _channelsstripe_find(stripe, cid, &prev);
     if (ref == NULL) {
         res = ERR_CHANNEL_NOT_FOUND;
         goto done;
     }
 
-    _channels_remove_ref(channels, ref, prev, pchan);
+    _channelsstripe_remove_ref(stripe, ref, prev, pchan);
 
     res = 0;
 done:
-    PyThread_release_lock(channels->mutex);
+    PyThread_release_lock(stripe->mutex);
     return res;
 }
 
@@ -1566,9 +2444,10 @@ static int
 _channels_add_id_object(_channels *channels, int64_t cid)
 {
     int res = -1;
-    PyThread_acquire_lock(channels->mutex, WAIT_LOCK);
+    _channelsstripe *stripe = _channels_get_stripe(channels->stripes, cid);
+    PyThread_acquire_lock(stripe->mutex, WAIT_LOCK);
 
-    _channelref *ref = _channelref_find(channels->head, cid, NULL);
+    _channelref *ref = _channelsstripe_find(stripe, cid, NULL);
     if (ref == NULL) {
         res = ERR_CHANNEL_NOT_FOUND;
         goto done;
@@ -1577,17 +2456,18 @@ _channels_add_id_object(_channels *channels, int64_t cid)
 
     res = 0;
 done:
-    PyThread_release_lock(channels->mutex);
+    PyThread_release_lock(stripe->mutex);
     return res;
 }
 
 static void
 _channels_release_cid_object(_channels *channels, int64_t cid)
 {
-    PyThread_acquire_lock(channels->mutex, WAIT_LOCK);
+    _channelsstripe *stripe = _channels_get_stripe(channels->stripes, cid);
+    PyThread_acquire_lock(stripe->mutex, WAIT_LOCK);
 
     _channelref *prev = NULL;
-    _channelref *ref = _channelref_find(channels->head, cid, &prev);
+    _channelref *ref = _channelsstripe_find(stripe, cid, &prev);
     if (ref == NULL) {
         // Already destroyed.
         goto done;
@@ -1597,14 +2477,14 @@ _channels_release_cid_object(_channels *channels, int64_t cid)
     // Destroy if no longer used.
     if (ref->objcount == 0) {
         _channel_state *chan = NULL;
-        _channels_remove_ref(channels, ref, prev, &chan);
+        _channelsstripe_remove_ref(stripe, ref, prev, &chan);
         if (chan != NULL) {
             _channel_free(chan);
         }
     }
 
 done:
-    PyThread_release_lock(channels->mutex);
+    PyThread_release_lock(stripe->mutex);
 }
 
 struct channel_id_and_info {
@@ -1612,44 +2492,72 @@ struct channel_id_and_info {
     int unboundop;
 };
 
+static int
+_channel_id_and_info_cmp(const void *a, const void *b)
+{
+    // Newest first.
+    int64_t aid = ((const struct channel_id_and_info *)a)->id;
+    int64_t bid = ((const struct channel_id_and_info *)b)->id;
+    return (aid < bid) - (aid > bid);
+}
+
 static struct channel_id_and_info *
-_channels_list_all(_channels *channels, int64_t *count)
+_channels_list_all(_channels *channels, int64_t *p_count)
 {
-    struct channel_id_and_info *cids = NULL;
-    PyThread_acquire_lock(channels->mutex, WAIT_LOCK);
+    // Hold every stripe's lock, so we get a consistent snapshot.
+    int64_t count = 0;
+    for (int i = 0; i < CHANNELS_NUM_STRIPES; i++) {
+        PyThread_acquire_lock(channels->stripes[i].mutex, WAIT_LOCK);
+        count += channels->stripes[i].count;
+    }
+
     struct channel_id_and_info *ids =
-        PyMem_NEW(struct channel_id_and_info, (Py_ssize_t)(channels->numopen));
+        PyMem_NEW(struct channel_id_and_info, (Py_ssize_t)count);
     if (ids == NULL) {
         goto done;
     }
-    _channelref *ref = channels->head;
-    for (int64_t i=0; ref != NULL; ref = ref->next, i++) {
-        ids[i] = (struct channel_id_and_info){
-            .id = ref->cid,
-            .unboundop = ref->chan->defaults.unboundop,
-        };
+    int64_t n = 0;
+    for (int i = 0; i < CHANNELS_NUM_STRIPES; i++) {
+        _channelsstripe *stripe = &channels->stripes[i];
+        for (Py_ssize_t b = 0; b < stripe->numbuckets; b++) {
+            _channelref *ref = stripe->buckets[b];
+            for (; ref != NULL; ref = ref->next, n++) {
+                ids[n] = (struct channel_id_and_info){
+                    .id = ref->cid,
+                    .unboundop = ref->chan->defaults.unboundop,
+                };
+            }
+        }
     }
-    *count = channels->numopen;
+    assert(n == count);
+    *p_count = count;
 
-    cids = ids;
 done:
-    PyThread_release_lock(channels->mutex);
-    return cids;
-}
-
+    for (int i = CHANNELS_NUM_STRIPES - 1; i >= 0; i--) {
+        PyThread_release_lock(channels->stripes[i].mutex);
+    }
+    if (ids != NULL) {
+        qsort(ids, (size_t)count, sizeof(*ids), _channel_id_and_info_cmp);
+    }
+    return ids;
+}
+
 static void
 _channels_clear_interpreter(_channels *channels, int64_t interpid)
 {
-    PyThread_acquire_lock(channels->mutex, WAIT_LOCK);
-
-    _channelref *ref = channels->head;
-    for (; ref != NULL; ref = ref->next) {
-        if (ref->chan != NULL) {
-            _channel_clear_interpreter(ref->chan, interpid);
+    for (int i = 0; i < CHANNELS_NUM_STRIPES; i++) {
+        _channelsstripe *stripe = &channels->stripes[i];
+        PyThread_acquire_lock(stripe->mutex, WAIT_LOCK);
+        for (Py_ssize_t b = 0; b < stripe->numbuckets; b++) {
+            _channelref *ref = stripe->buckets[b];
+            for (; ref != NULL; ref = ref->next) {
+                if (ref->chan != NULL) {
+                    _channel_clear_interpreter(ref->chan, interpid);
+                }
+            }
         }
+        PyThread_release_lock(stripe->mutex);
     }
-
-    PyThread_release_lock(channels->mutex);
 }
 
 
@@ -1712,13 +2620,13 @@ _channel_finish_closing(_channel_state *chan) {
 
 // Create a new channel.
 static int64_t
-channel_create(_channels *channels, int unboundop)
+channel_create(_channels *channels, int unboundop, Py_ssize_t maxsize)
 {
     PyThread_type_lock mutex = PyThread_allocate_lock();
     if (mutex == NULL) {
         return ERR_CHANNEL_MUTEX_INIT;
     }
-    _channel_state *chan = _channel_new(mutex, unboundop);
+    _channel_state *chan = _channel_new(mutex, unboundop, maxsize);
     if (chan == NULL) {
         PyThread_free_lock(mutex);
         return -1;
@@ -1745,12 +2653,16 @@ channel_destroy(_channels *channels, int64_t cid)
     return 0;
 }
 
-// Push an object onto the channel.
+// Push an object onto the channel.  Fail if full.
 // The current interpreter gets associated with the send end of the channel.
 // Optionally request to be notified when it is received.
+// If a waiter is provided and the channel is full then the waiter
+// is registered and the channel is set on p_waitchan.
+// "nbytes" is the size of the object's buffer, if it is shared as one.
 static int
-channel_send(_channels *channels, int64_t cid, PyObject *obj,
-             _waiting_t *waiting, int unboundop)
+_channel_send(_channels *channels, int64_t cid, PyObject *obj,
+              Py_ssize_t nbytes, _waiting_t *waiting, int unboundop,
+              _channelwaiter *waiter, _channel_state **p_waitchan)
 {
     PyInterpreterState *interp = _get_current_interp();
     if (interp == NULL) {
@@ -1791,7 +2703,8 @@ channel_send(_channels *channels, int64_t cid, PyObject *obj,
     }
 
     // Add the data to the channel.
-    int res = _channel_add(chan, interpid, data, waiting, unboundop);
+    int res = _channel_add(chan, interpid, data, nbytes, waiting, unboundop,
+                           waiter, p_waitchan);
     PyThread_release_lock(mutex);
     if (res != 0) {
         // We may chain an exception here:
@@ -1803,6 +2716,14 @@ channel_send(_channels *channels, int64_t cid, PyObject *obj,
     return 0;
 }
 
+static int
+channel_send(_channels *channels, int64_t cid, PyObject *obj,
+             Py_ssize_t nbytes, _waiting_t *waiting, int unboundop)
+{
+    return _channel_send(channels, cid, obj, nbytes, waiting, unboundop,
+                         NULL, NULL);
+}
+
 // Basically, un-send an object.
 static void
 channel_clear_sent(_channels *channels, int64_t cid, _waiting_t *waiting)
@@ -1819,8 +2740,7 @@ channel_clear_sent(_channels *channels, int64_t cid, _waiting_t *waiting)
     assert(chan != NULL);
     // Past this point we are responsible for releasing the mutex.
 
-    _channelitem_id_t itemid = _waiting_get_itemid(waiting);
-    _channel_remove(chan, itemid);
+    _channel_remove(chan, waiting);
 
     PyThread_release_lock(mutex);
 }
@@ -1828,7 +2748,7 @@ channel_clear_sent(_channels *channels, int64_t cid, _waiting_t *waiting)
 // Like channel_send(), but strictly wait for the object to be received.
 static int
 channel_send_wait(_channels *channels, int64_t cid, PyObject *obj,
-                  int unboundop, PY_TIMEOUT_T timeout)
+                  Py_ssize_t nbytes, int unboundop, PY_TIMEOUT_T timeout)
 {
     // We use a stack variable here, so we must ensure that &waiting
     // is not held by any channel item at the point this function exits.
@@ -1838,8 +2758,35 @@ channel_send_wait(_channels *channels, int64_t cid, PyObject *obj,
         return -1;
     }
 
-    /* Queue up the object. */
-    int res = channel_send(channels, cid, obj, &waiting, unboundop);
+    /* Queue up the object, first waiting for space if the channel is full. */
+    _channelwaiter waiter = {0};
+    PyTime_t deadline = timeout > 0 ? _PyDeadline_Init(timeout) : 0;
+    int res;
+    while (1) {
+        _channel_state *chan = NULL;
+        res = _channel_send(channels, cid, obj, nbytes, &waiting, unboundop,
+                            timeout != 0 ? &waiter : NULL, &chan);
+        if (res != ERR_CHANNEL_FULL || chan == NULL) {
+            break;
+        }
+        int waited = _channel_wait(chan, 1, &waiter, timeout);
+        // Past this point the channel may have been freed.
+        if (waited < 0) {
+            assert(PyErr_Occurred());
+            res = -1;
+            break;
+        }
+        if (timeout > 0) {
+            // We try one last time if the timeout expired.
+            PY_TIMEOUT_T remaining = waited ? 0 : _PyDeadline_Get(deadline);
+            timeout = remaining > 0 ? remaining : 0;
+        }
+    }
+    _channelwaiter_clear(&waiter);
+    if (res == ERR_CHANNEL_FULL) {
+        PyErr_SetString(PyExc_TimeoutError, "timed out");
+        res = -1;
+    }
     if (res < 0) {
         assert(waiting.status == WAITING_NO_STATUS);
         goto finally;
@@ -1877,47 +2824,20 @@ finally:
     return res;
 }
 
-// Pop the next object off the channel.  Fail if empty.
-// The current interpreter gets associated with the recv end of the channel.
-// XXX Support a "wait" mutex?
+// Convert a popped item's data back to an object and notify its
+// sender, if waiting.  The data is freed.  If the item was unbound
+// then *res is left NULL.
 static int
-channel_recv(_channels *channels, int64_t cid, PyObject **res, int *p_unboundop)
+_channelpopped_to_object(_channelpopped *popped, PyObject **res)
 {
-    int err;
     *res = NULL;
-
-    PyInterpreterState *interp = _get_current_interp();
-    if (interp == NULL) {
-        // XXX Is this always an error?
-        if (PyErr_Occurred()) {
-            return -1;
-        }
-        return 0;
-    }
-    int64_t interpid = PyInterpreterState_GetID(interp);
-
-    // Look up the channel.
-    PyThread_type_lock mutex = NULL;
-    _channel_state *chan = NULL;
-    err = _channels_lookup(channels, cid, &mutex, &chan);
-    if (err != 0) {
-        return err;
-    }
-    assert(chan != NULL);
-    // Past this point we are responsible for releasing the mutex.
-
-    // Pop off the next item from the channel.
-    _PyXIData_t *data = NULL;
-    _waiting_t *waiting = NULL;
-    err = _channel_next(chan, interpid, &data, &waiting, p_unboundop);
-    PyThread_release_lock(mutex);
-    if (err != 0) {
-        return err;
-    }
-    else if (data == NULL) {
+    _PyXIData_t *data = popped->data;
+    _waiting_t *waiting = popped->waiting;
+    popped->data = NULL;
+    popped->waiting = NULL;
+    if (data == NULL) {
         // The item was unbound.
         assert(!PyErr_Occurred());
-        *res = NULL;
         return 0;
     }
 
@@ -1953,152 +2873,689 @@ channel_recv(_channels *channels, int64_t cid, PyObject **res, int *p_unboundop)
     return 0;
 }
 
-// Disallow send/recv for the current interpreter.
-// The channel is marked as closed if no other interpreters
-// are currently associated.
+// Add each of the objects to the channel, in order.  The objects are
+// all converted up front and then pushed in as few acquisitions of the
+// channel's lock as there is space for.  Unlike channel_send_wait(),
+// this only waits for space, not for the objects to be received.
+// The number added is set on p_added.
 static int
-channel_release(_channels *channels, int64_t cid, int send, int recv)
+channel_send_many(_channels *channels, int64_t cid, PyObject *seq,
+                  int unboundop, PY_TIMEOUT_T timeout, Py_ssize_t *p_added)
 {
+    *p_added = 0;
     PyInterpreterState *interp = _get_current_interp();
     if (interp == NULL) {
         return -1;
     }
     int64_t interpid = PyInterpreterState_GetID(interp);
 
+    _PyXIData_lookup_context_t ctx;
+    if (_PyXIData_GetLookupContext(interp, &ctx) < 0) {
+        return -1;
+    }
+
+    Py_ssize_t count = PySequence_Fast_GET_SIZE(seq);
+    PyObject **objs = PySequence_Fast_ITEMS(seq);
+    if (count == 0) {
+        return 0;
+    }
+
+    // Convert the objects to cross-interpreter data.
+    int err = 0;
+    Py_ssize_t converted = 0;
+    Py_ssize_t added = 0;
+    _channelwaiter waiter = {0};
+    int blocking = timeout != 0;
+    PyTime_t deadline = timeout > 0 ? _PyDeadline_Init(timeout) : 0;
+    _PyXIData_t **data = PyMem_RawMalloc(sizeof(_PyXIData_t *) * count);
+    if (data == NULL) {
+        PyErr_NoMemory();
+        return -1;
+    }
+    for (; converted < count; converted++) {
+        _PyXIData_t *xidata = GLOBAL_MALLOC(_PyXIData_t);
+        if (xidata == NULL) {
+            PyErr_NoMemory();
+            err = -1;
+            goto finally;
+        }
+        if (_PyObject_GetXIData(&ctx, objs[converted], xidata) != 0) {
+            GLOBAL_FREE(xidata);
+            err = -1;
+            goto finally;
+        }
+        data[converted] = xidata;
+    }
+
+    /* Queue up the objects, waiting for space as needed. */
+    while (added < count) {
+        // Look up the channel.
+        PyThread_type_lock mutex = NULL;
+        _channel_state *chan = NULL;
+        err = _channels_lookup(channels, cid, &mutex, &chan);
+        if (err != 0) {
+            break;
+        }
+        assert(chan != NULL);
+        if (chan->closing != NULL) {
+            PyThread_release_lock(mutex);
+            err = ERR_CHANNEL_CLOSED;
+            break;
+        }
+
+        // Add the data to the channel.
+        _channel_state *waitchan = NULL;
+        Py_ssize_t n = 0;
+        err = _channel_add_many(chan, interpid, &data[added], count - added,
+                                unboundop, timeout != 0 ? &waiter : NULL,
+                                &waitchan, &n);
+        PyThread_release_lock(mutex);
+        added += n;
+        if (err != ERR_CHANNEL_FULL || waitchan == NULL) {
+            if (err != 0) {
+                break;
+            }
+            continue;
+        }
+
+        /* Wait until there is space or the channel is closed. */
+        int waited = _channel_wait(waitchan, 1, &waiter, timeout);
+        // Past this point the channel may have been freed.
+        if (waited < 0) {
+            assert(PyErr_Occurred());
+            err = -1;
+            break;
+        }
+        if (timeout > 0) {
+            // We try one last time if the timeout expired.
+            PY_TIMEOUT_T remaining = waited ? 0 : _PyDeadline_Get(deadline);
+            timeout = remaining > 0 ? remaining : 0;
+        }
+    }
+    if (err == ERR_CHANNEL_FULL) {
+        if (added > 0) {
+            // We ran out of time (or space) partway through.
+            err = 0;
+        }
+        else if (blocking) {
+            PyErr_SetString(PyExc_TimeoutError, "timed out");
+            err = -1;
+        }
+    }
+
+finally:
+    _channelwaiter_clear(&waiter);
+    // Release whatever didn't make it into the channel.
+    for (Py_ssize_t i = added; i < converted; i++) {
+        (void)_release_xid_data(data[i], XID_IGNORE_EXC | XID_FREE);
+    }
+    PyMem_RawFree(data);
+    *p_added = added;
+    return err;
+}
+
+// Pop the next object off the channel.  Fail if empty.
+// The current interpreter gets associated with the recv end of the channel.
+// If a waiter is provided and the channel is empty then the waiter
+// is registered and the channel is set on p_waitchan.
+static int
+_channel_recv(_channels *channels, int64_t cid, _channelwaiter *waiter,
+              _channel_state **p_waitchan, PyObject **res, int *p_unboundop)
+{
+    int err;
+    *res = NULL;
+
+    PyInterpreterState *interp = _get_current_interp();
+    if (interp == NULL) {
+        // XXX Is this always an error?
+        if (PyErr_Occurred()) {
+            return -1;
+        }
+        return 0;
+    }
+    int64_t interpid = PyInterpreterState_GetID(interp);
+
     // Look up the channel.
     PyThread_type_lock mutex = NULL;
     _channel_state *chan = NULL;
-    int err = _channels_lookup(channels, cid, &mutex, &chan);
+    err = _channels_lookup(channels, cid, &mutex, &chan);
     if (err != 0) {
         return err;
     }
+    assert(chan != NULL);
     // Past this point we are responsible for releasing the mutex.
 
-    // Close one or both of the two ends.
-    int res = _channel_release_interpreter(chan, interpid, send-recv);
+    // Pop off the next item from the channel.
+    _channelpopped popped = {0};
+    err = _channel_next(chan, interpid, waiter, p_waitchan,
+                        &popped.data, &popped.waiting, &popped.unboundop);
     PyThread_release_lock(mutex);
-    return res;
+    if (err != 0) {
+        return err;
+    }
+    *p_unboundop = popped.unboundop;
+    return _channelpopped_to_object(&popped, res);
 }
 
-// Close the channel (for all interpreters).  Fail if it's already closed.
-// Close immediately if it's empty.  Otherwise, disallow sending and
-// finally close once empty.  Optionally, immediately clear and close it.
 static int
-channel_close(_channels *channels, int64_t cid, int end, int force)
+channel_recv(_channels *channels, int64_t cid, PyObject **res, int *p_unboundop)
 {
-    return _channels_close(channels, cid, NULL, end, force);
+    return _channel_recv(channels, cid, NULL, NULL, res, p_unboundop);
 }
 
-// Return true if the identified interpreter is associated
-// with the given end of the channel.
+// Like channel_recv(), but wait until an object has been sent
+// or the channel is closed.
 static int
-channel_is_associated(_channels *channels, int64_t cid, int64_t interpid,
-                       int send)
+channel_recv_wait(_channels *channels, int64_t cid, PyObject **res,
+                  int *p_unboundop, PY_TIMEOUT_T timeout)
 {
-    _channel_state *chan = NULL;
-    int err = _channels_lookup(channels, cid, NULL, &chan);
-    if (err != 0) {
-        return err;
-    }
-    else if (send && chan->closing != NULL) {
-        return ERR_CHANNEL_CLOSED;
+    // We use a stack variable here, so we must ensure that &waiter
+    // is not held by any channel at the point this function exits.
+    _channelwaiter waiter;
+    if (_channelwaiter_init(&waiter) < 0) {
+        assert(PyErr_Occurred());
+        return -1;
     }
 
-    _channelend *end = _channelend_find(send ? chan->ends->send : chan->ends->recv,
-                                        interpid, NULL);
+    PyTime_t deadline = timeout > 0 ? _PyDeadline_Init(timeout) : 0;
+    int err;
+    while (1) {
+        _channel_state *chan = NULL;
+        err = _channel_recv(channels, cid, timeout != 0 ? &waiter : NULL,
+                            &chan, res, p_unboundop);
+        if (err != ERR_CHANNEL_EMPTY || chan == NULL) {
+            break;
+        }
 
-    return (end != NULL && end->open);
+        /* Wait until an object is sent or the channel is closed. */
+        int waited = _channel_wait(chan, 0, &waiter, timeout);
+        // Past this point the channel may have been freed.
+        if (waited < 0) {
+            assert(PyErr_Occurred());
+            err = -1;
+            break;
+        }
+        if (timeout > 0) {
+            // We try one last time if the timeout expired.
+            PY_TIMEOUT_T remaining = waited ? 0 : _PyDeadline_Get(deadline);
+            timeout = remaining > 0 ? remaining : 0;
+        }
+    }
+    if (err == ERR_CHANNEL_EMPTY) {
+        PyErr_SetString(PyExc_TimeoutError, "timed out");
+        err = -1;
+    }
+
+    _channelwaiter_clear(&waiter);
+    return err;
 }
 
-static int
-_channel_get_count(_channels *channels, int64_t cid, Py_ssize_t *p_count)
+static void
+_channelpopped_clear(_channelpopped *popped)
 {
-    PyThread_type_lock mutex = NULL;
-    _channel_state *chan = NULL;
-    int err = _channels_lookup(channels, cid, &mutex, &chan);
-    if (err != 0) {
-        return err;
+    if (popped->data != NULL) {
+        (void)_release_xid_data(popped->data, XID_IGNORE_EXC | XID_FREE);
+        popped->data = NULL;
+    }
+    if (popped->waiting != NULL) {
+        _waiting_release(popped->waiting, 0);
+        popped->waiting = NULL;
     }
-    assert(chan != NULL);
-    int64_t count = chan->queue->count;
-    PyThread_release_lock(mutex);
-
-    *p_count = (Py_ssize_t)count;
-    return 0;
 }
 
-
-/* channel info */
-
-struct channel_info {
-    struct {
-        // 1: closed; -1: closing
-        int closed;
-        struct {
-            Py_ssize_t nsend_only;  // not released
-            Py_ssize_t nsend_only_released;
-            Py_ssize_t nrecv_only;  // not released
-            Py_ssize_t nrecv_only_released;
-            Py_ssize_t nboth;  // not released
-            Py_ssize_t nboth_released;
-            Py_ssize_t nboth_send_released;
-            Py_ssize_t nboth_recv_released;
-        } all;
-        struct {
-            // 1: associated; -1: released
-            int send;
-            int recv;
-        } cur;
-    } status;
-    int64_t count;
-};
-
+// Pop up to "max_items" objects off the channel, as a list of
+// (obj, unboundop) tuples like channelsmod_recv() returns.  Each batch
+// is popped under a single acquisition of the channel's lock.  If the
+// timeout is non-zero then this keeps waiting for more until there are
+// "max_items" or the timeout expires.
 static int
-_channel_get_info(_channels *channels, int64_t cid, struct channel_info *info)
+channel_recv_many(_channels *channels, int64_t cid, Py_ssize_t max_items,
+                  PY_TIMEOUT_T timeout, PyObject **res)
 {
-    int err = 0;
-    *info = (struct channel_info){0};
-
-    // Get the current interpreter.
+    *res = NULL;
     PyInterpreterState *interp = _get_current_interp();
     if (interp == NULL) {
         return -1;
     }
     int64_t interpid = PyInterpreterState_GetID(interp);
 
-    // Hold the global lock until we're done.
-    PyThread_acquire_lock(channels->mutex, WAIT_LOCK);
-
-    // Find the channel.
-    _channelref *ref = _channelref_find(channels->head, cid, NULL);
-    if (ref == NULL) {
-        err = ERR_CHANNEL_NOT_FOUND;
-        goto finally;
-    }
-    _channel_state *chan = ref->chan;
-
-    // Check if open.
-    if (chan == NULL) {
-        info->status.closed = 1;
-        goto finally;
-    }
-    if (!chan->open) {
-        assert(chan->queue->count == 0);
-        info->status.closed = 1;
-        goto finally;
+    // We use a stack variable here, so we must ensure that &waiter
+    // is not held by any channel at the point this function exits.
+    _channelwaiter waiter = {0};
+    int blocking = timeout != 0;
+    if (blocking && _channelwaiter_init(&waiter) < 0) {
+        assert(PyErr_Occurred());
+        return -1;
     }
-    if (chan->closing != NULL) {
-        assert(chan->queue->count > 0);
-        info->status.closed = -1;
+    _channelpopped *popped = PyMem_RawCalloc(max_items,
+                                             sizeof(_channelpopped));
+    if (popped == NULL) {
+        PyErr_NoMemory();
+        _channelwaiter_clear(&waiter);
+        return -1;
     }
-    else {
-        info->status.closed = 0;
+    PyObject *items = PyList_New(0);
+    if (items == NULL) {
+        PyMem_RawFree(popped);
+        _channelwaiter_clear(&waiter);
+        return -1;
     }
 
-    // Get the number of queued objects.
-    info->count = chan->queue->count;
+    PyTime_t deadline = timeout > 0 ? _PyDeadline_Init(timeout) : 0;
+    int err = 0;
+    while (PyList_GET_SIZE(items) < max_items) {
+        // Look up the channel.
+        PyThread_type_lock mutex = NULL;
+        _channel_state *chan = NULL;
+        err = _channels_lookup(channels, cid, &mutex, &chan);
+        if (err != 0) {
+            break;
+        }
+        assert(chan != NULL);
+
+        // Pop off the next batch of items from the channel.
+        _channel_state *waitchan = NULL;
+        Py_ssize_t count = 0;
+        err = _channel_next_many(chan, interpid,
+                                 max_items - PyList_GET_SIZE(items),
+                                 timeout != 0 ? &waiter : NULL, &waitchan,
+                                 popped, &count);
+        PyThread_release_lock(mutex);
 
-    // Get the ends statuses.
+        // Convert the data back to objects.
+        for (Py_ssize_t i = 0; i < count; i++) {
+            if (err < 0) {
+                _channelpopped_clear(&popped[i]);
+                continue;
+            }
+            PyObject *obj;
+            if (_channelpopped_to_object(&popped[i], &obj) < 0) {
+                err = -1;
+                continue;
+            }
+            PyObject *item = obj != NULL
+                ? Py_BuildValue("OO", obj, Py_None)
+                : Py_BuildValue("Oi", Py_None, popped[i].unboundop);
+            Py_XDECREF(obj);
+            if (item == NULL || PyList_Append(items, item) < 0) {
+                Py_XDECREF(item);
+                err = -1;
+                continue;
+            }
+            Py_DECREF(item);
+        }
+        if (err == 0 && timeout != 0) {
+            continue;
+        }
+        if (err != ERR_CHANNEL_EMPTY || waitchan == NULL) {
+            break;
+        }
+
+        /* Wait until an object is sent or the channel is closed. */
+        int waited = _channel_wait(waitchan, 0, &waiter, timeout);
+        // Past this point the channel may have been freed.
+        if (waited < 0) {
+            assert(PyErr_Occurred());
+            err = -1;
+            break;
+        }
+        if (timeout > 0) {
+            // We try one last time if the timeout expired.
+            PY_TIMEOUT_T remaining = waited ? 0 : _PyDeadline_Get(deadline);
+            timeout = remaining > 0 ? remaining : 0;
+        }
+    }
+    if (err != -1 && PyList_GET_SIZE(items) > 0) {
+        // Whatever stopped us, we return what we got.
+        err = 0;
+    }
+    else if (err == ERR_CHANNEL_EMPTY && blocking) {
+        PyErr_SetString(PyExc_TimeoutError, "timed out");
+        err = -1;
+    }
+
+    _channelwaiter_clear(&waiter);
+    PyMem_RawFree(popped);
+    if (err != 0) {
+        Py_DECREF(items);
+        return err;
+    }
+    *res = items;
+    return 0;
+}
+
+// Wait until one of several operations can proceed and then do it.
+// The first "nrecv" channels are received from and the rest are sent
+// the corresponding objects, like channel_send() with no waiting.
+// The index of the operation that was done (or that failed) is set
+// on p_index.  It is left at -1 if the timeout expired first.
+static int
+channel_select(_channels *channels, const int64_t *cids, PyObject **objs,
+               const int *unboundops, Py_ssize_t nrecv, Py_ssize_t count,
+               PY_TIMEOUT_T timeout, Py_ssize_t *p_index,
+               PyObject **res, int *p_unboundop)
+{
+    *p_index = -1;
+    *res = NULL;
+    _channelselector selector = {0};
+    _channelselect *links = NULL;
+    if (timeout != 0) {
+        if (_channelselector_init(&selector) < 0) {
+            return -1;
+        }
+        links = PyMem_RawCalloc(count, sizeof(_channelselect));
+        if (links == NULL) {
+            PyErr_NoMemory();
+            _channelselector_clear(&selector);
+            return -1;
+        }
+        for (Py_ssize_t i = 0; i < count; i++) {
+            links[i].selector = &selector;
+        }
+    }
+    PyTime_t deadline = timeout > 0 ? _PyDeadline_Init(timeout) : 0;
+
+    int err = 0;
+    while (1) {
+        // Find the first operation that can proceed.  The selector
+        // is registered with each channel that isn't ready.
+        Py_ssize_t ready = -1;
+        for (Py_ssize_t i = 0; i < count; i++) {
+            PyThread_type_lock mutex = NULL;
+            _channel_state *chan = NULL;
+            err = _channels_lookup(channels, cids[i], &mutex, &chan);
+            if (err != 0) {
+                *p_index = i;
+                break;
+            }
+            int send = (i >= nrecv);
+            int isready = _channel_select(chan, send,
+                                          links != NULL ? &links[i] : NULL);
+            PyThread_release_lock(mutex);
+            if (isready) {
+                ready = i;
+                break;
+            }
+        }
+
+        // We must not be registered with any channel while we
+        // receive or send, since doing so might free the channel.
+        int waited = 0;
+        if (err == 0 && ready < 0 && timeout != 0) {
+            waited = _channel_select_wait(&selector, links, count, timeout);
+        }
+        else if (links != NULL) {
+            for (Py_ssize_t i = 0; i < count; i++) {
+                _channel_unselect(&links[i]);
+            }
+        }
+        if (err != 0) {
+            break;
+        }
+
+        if (ready >= 0) {
+            if (ready < nrecv) {
+                err = channel_recv(channels, cids[ready], res, p_unboundop);
+            }
+            else {
+                err = channel_send(channels, cids[ready], objs[ready],
+                                   0, NULL, unboundops[ready]);
+            }
+            if (err != ERR_CHANNEL_EMPTY && err != ERR_CHANNEL_FULL) {
+                *p_index = ready;
+                break;
+            }
+            // Another thread beat us to it.
+            err = 0;
+        }
+        else if (timeout == 0) {
+            // Nothing was ready in time; *p_index stays -1.
+            break;
+        }
+        else if (waited < 0) {
+            assert(PyErr_Occurred());
+            err = -1;
+            break;
+        }
+        if (timeout > 0) {
+            // We check one last time if the timeout expired.
+            PY_TIMEOUT_T remaining = waited ? 0 : _PyDeadline_Get(deadline);
+            timeout = remaining > 0 ? remaining : 0;
+        }
+    }
+
+    PyMem_RawFree(links);
+    _channelselector_clear(&selector);
+    return err;
+}
+
+// Disallow send/recv for the current interpreter.
+// The channel is marked as closed if no other interpreters
+// are currently associated.
+static int
+channel_release(_channels *channels, int64_t cid, int send, int recv)
+{
+    PyInterpreterState *interp = _get_current_interp();
+    if (interp == NULL) {
+        return -1;
+    }
+    int64_t interpid = PyInterpreterState_GetID(interp);
+
+    // Look up the channel.
+    PyThread_type_lock mutex = NULL;
+    _channel_state *chan = NULL;
+    int err = _channels_lookup(channels, cid, &mutex, &chan);
+    if (err != 0) {
+        return err;
+    }
+    // Past this point we are responsible for releasing the mutex.
+
+    // Close one or both of the two ends.
+    int res = _channel_release_interpreter(chan, interpid, send-recv);
+    PyThread_release_lock(mutex);
+    return res;
+}
+
+// Close the channel (for all interpreters).  Fail if it's already closed.
+// Close immediately if it's empty.  Otherwise, disallow sending and
+// finally close once empty.  Optionally, immediately clear and close it.
+static int
+channel_close(_channels *channels, int64_t cid, int end, int force)
+{
+    return _channels_close(channels, cid, NULL, end, force);
+}
+
+// Return true if the identified interpreter is associated
+// with the given end of the channel.
+static int
+channel_is_associated(_channels *channels, int64_t cid, int64_t interpid,
+                       int send)
+{
+    _channel_state *chan = NULL;
+    int err = _channels_lookup(channels, cid, NULL, &chan);
+    if (err != 0) {
+        return err;
+    }
+    else if (send && chan->closing != NULL) {
+        return ERR_CHANNEL_CLOSED;
+    }
+
+    _channelend *end = _channelend_find(send ? chan->ends->send : chan->ends->recv,
+                                        interpid, NULL);
+
+    return (end != NULL && end->open);
+}
+
+static int
+_channel_get_count(_channels *channels, int64_t cid, Py_ssize_t *p_count)
+{
+    PyThread_type_lock mutex = NULL;
+    _channel_state *chan = NULL;
+    int err = _channels_lookup(channels, cid, &mutex, &chan);
+    if (err != 0) {
+        return err;
+    }
+    assert(chan != NULL);
+    int64_t count = chan->queue->count;
+    PyThread_release_lock(mutex);
+
+    *p_count = (Py_ssize_t)count;
+    return 0;
+}
+
+static int
+channel_watch(_channels *channels, int64_t cid, int fd)
+{
+    PyThread_type_lock mutex = NULL;
+    _channel_state *chan = NULL;
+    int err = _channels_lookup(channels, cid, &mutex, &chan);
+    if (err != 0) {
+        return err;
+    }
+    assert(chan != NULL);
+    int64_t interpid = PyInterpreterState_GetID(_get_current_interp());
+    err = _channel_watch(chan, interpid, fd);
+    PyThread_release_lock(mutex);
+    return err;
+}
+
+static int
+channel_unwatch(_channels *channels, int64_t cid, int fd)
+{
+    // Unlike most operations, this works for closed channels too,
+    // since the fd would otherwise be written to when the channel
+    // is eventually freed.
+    _channelsstripe *stripe = _channels_get_stripe(channels->stripes, cid);
+    PyThread_acquire_lock(stripe->mutex, WAIT_LOCK);
+    _channelref *ref = _channelsstripe_find(stripe, cid, NULL);
+    if (ref == NULL) {
+        PyThread_release_lock(stripe->mutex);
+        return ERR_CHANNEL_NOT_FOUND;
+    }
+    if (ref->chan != NULL) {
+        int64_t interpid = PyInterpreterState_GetID(_get_current_interp());
+        _channel_unwatch(ref->chan, interpid, fd);
+    }
+    PyThread_release_lock(stripe->mutex);
+    return 0;
+}
+
+
+/* channel info */
+
+struct channel_info {
+    struct {
+        // 1: closed; -1: closing
+        int closed;
+        struct {
+            Py_ssize_t nsend_only;  // not released
+            Py_ssize_t nsend_only_released;
+            Py_ssize_t nrecv_only;  // not released
+            Py_ssize_t nrecv_only_released;
+            Py_ssize_t nboth;  // not released
+            Py_ssize_t nboth_released;
+            Py_ssize_t nboth_send_released;
+            Py_ssize_t nboth_recv_released;
+        } all;
+        struct {
+            // 1: associated; -1: released
+            int send;
+            int recv;
+        } cur;
+    } status;
+    int64_t count;
+    _channelstats stats;
+    Py_ssize_t num_waiting_senders;
+    // in nanoseconds
+    PyTime_t max_send_wait;
+    PyTime_t oldest_age;
+};
+
+static void
+_channel_get_stats(_channel_state *chan, struct channel_info *info)
+{
+    PyTime_t now;
+    (void)PyTime_MonotonicRaw(&now);
+    PyThread_acquire_lock(chan->mutex, WAIT_LOCK);
+
+    info->stats = chan->stats;
+    if (chan->queue->first != NULL) {
+        info->oldest_age = now - chan->queue->first->queued;
+    }
+
+    // Senders are waiting either for space or to be received.
+    PyTime_t since = now;
+    for (_channelwaiter *waiter = chan->sendwaiters.first;
+            waiter != NULL; waiter = waiter->next)
+    {
+        info->num_waiting_senders += 1;
+        if (waiter->since < since) {
+            since = waiter->since;
+        }
+    }
+    for (_channelitem *item = chan->queue->first;
+            item != NULL; item = item->next)
+    {
+        if (item->waiting != NULL) {
+            info->num_waiting_senders += 1;
+            if (item->waiting->since < since) {
+                since = item->waiting->since;
+            }
+        }
+    }
+    info->max_send_wait = now - since;
+
+    PyThread_release_lock(chan->mutex);
+}
+
+static int
+_channel_get_info(_channels *channels, int64_t cid, struct channel_info *info)
+{
+    int err = 0;
+    *info = (struct channel_info){0};
+
+    // Get the current interpreter.
+    PyInterpreterState *interp = _get_current_interp();
+    if (interp == NULL) {
+        return -1;
+    }
+    int64_t interpid = PyInterpreterState_GetID(interp);
+
+    // Hold the registry lock until we're done.
+    _channelsstripe *stripe = _channels_get_stripe(channels->stripes, cid);
+    PyThread_acquire_lock(stripe->mutex, WAIT_LOCK);
+
+    // Find the channel.
+    _channelref *ref = _channelsstripe_find(stripe, cid, NULL);
+    if (ref == NULL) {
+        err = ERR_CHANNEL_NOT_FOUND;
+        goto finally;
+    }
+    _channel_state *chan = ref->chan;
+
+    // Check if open.
+    if (chan == NULL) {
+        info->status.closed = 1;
+        goto finally;
+    }
+    _channel_get_stats(chan, info);
+    if (!chan->open) {
+        assert(chan->queue->count == 0);
+        info->status.closed = 1;
+        goto finally;
+    }
+    if (chan->closing != NULL) {
+        assert(chan->queue->count > 0);
+        info->status.closed = -1;
+    }
+    else {
+        info->status.closed = 0;
+    }
+
+    // Get the number of queued objects.
+    info->count = chan->queue->count;
+
+    // Get the ends statuses.
     assert(info->status.cur.send == 0);
     assert(info->status.cur.recv == 0);
     _channelend *send = chan->ends->send;
@@ -2163,7 +3620,7 @@ _channel_get_info(_channels *channels, int64_t cid, struct channel_info *info)
     }
 
 finally:
-    PyThread_release_lock(channels->mutex);
+    PyThread_release_lock(stripe->mutex);
     return err;
 }
 
@@ -2198,6 +3655,14 @@ static PyStructSequence_Field channel_info_fields[] = {
     {"send_released", "current interpreter *was* bound to the send end"},
     {"recv_associated", "current interpreter is bound to the recv end"},
     {"recv_released", "current interpreter *was* bound to the recv end"},
+
+    {"num_sent", "objects sent, ever"},
+    {"num_received", "objects received, ever"},
+    {"buffer_bytes_sent", "bytes sent as buffers (e.g. send_buffer()), ever"},
+    {"num_waiting_senders",
+     "senders waiting for space or for their object to be received"},
+    {"max_send_wait", "seconds the longest-waiting sender has waited"},
+    {"oldest_age", "seconds the oldest queued object has been queued"},
     {0}
 };
 
@@ -2235,6 +3700,15 @@ new_channel_info(PyObject *mod, struct channel_info *info)
         } \
         PyStructSequence_SET_ITEM(self, pos++, obj); \
     } while(0)
+#define SET_SECONDS(val) \
+    do { \
+        PyObject *obj = PyFloat_FromDouble(PyTime_AsSecondsDouble(val)); \
+        if (obj == NULL) { \
+            Py_CLEAR(self); \
+            return NULL; \
+        } \
+        PyStructSequence_SET_ITEM(self, pos++, obj); \
+    } while(0)
     SET_BOOL(info->status.closed == 0);
     SET_BOOL(info->status.closed == -1);
     SET_BOOL(info->status.closed == 1);
@@ -2251,6 +3725,13 @@ new_channel_info(PyObject *mod, struct channel_info *info)
     SET_BOOL(info->status.cur.send == -1);
     SET_BOOL(info->status.cur.recv == 1);
     SET_BOOL(info->status.cur.recv == -1);
+    SET_COUNT(info->stats.sent);
+    SET_COUNT(info->stats.received);
+    SET_COUNT(info->stats.buffer_bytes_sent);
+    SET_COUNT(info->num_waiting_senders);
+    SET_SECONDS(info->max_send_wait);
+    SET_SECONDS(info->oldest_age);
+#undef SET_SECONDS
 #undef SET_COUNT
 #undef SET_BOOL
     assert(!PyErr_Occurred());
@@ -2814,9 +4295,625 @@ set_channelend_types(PyObject *mod, PyTypeObject *send, PyTypeObject *recv)
 }
 
 
-/* module level code ********************************************************/
+/* buffer pools *************************************************************/
 
-/* globals is the process-global state for the module.  It holds all
+/* A buffer pool holds a fixed number of preallocated buffers, all the
+   same size, which may be sent through a channel without being copied.
+   Each buffer has exactly one owner at a time: the PooledBuffer it was
+   acquired as, then the channel item it was sent as, and then the
+   PooledBuffer it was received as.  Whichever owner drops it puts it
+   back in the pool.  The one exception is a sent buffer that is never
+   received (e.g. the send failed or was cancelled).  Then it goes back
+   to the PooledBuffer it was sent from, if that is still around.
+
+   The pool's state is allocated with the "raw" allocator and has its
+   own lock, so a buffer may be returned in any interpreter, without
+   calling into the interpreter that created the pool (which might be
+   blocked waiting for that very buffer). */
+
+typedef struct _bufferpool _bufferpool;
+
+typedef struct _bufferslot {
+    _bufferpool *pool;
+    char *data;
+    struct _bufferslot *next;
+    // These identify PooledBuffer objects, but are only ever compared,
+    // never dereferenced, since the objects may belong to any
+    // interpreter.  Both are protected by the pool's lock.
+    // The object that currently owns the buffer, if any.
+    void *owner;
+    // The object the buffer was sent from, while it is in a channel.
+    void *sender;
+} _bufferslot;
+
+struct _bufferpool {
+    PyThread_type_lock mutex;
+    Py_ssize_t size;
+    Py_ssize_t count;
+    char *data;
+    _bufferslot *slots;
+    _bufferslot *free;
+    Py_ssize_t numfree;
+    // The number of PooledBuffer objects that point into the pool,
+    // including ones that sent their buffer.
+    Py_ssize_t numobjects;
+    // The threads blocked in acquire().
+    _channelwaiters waiters;
+    // The pool is freed once it is closed, every buffer is back,
+    // and no PooledBuffer objects are left.
+    int closed;
+};
+
+// The caller must hold the pool's lock.
+#define _bufferpool_is_done(pool) \
+    ((pool)->closed && (pool)->numfree == (pool)->count \
+     && (pool)->numobjects == 0)
+
+static void
+_bufferpool_free(_bufferpool *pool)
+{
+    if (pool->mutex != NULL) {
+        PyThread_free_lock(pool->mutex);
+    }
+    PyMem_RawFree(pool->slots);
+    PyMem_RawFree(pool->data);
+    GLOBAL_FREE(pool);
+}
+
+static _bufferpool *
+_bufferpool_new(Py_ssize_t size, Py_ssize_t count)
+{
+    assert(size > 0 && count > 0);
+    if (size > PY_SSIZE_T_MAX / count) {
+        PyErr_NoMemory();
+        return NULL;
+    }
+    _bufferpool *pool = GLOBAL_MALLOC(_bufferpool);
+    if (pool == NULL) {
+        PyErr_NoMemory();
+        return NULL;
+    }
+    *pool = (_bufferpool){
+        .size = size,
+        .count = count,
+    };
+    pool->mutex = PyThread_allocate_lock();
+    pool->data = PyMem_RawMalloc(size * count);
+    pool->slots = PyMem_RawCalloc(count, sizeof(_bufferslot));
+    if (pool->mutex == NULL || pool->data == NULL || pool->slots == NULL) {
+        _bufferpool_free(pool);
+        PyErr_NoMemory();
+        return NULL;
+    }
+
+    // The buffers are handed out in order, at first.
+    for (Py_ssize_t i = count - 1; i >= 0; i--) {
+        _bufferslot *slot = &pool->slots[i];
+        slot->pool = pool;
+        slot->data = pool->data + i * size;
+        slot->next = pool->free;
+        pool->free = slot;
+    }
+    pool->numfree = count;
+    return pool;
+}
+
+static void
+_bufferpool_close(_bufferpool *pool)
+{
+    PyThread_acquire_lock(pool->mutex, WAIT_LOCK);
+    // Each blocked thread holds a reference to the pool object.
+    assert(pool->waiters.first == NULL);
+    pool->closed = 1;
+    int done = _bufferpool_is_done(pool);
+    PyThread_release_lock(pool->mutex);
+    if (done) {
+        _bufferpool_free(pool);
+    }
+}
+
+// Take a buffer from the pool.  If there isn't one and a waiter is
+// provided then it is registered, to be notified when one is returned.
+static _bufferslot *
+_bufferpool_pop(_bufferpool *pool, _channelwaiter *waiter)
+{
+    PyThread_acquire_lock(pool->mutex, WAIT_LOCK);
+    _bufferslot *slot = pool->free;
+    if (slot != NULL) {
+        pool->free = slot->next;
+        slot->next = NULL;
+        pool->numfree -= 1;
+    }
+    else if (waiter != NULL) {
+        _channelwaiters_add(&pool->waiters, waiter);
+    }
+    PyThread_release_lock(pool->mutex);
+    return slot;
+}
+
+static int
+_bufferpool_wait(_bufferpool *pool, _channelwaiter *waiter,
+                 PY_TIMEOUT_T timeout)
+{
+    int res = _channelwaiter_wait(waiter, timeout);
+
+    PyThread_acquire_lock(pool->mutex, WAIT_LOCK);
+    _channelwaiters_remove(&pool->waiters, waiter);
+    if (res != 0 && waiter->notified) {
+        // We were notified right as we gave up, so we re-arm the lock.
+        PyThread_acquire_lock(waiter->mutex, NOWAIT_LOCK);
+        if (res < 0) {
+            // Pass the notification on to the next waiter.
+            _channelwaiters_notify(&pool->waiters, 1);
+        }
+    }
+    waiter->notified = 0;
+    PyThread_release_lock(pool->mutex);
+    return res;
+}
+
+// Put the buffer back in the pool and wake up a blocked thread.
+// The caller must hold the pool's lock.
+static void
+_bufferslot_push(_bufferslot *slot)
+{
+    _bufferpool *pool = slot->pool;
+    assert(slot->next == NULL);
+    slot->owner = NULL;
+    slot->sender = NULL;
+    slot->next = pool->free;
+    pool->free = slot;
+    pool->numfree += 1;
+    _channelwaiters_notify(&pool->waiters, 1);
+}
+
+static void
+_bufferslot_release(_bufferslot *slot)
+{
+    _bufferpool *pool = slot->pool;
+    PyThread_acquire_lock(pool->mutex, WAIT_LOCK);
+    _bufferslot_push(slot);
+    int done = _bufferpool_is_done(pool);
+    PyThread_release_lock(pool->mutex);
+    if (done) {
+        _bufferpool_free(pool);
+    }
+}
+
+// This is the "free" func for the cross-interpreter data of a buffer
+// that was sent but never received.  The buffer goes back to the object
+// it was sent from, if there still is one, and otherwise to the pool.
+static void
+_bufferslot_free(void *data)
+{
+    _bufferslot *slot = (_bufferslot *)data;
+    _bufferpool *pool = slot->pool;
+    PyThread_acquire_lock(pool->mutex, WAIT_LOCK);
+    if (slot->sender != NULL) {
+        slot->owner = slot->sender;
+        slot->sender = NULL;
+        PyThread_release_lock(pool->mutex);
+        return;
+    }
+    PyThread_release_lock(pool->mutex);
+    _bufferslot_release(slot);
+}
+
+// Wait until a buffer is available and take it.  A timeout of 0
+// means we don't wait at all.
+static _bufferslot *
+_bufferpool_acquire(_bufferpool *pool, PY_TIMEOUT_T timeout)
+{
+    _bufferslot *slot = _bufferpool_pop(pool, NULL);
+    if (slot != NULL) {
+        return slot;
+    }
+    if (timeout == 0) {
+        PyErr_SetString(PyExc_BufferError, "no buffers available");
+        return NULL;
+    }
+
+    // We use a stack variable here, so we must ensure that &waiter
+    // is not held by the pool at the point this function exits.
+    _channelwaiter waiter;
+    if (_channelwaiter_init(&waiter) < 0) {
+        assert(PyErr_Occurred());
+        return NULL;
+    }
+
+    PyTime_t deadline = timeout > 0 ? _PyDeadline_Init(timeout) : 0;
+    while (1) {
+        slot = _bufferpool_pop(pool, timeout != 0 ? &waiter : NULL);
+        if (slot != NULL) {
+            break;
+        }
+        if (timeout == 0) {
+            PyErr_SetString(PyExc_TimeoutError, "timed out");
+            break;
+        }
+
+        /* Wait until a buffer is returned to the pool. */
+        int waited = _bufferpool_wait(pool, &waiter, timeout);
+        if (waited < 0) {
+            assert(PyErr_Occurred());
+            break;
+        }
+        if (timeout > 0) {
+            // We try one last time if the timeout expired.
+            PY_TIMEOUT_T remaining = waited ? 0 : _PyDeadline_Get(deadline);
+            timeout = remaining > 0 ? remaining : 0;
+        }
+    }
+
+    _channelwaiter_clear(&waiter);
+    return slot;
+}
+
+
+/* PooledBuffer class */
+
+typedef struct {
+    PyObject_HEAD
+    // The object always keeps its slot, but it only owns the buffer
+    // while slot->owner is the object (see _pooledbuffer_owns()).
+    _bufferslot *slot;
+    Py_ssize_t exports;
+} pooledbufferobject;
+
+// This takes ownership of the buffer, even on failure.
+static PyObject *
+new_pooled_buffer(PyTypeObject *cls, _bufferslot *slot)
+{
+    pooledbufferobject *self = PyObject_New(pooledbufferobject, cls);
+    if (self == NULL) {
+        _bufferslot_release(slot);
+        return NULL;
+    }
+    self->slot = slot;
+    self->exports = 0;
+
+    _bufferpool *pool = slot->pool;
+    PyThread_acquire_lock(pool->mutex, WAIT_LOCK);
+    slot->owner = self;
+    slot->sender = NULL;
+    pool->numobjects += 1;
+    PyThread_release_lock(pool->mutex);
+    return (PyObject *)self;
+}
+
+static int
+_pooledbuffer_owns(pooledbufferobject *self)
+{
+    _bufferpool *pool = self->slot->pool;
+    PyThread_acquire_lock(pool->mutex, WAIT_LOCK);
+    int owned = self->slot->owner == self;
+    PyThread_release_lock(pool->mutex);
+    return owned;
+}
+
+static void
+pooledbuffer_dealloc(pooledbufferobject *self)
+{
+    PyTypeObject *tp = Py_TYPE(self);
+    _bufferslot *slot = self->slot;
+    _bufferpool *pool = slot->pool;
+    PyThread_acquire_lock(pool->mutex, WAIT_LOCK);
+    if (slot->owner == self) {
+        _bufferslot_push(slot);
+    }
+    else if (slot->sender == self) {
+        // It's still in a channel, so it goes back to the pool
+        // if it never gets received.
+        slot->sender = NULL;
+    }
+    pool->numobjects -= 1;
+    int done = _bufferpool_is_done(pool);
+    PyThread_release_lock(pool->mutex);
+    if (done) {
+        _bufferpool_free(pool);
+    }
+    tp->tp_free(self);
+    Py_DECREF(tp);
+}
+
+static int
+pooledbuffer_getbuf(pooledbufferobject *self, Py_buffer *view, int flags)
+{
+    if (!_pooledbuffer_owns(self)) {
+        PyErr_SetString(PyExc_BufferError, "buffer was already sent");
+        return -1;
+    }
+    if (PyBuffer_FillInfo(view, (PyObject *)self, self->slot->data,
+                          self->slot->pool->size, 0, flags) < 0)
+    {
+        return -1;
+    }
+    self->exports += 1;
+    return 0;
+}
+
+static void
+pooledbuffer_releasebuf(pooledbufferobject *self, Py_buffer *view)
+{
+    assert(self->exports > 0);
+    self->exports -= 1;
+}
+
+static PyObject *
+_pooledbuffer_from_xid(_PyXIData_t *data)
+{
+    // It might not be imported yet, so we can't use _get_current_module().
+    PyObject *mod = PyImport_ImportModule(MODULE_NAME_STR);
+    if (mod == NULL) {
+        return NULL;
+    }
+    module_state *state = get_module_state(mod);
+    PyTypeObject *cls = (PyTypeObject *)Py_NewRef(state->PooledBufferType);
+    Py_DECREF(mod);
+
+    // The new object takes the buffer over from the data (and from
+    // the sender), so we make sure releasing the data doesn't put the
+    // buffer back in the pool.
+    _bufferslot *slot = (_bufferslot *)_PyXIData_DATA(data);
+    _PyXIData_SET_FREE(data, NULL);
+    PyObject *obj = new_pooled_buffer(cls, slot);
+    Py_DECREF(cls);
+    return obj;
+}
+
+static int
+_pooledbuffer_shared(PyThreadState *tstate, PyObject *obj,
+                     _PyXIData_t *data)
+{
+    pooledbufferobject *self = (pooledbufferobject *)obj;
+    if (self->exports > 0) {
+        PyErr_SetString(PyExc_BufferError,
+                        "buffer is still exported (release any views first)");
+        return -1;
+    }
+    _bufferslot *slot = self->slot;
+    _bufferpool *pool = slot->pool;
+    PyThread_acquire_lock(pool->mutex, WAIT_LOCK);
+    int owned = slot->owner == self;
+    if (owned) {
+        // The buffer is handed off to the data.  If the data is released
+        // without being received, the buffer comes back to the object.
+        // We don't keep a reference to the object, so the data may be
+        // released in any interpreter.
+        slot->owner = NULL;
+        slot->sender = self;
+    }
+    PyThread_release_lock(pool->mutex);
+    if (!owned) {
+        PyErr_SetString(PyExc_ValueError, "buffer was already sent");
+        return -1;
+    }
+    _PyXIData_Init(data, tstate->interp, slot, NULL,
+                   _pooledbuffer_from_xid);
+    _PyXIData_SET_FREE(data, _bufferslot_free);
+    return 0;
+}
+
+static PyObject *
+pooledbuffer_sent(PyObject *self, void *Py_UNUSED(ignored))
+{
+    return PyBool_FromLong(!_pooledbuffer_owns((pooledbufferobject *)self));
+}
+
+static Py_ssize_t
+pooledbuffer_len(PyObject *self)
+{
+    pooledbufferobject *buf = (pooledbufferobject *)self;
+    return _pooledbuffer_owns(buf) ? buf->slot->pool->size : 0;
+}
+
+static PyGetSetDef pooledbuffer_getsets[] = {
+    {"sent", (getter)pooledbuffer_sent, NULL,
+     PyDoc_STR("whether or not the buffer was handed off")},
+    {NULL}
+};
+
+PyDoc_STRVAR(pooledbuffer_doc,
+"A writable buffer that belongs to a BufferPool.\n\
+\n\
+Sending it through a channel hands it off to the receiver, without\n\
+copying, after which the sender can no longer use it (unless it\n\
+never gets received, e.g. the send fails, in which case the sender\n\
+gets it back).  When the last owner drops it, the buffer goes back\n\
+to its pool.");
+
+static PyType_Slot pooledbuffer_typeslots[] = {
+    {Py_tp_dealloc, (destructor)pooledbuffer_dealloc},
+    {Py_tp_doc, (void *)pooledbuffer_doc},
+    {Py_tp_getset, pooledbuffer_getsets},
+    {Py_sq_length, pooledbuffer_len},
+    {Py_bf_getbuffer, (getbufferproc)pooledbuffer_getbuf},
+    {Py_bf_releasebuffer, (releasebufferproc)pooledbuffer_releasebuf},
+    {0, NULL},
+};
+
+static PyType_Spec pooledbuffer_typespec = {
+    .name = MODULE_NAME_STR ".PooledBuffer",
+    .basicsize = sizeof(pooledbufferobject),
+    .flags = (Py_TPFLAGS_DEFAULT | Py_TPFLAGS_DISALLOW_INSTANTIATION |
+              Py_TPFLAGS_IMMUTABLETYPE),
+    .slots = pooledbuffer_typeslots,
+};
+
+static PyTypeObject *
+add_pooledbuffer_type(PyObject *mod)
+{
+    PyTypeObject *cls = (PyTypeObject *)PyType_FromModuleAndSpec(
+                mod, &pooledbuffer_typespec, NULL);
+    if (cls == NULL) {
+        return NULL;
+    }
+    if (PyModule_AddType(mod, cls) < 0) {
+        Py_DECREF(cls);
+        return NULL;
+    }
+    if (ensure_xid_class(cls, _pooledbuffer_shared) < 0) {
+        Py_DECREF(cls);
+        return NULL;
+    }
+    return cls;
+}
+
+
+/* BufferPool class */
+
+typedef struct {
+    PyObject_HEAD
+    _bufferpool *pool;
+} bufferpoolobject;
+
+static PyObject *
+bufferpool_new(PyTypeObject *cls, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"size", "count", NULL};
+    Py_ssize_t size;
+    Py_ssize_t count;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "nn:BufferPool", kwlist,
+                                     &size, &count)) {
+        return NULL;
+    }
+    if (size <= 0) {
+        PyErr_SetString(PyExc_ValueError, "size must be greater than 0");
+        return NULL;
+    }
+    if (count <= 0) {
+        PyErr_SetString(PyExc_ValueError, "count must be greater than 0");
+        return NULL;
+    }
+
+    _bufferpool *pool = _bufferpool_new(size, count);
+    if (pool == NULL) {
+        return NULL;
+    }
+    bufferpoolobject *self = (bufferpoolobject *)cls->tp_alloc(cls, 0);
+    if (self == NULL) {
+        _bufferpool_close(pool);
+        return NULL;
+    }
+    self->pool = pool;
+    return (PyObject *)self;
+}
+
+static void
+bufferpool_dealloc(bufferpoolobject *self)
+{
+    PyTypeObject *tp = Py_TYPE(self);
+    if (self->pool != NULL) {
+        // Any buffers still in use keep the pool alive.
+        _bufferpool_close(self->pool);
+    }
+    tp->tp_free(self);
+    Py_DECREF(tp);
+}
+
+static PyObject *
+bufferpool_acquire(bufferpoolobject *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"blocking", "timeout", NULL};
+    int blocking = 1;
+    PyObject *timeout_obj = NULL;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "|$pO:acquire", kwlist,
+                                     &blocking, &timeout_obj)) {
+        return NULL;
+    }
+    PY_TIMEOUT_T timeout;
+    if (PyThread_ParseTimeoutArg(timeout_obj, blocking, &timeout) < 0) {
+        return NULL;
+    }
+
+    PyObject *mod = get_module_from_type(Py_TYPE(self));
+    if (mod == NULL) {
+        return NULL;
+    }
+    PyTypeObject *cls =
+        (PyTypeObject *)Py_NewRef(get_module_state(mod)->PooledBufferType);
+    Py_DECREF(mod);
+
+    PyObject *res = NULL;
+    _bufferslot *slot = _bufferpool_acquire(self->pool, timeout);
+    if (slot != NULL) {
+        res = new_pooled_buffer(cls, slot);
+    }
+    Py_DECREF(cls);
+    return res;
+}
+
+PyDoc_STRVAR(bufferpool_acquire_doc,
+"acquire(*, blocking=True, timeout=None)\n\
+\n\
+Take a buffer from the pool, waiting for one to be returned if\n\
+necessary.  If \"blocking\" is False and there isn't one available\n\
+then BufferError is raised.");
+
+static PyObject *
+bufferpool_get_size(PyObject *self, void *Py_UNUSED(ignored))
+{
+    return PyLong_FromSsize_t(((bufferpoolobject *)self)->pool->size);
+}
+
+static PyObject *
+bufferpool_get_count(PyObject *self, void *Py_UNUSED(ignored))
+{
+    return PyLong_FromSsize_t(((bufferpoolobject *)self)->pool->count);
+}
+
+static PyObject *
+bufferpool_get_available(PyObject *self, void *Py_UNUSED(ignored))
+{
+    _bufferpool *pool = ((bufferpoolobject *)self)->pool;
+    PyThread_acquire_lock(pool->mutex, WAIT_LOCK);
+    Py_ssize_t numfree = pool->numfree;
+    PyThread_release_lock(pool->mutex);
+    return PyLong_FromSsize_t(numfree);
+}
+
+static PyMethodDef bufferpool_methods[] = {
+    {"acquire", _PyCFunction_CAST(bufferpool_acquire),
+     METH_VARARGS | METH_KEYWORDS, bufferpool_acquire_doc},
+    {NULL, NULL}
+};
+
+static PyGetSetDef bufferpool_getsets[] = {
+    {"size", (getter)bufferpool_get_size, NULL,
+     PyDoc_STR("the size of each buffer, in bytes")},
+    {"count", (getter)bufferpool_get_count, NULL,
+     PyDoc_STR("the number of buffers in the pool")},
+    {"available", (getter)bufferpool_get_available, NULL,
+     PyDoc_STR("the number of buffers not currently in use")},
+    {NULL}
+};
+
+PyDoc_STRVAR(bufferpool_doc,
+"BufferPool(size, count)\n\
+\n\
+A fixed set of \"count\" preallocated buffers, each \"size\" bytes,\n\
+that may be sent through channels without copying.");
+
+static PyType_Slot bufferpool_typeslots[] = {
+    {Py_tp_new, bufferpool_new},
+    {Py_tp_dealloc, (destructor)bufferpool_dealloc},
+    {Py_tp_doc, (void *)bufferpool_doc},
+    {Py_tp_methods, bufferpool_methods},
+    {Py_tp_getset, bufferpool_getsets},
+    {0, NULL},
+};
+
+static PyType_Spec bufferpool_typespec = {
+    .name = MODULE_NAME_STR ".BufferPool",
+    .basicsize = sizeof(bufferpoolobject),
+    .flags = (Py_TPFLAGS_DEFAULT | Py_TPFLAGS_IMMUTABLETYPE),
+    .slots = bufferpool_typeslots,
+};
+
+
+/* module level code ********************************************************/
+
+/* globals is the process-global state for the module.  It holds all
    the data that we need to share between interpreters, so it cannot
    hold PyObject values. */
 static struct globals {
@@ -2839,53 +4936,253 @@ _globals_init(void)
             PyMutex_Unlock(&_globals.mutex);
             return ERR_CHANNELS_MUTEX_INIT;
         }
-        _channels_init(&_globals.channels, mutex);
+        if (_channels_init(&_globals.channels, mutex) < 0) {
+            PyThread_free_lock(mutex);
+            _globals.module_count--;
+            PyMutex_Unlock(&_globals.mutex);
+            return ERR_CHANNELS_MUTEX_INIT;
+        }
+    }
+    PyMutex_Unlock(&_globals.mutex);
+    return 0;
+}
+
+static void
+_globals_fini(void)
+{
+    PyMutex_Lock(&_globals.mutex);
+    assert(_globals.module_count > 0);
+    _globals.module_count--;
+    if (_globals.module_count == 0) {
+        PyThread_type_lock mutex;
+        _channels_fini(&_globals.channels, &mutex);
+        assert(mutex != NULL);
+        PyThread_free_lock(mutex);
+    }
+    PyMutex_Unlock(&_globals.mutex);
+}
+
+static _channels *
+_global_channels(void) {
+    return &_globals.channels;
+}
+
+
+static void
+clear_interpreter(void *data)
+{
+    if (_globals.module_count == 0) {
+        return;
+    }
+    PyInterpreterState *interp = (PyInterpreterState *)data;
+    assert(interp == _get_current_interp());
+    int64_t interpid = PyInterpreterState_GetID(interp);
+    _channels_clear_interpreter(&_globals.channels, interpid);
+}
+
+
+/* PendingSend class */
+
+/* A pending send tracks an object that was sent without waiting for
+   it to be received, so the sender can check on it later, e.g. from
+   an event loop woken up by the fd.  If it is dropped before the
+   object is received then the object is taken back out of the
+   channel, like when send() times out. */
+
+typedef struct {
+    PyObject_HEAD
+    int64_t cid;
+    // This is heap-allocated since it may be used by the channel item
+    // (or the receiver) for as long as the object is pending.
+    _waiting_t *waiting;
+} pendingsendobject;
+
+static int
+_pendingsend_done(pendingsendobject *self)
+{
+    _waiting_t *waiting = self->waiting;
+    _waiting_finish_releasing(waiting);
+    return waiting->status == WAITING_RELEASED;
+}
+
+// Make sure the object won't be received, if it hasn't been already.
+// If the waiting state can't be freed safely then it is left as-is
+// and self->waiting is set to NULL.
+static void
+_pendingsend_cancel(pendingsendobject *self)
+{
+    _waiting_t *waiting = self->waiting;
+    if (_pendingsend_done(self)) {
+        return;
+    }
+    channel_clear_sent(&_globals.channels, self->cid, waiting);
+    if (waiting->status == WAITING_ACQUIRED) {
+        if (_waiting_get_itemid(waiting) != 0) {
+            // The object is stuck in a closed channel, so we can't
+            // take it back.  Rather than block until the channel is
+            // destroyed, we leak the waiting state.
+            waiting->fd = -1;
+            self->waiting = NULL;
+            return;
+        }
+        // It was just popped off the channel, so the receiver
+        // is about to release it.
+        Py_BEGIN_ALLOW_THREADS
+        PyThread_acquire_lock(waiting->mutex, WAIT_LOCK);
+        PyThread_release_lock(waiting->mutex);
+        Py_END_ALLOW_THREADS
+    }
+    _waiting_finish_releasing(waiting);
+    assert(waiting->status == WAITING_RELEASED);
+}
+
+static PyObject *
+new_pending_send(PyObject *mod, int64_t cid, PyObject *obj, Py_ssize_t nbytes,
+                 int unboundop, int fd)
+{
+    module_state *state = get_module_state(mod);
+    _waiting_t *waiting = GLOBAL_MALLOC(_waiting_t);
+    if (waiting == NULL) {
+        PyErr_NoMemory();
+        return NULL;
+    }
+    if (_waiting_init(waiting) < 0) {
+        GLOBAL_FREE(waiting);
+        return NULL;
+    }
+    waiting->fd = fd;
+
+    pendingsendobject *self = PyObject_New(pendingsendobject,
+                                           state->PendingSendType);
+    if (self == NULL) {
+        _waiting_clear(waiting);
+        GLOBAL_FREE(waiting);
+        return NULL;
     }
-    PyMutex_Unlock(&_globals.mutex);
-    return 0;
+    self->cid = cid;
+    self->waiting = NULL;
+
+    int err = channel_send(&_globals.channels, cid, obj, nbytes,
+                           waiting, unboundop);
+    if (handle_channel_error(err, mod, cid)) {
+        assert(waiting->status == WAITING_NO_STATUS);
+        _waiting_clear(waiting);
+        GLOBAL_FREE(waiting);
+        Py_DECREF(self);
+        return NULL;
+    }
+    self->waiting = waiting;
+    return (PyObject *)self;
 }
 
 static void
-_globals_fini(void)
+pendingsend_dealloc(pendingsendobject *self)
 {
-    PyMutex_Lock(&_globals.mutex);
-    assert(_globals.module_count > 0);
-    _globals.module_count--;
-    if (_globals.module_count == 0) {
-        PyThread_type_lock mutex;
-        _channels_fini(&_globals.channels, &mutex);
-        assert(mutex != NULL);
-        PyThread_free_lock(mutex);
+    PyTypeObject *tp = Py_TYPE(self);
+    if (self->waiting != NULL) {
+        _pendingsend_cancel(self);
     }
-    PyMutex_Unlock(&_globals.mutex);
+    if (self->waiting != NULL) {
+        _waiting_clear(self->waiting);
+        GLOBAL_FREE(self->waiting);
+    }
+    tp->tp_free(self);
+    Py_DECREF(tp);
 }
 
-static _channels *
-_global_channels(void) {
-    return &_globals.channels;
+static PyObject *
+pendingsend_get_done(PyObject *self, void *Py_UNUSED(ignored))
+{
+    pendingsendobject *pending = (pendingsendobject *)self;
+    if (pending->waiting == NULL) {
+        Py_RETURN_TRUE;
+    }
+    return PyBool_FromLong(_pendingsend_done(pending));
+}
+
+static PyObject *
+pendingsend_cancel(PyObject *self, PyObject *Py_UNUSED(ignored))
+{
+    pendingsendobject *pending = (pendingsendobject *)self;
+    if (pending->waiting != NULL) {
+        _pendingsend_cancel(pending);
+    }
+    Py_RETURN_NONE;
 }
 
+PyDoc_STRVAR(pendingsend_cancel_doc,
+"cancel()\n\
+\n\
+Take the object back out of the channel, if it hasn't been\n\
+received yet.");
 
-static void
-clear_interpreter(void *data)
+static PyObject *
+pendingsend_result(PyObject *self, PyObject *Py_UNUSED(ignored))
 {
-    if (_globals.module_count == 0) {
-        return;
+    pendingsendobject *pending = (pendingsendobject *)self;
+    if (pending->waiting != NULL && !_pendingsend_done(pending)) {
+        PyErr_SetString(PyExc_ValueError, "object not received yet");
+        return NULL;
     }
-    PyInterpreterState *interp = (PyInterpreterState *)data;
-    assert(interp == _get_current_interp());
-    int64_t interpid = PyInterpreterState_GetID(interp);
-    _channels_clear_interpreter(&_globals.channels, interpid);
+    if (pending->waiting == NULL || !pending->waiting->received) {
+        PyObject *mod = get_module_from_type(Py_TYPE(self));
+        if (mod == NULL) {
+            return NULL;
+        }
+        (void)handle_channel_error(ERR_CHANNEL_CLOSED_WAITING, mod,
+                                   pending->cid);
+        Py_DECREF(mod);
+        return NULL;
+    }
+    Py_RETURN_NONE;
 }
 
+PyDoc_STRVAR(pendingsend_result_doc,
+"result()\n\
+\n\
+Return None if the object was received.  Otherwise raise\n\
+ChannelClosedError, or ValueError if it is still pending.");
+
+static PyMethodDef pendingsend_methods[] = {
+    {"cancel", pendingsend_cancel, METH_NOARGS, pendingsend_cancel_doc},
+    {"result", pendingsend_result, METH_NOARGS, pendingsend_result_doc},
+    {NULL, NULL}
+};
+
+static PyGetSetDef pendingsend_getsets[] = {
+    {"done", (getter)pendingsend_get_done, NULL,
+     PyDoc_STR("whether the object was received or taken back")},
+    {NULL}
+};
+
+PyDoc_STRVAR(pendingsend_doc,
+"An object sent with send(..., blocking=False, fd=...).");
+
+static PyType_Slot pendingsend_typeslots[] = {
+    {Py_tp_dealloc, (destructor)pendingsend_dealloc},
+    {Py_tp_doc, (void *)pendingsend_doc},
+    {Py_tp_methods, pendingsend_methods},
+    {Py_tp_getset, pendingsend_getsets},
+    {0, NULL},
+};
+
+static PyType_Spec pendingsend_typespec = {
+    .name = MODULE_NAME_STR ".PendingSend",
+    .basicsize = sizeof(pendingsendobject),
+    .flags = (Py_TPFLAGS_DEFAULT | Py_TPFLAGS_DISALLOW_INSTANTIATION |
+              Py_TPFLAGS_IMMUTABLETYPE),
+    .slots = pendingsend_typeslots,
+};
+
 
 static PyObject *
 channelsmod_create(PyObject *self, PyObject *args, PyObject *kwds)
 {
-    static char *kwlist[] = {"unboundop", NULL};
+    static char *kwlist[] = {"unboundop", "maxsize", NULL};
     int unboundop;
-    if (!PyArg_ParseTupleAndKeywords(args, kwds, "i:create", kwlist,
-                                     &unboundop))
+    Py_ssize_t maxsize = 0;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "i|n:create", kwlist,
+                                     &unboundop, &maxsize))
     {
         return NULL;
     }
@@ -2895,7 +5192,7 @@ channelsmod_create(PyObject *self, PyObject *args, PyObject *kwds)
         return NULL;
     }
 
-    int64_t cid = channel_create(&_globals.channels, unboundop);
+    int64_t cid = channel_create(&_globals.channels, unboundop, maxsize);
     if (cid < 0) {
         (void)handle_channel_error(-1, self, cid);
         return NULL;
@@ -2922,9 +5219,12 @@ channelsmod_create(PyObject *self, PyObject *args, PyObject *kwds)
 }
 
 PyDoc_STRVAR(channelsmod_create_doc,
-"channel_create(unboundop) -> cid\n\
+"channel_create(unboundop, maxsize=0) -> cid\n\
 \n\
-Create a new cross-interpreter channel and return a unique generated ID.");
+Create a new cross-interpreter channel and return a unique generated ID.\n\
+\n\
+If \"maxsize\" is greater than zero then sending to the channel fails\n\
+(or blocks) while it holds that many items.");
 
 static PyObject *
 channelsmod_destroy(PyObject *self, PyObject *args, PyObject *kwds)
@@ -3077,7 +5377,7 @@ static PyObject *
 channelsmod_send(PyObject *self, PyObject *args, PyObject *kwds)
 {
     static char *kwlist[] = {"cid", "obj", "unboundop", "blocking", "timeout",
-                             NULL};
+                             "fd", NULL};
     struct channel_id_converter_data cid_data = {
         .module = self,
     };
@@ -3085,9 +5385,10 @@ channelsmod_send(PyObject *self, PyObject *args, PyObject *kwds)
     int unboundop = UNBOUND_REPLACE;
     int blocking = 1;
     PyObject *timeout_obj = NULL;
-    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O&O|i$pO:channel_send", kwlist,
+    int fd = -1;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O&O|i$pOi:channel_send", kwlist,
                                      channel_id_converter, &cid_data, &obj,
-                                     &unboundop, &blocking, &timeout_obj))
+                                     &unboundop, &blocking, &timeout_obj, &fd))
     {
         return NULL;
     }
@@ -3103,13 +5404,22 @@ channelsmod_send(PyObject *self, PyObject *args, PyObject *kwds)
         return NULL;
     }
 
+    if (fd >= 0) {
+        if (blocking) {
+            PyErr_SetString(PyExc_ValueError, "fd requires blocking=False");
+            return NULL;
+        }
+        return new_pending_send(self, cid, obj, 0, unboundop, fd);
+    }
+
     /* Queue up the object. */
     int err = 0;
     if (blocking) {
-        err = channel_send_wait(&_globals.channels, cid, obj, unboundop, timeout);
+        err = channel_send_wait(&_globals.channels, cid, obj, 0, unboundop,
+                                timeout);
     }
     else {
-        err = channel_send(&_globals.channels, cid, obj, NULL, unboundop);
+        err = channel_send(&_globals.channels, cid, obj, 0, NULL, unboundop);
     }
     if (handle_channel_error(err, self, cid)) {
         return NULL;
@@ -3119,16 +5429,22 @@ channelsmod_send(PyObject *self, PyObject *args, PyObject *kwds)
 }
 
 PyDoc_STRVAR(channelsmod_send_doc,
-"channel_send(cid, obj, *, blocking=True, timeout=None)\n\
+"channel_send(cid, obj, *, blocking=True, timeout=None, fd=-1)\n\
 \n\
 Add the object's data to the channel's queue.\n\
-By default this waits for the object to be received.");
+By default this waits for the object to be received.\n\
+If the channel is full then this first waits for space, unless\n\
+\"blocking\" is False, in which case ChannelFullError is raised.\n\
+\n\
+If \"blocking\" is False and an fd is given then a PendingSend is\n\
+returned, to track whether the object has been received.  A byte\n\
+is written to the fd once it has been (or it was dropped).");
 
 static PyObject *
 channelsmod_send_buffer(PyObject *self, PyObject *args, PyObject *kwds)
 {
     static char *kwlist[] = {"cid", "obj", "unboundop", "blocking", "timeout",
-                             NULL};
+                             "fd", NULL};
     struct channel_id_converter_data cid_data = {
         .module = self,
     };
@@ -3136,10 +5452,12 @@ channelsmod_send_buffer(PyObject *self, PyObject *args, PyObject *kwds)
     int unboundop = UNBOUND_REPLACE;
     int blocking = 1;
     PyObject *timeout_obj = NULL;
+    int fd = -1;
     if (!PyArg_ParseTupleAndKeywords(args, kwds,
-                                     "O&O|i$pO:channel_send_buffer", kwlist,
+                                     "O&O|i$pOi:channel_send_buffer", kwlist,
                                      channel_id_converter, &cid_data, &obj,
-                                     &unboundop, &blocking, &timeout_obj)) {
+                                     &unboundop, &blocking, &timeout_obj,
+                                     &fd)) {
         return NULL;
     }
     if (!check_unbound(unboundop)) {
@@ -3154,19 +5472,43 @@ channelsmod_send_buffer(PyObject *self, PyObject *args, PyObject *kwds)
         return NULL;
     }
 
-    PyObject *tempobj = PyMemoryView_FromObject(obj);
-    if (tempobj == NULL) {
-        return NULL;
+    // A pooled buffer is handed off as-is, rather than wrapped in a
+    // memoryview, so it goes back to its pool as soon as it is dropped.
+    PyObject *tempobj;
+    Py_ssize_t nbytes;
+    if (PyObject_TypeCheck(obj, get_module_state(self)->PooledBufferType)) {
+        tempobj = Py_NewRef(obj);
+        nbytes = pooledbuffer_len(obj);
+    }
+    else {
+        tempobj = PyMemoryView_FromObject(obj);
+        if (tempobj == NULL) {
+            return NULL;
+        }
+        nbytes = PyMemoryView_GET_BUFFER(tempobj)->len;
+    }
+
+    if (fd >= 0) {
+        if (blocking) {
+            Py_DECREF(tempobj);
+            PyErr_SetString(PyExc_ValueError, "fd requires blocking=False");
+            return NULL;
+        }
+        PyObject *pending = new_pending_send(self, cid, tempobj, nbytes,
+                                             unboundop, fd);
+        Py_DECREF(tempobj);
+        return pending;
     }
 
     /* Queue up the object. */
     int err = 0;
     if (blocking) {
-        err = channel_send_wait(
-                &_globals.channels, cid, tempobj, unboundop, timeout);
+        err = channel_send_wait(&_globals.channels, cid, tempobj, nbytes,
+                                unboundop, timeout);
     }
     else {
-        err = channel_send(&_globals.channels, cid, tempobj, NULL, unboundop);
+        err = channel_send(&_globals.channels, cid, tempobj, nbytes,
+                           NULL, unboundop);
     }
     Py_DECREF(tempobj);
     if (handle_channel_error(err, self, cid)) {
@@ -3177,29 +5519,103 @@ channelsmod_send_buffer(PyObject *self, PyObject *args, PyObject *kwds)
 }
 
 PyDoc_STRVAR(channelsmod_send_buffer_doc,
-"channel_send_buffer(cid, obj, *, blocking=True, timeout=None)\n\
+"channel_send_buffer(cid, obj, *, blocking=True, timeout=None, fd=-1)\n\
 \n\
 Add the object's buffer to the channel's queue.\n\
-By default this waits for the object to be received.");
+This is otherwise the same as send().");
+
+static PyObject *
+channelsmod_send_many(PyObject *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"cid", "objs", "unboundop", "blocking",
+                             "timeout", NULL};
+    struct channel_id_converter_data cid_data = {
+        .module = self,
+    };
+    PyObject *objs;
+    int unboundop = UNBOUND_REPLACE;
+    int blocking = 1;
+    PyObject *timeout_obj = NULL;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O&O|i$pO:channel_send_many",
+                                     kwlist,
+                                     channel_id_converter, &cid_data, &objs,
+                                     &unboundop, &blocking, &timeout_obj))
+    {
+        return NULL;
+    }
+    if (!check_unbound(unboundop)) {
+        PyErr_Format(PyExc_ValueError,
+                     "unsupported unboundop %d", unboundop);
+        return NULL;
+    }
+
+    int64_t cid = cid_data.cid;
+    PY_TIMEOUT_T timeout;
+    if (PyThread_ParseTimeoutArg(timeout_obj, blocking, &timeout) < 0) {
+        return NULL;
+    }
+    PyObject *seq = PySequence_Fast(objs, "expected an iterable of objects");
+    if (seq == NULL) {
+        return NULL;
+    }
+
+    /* Queue up the objects. */
+    Py_ssize_t added = 0;
+    int err = channel_send_many(&_globals.channels, cid, seq, unboundop,
+                                timeout, &added);
+    Py_DECREF(seq);
+    if (handle_channel_error(err, self, cid)) {
+        return NULL;
+    }
+
+    return PyLong_FromSsize_t(added);
+}
+
+PyDoc_STRVAR(channelsmod_send_many_doc,
+"channel_send_many(cid, objs, *, blocking=True, timeout=None) -> count\n\
+\n\
+Add each object's data to the channel's queue, in order, under as few\n\
+acquisitions of the channel's lock as there is space for.\n\
+Unlike send(), this does not wait for the objects to be received.\n\
+\n\
+Return the number of objects added.  Fewer than all of them are added\n\
+only if the channel fills up and the timeout expires (or \"blocking\"\n\
+is False).  If none could be added then raise TimeoutError (or\n\
+ChannelFullError).");
 
 static PyObject *
 channelsmod_recv(PyObject *self, PyObject *args, PyObject *kwds)
 {
-    static char *kwlist[] = {"cid", "default", NULL};
+    static char *kwlist[] = {"cid", "default", "blocking", "timeout", NULL};
     int64_t cid;
     struct channel_id_converter_data cid_data = {
         .module = self,
     };
     PyObject *dflt = NULL;
-    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O&|O:channel_recv", kwlist,
-                                     channel_id_converter, &cid_data, &dflt)) {
+    int blocking = 0;
+    PyObject *timeout_obj = NULL;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O&|O$pO:channel_recv", kwlist,
+                                     channel_id_converter, &cid_data, &dflt,
+                                     &blocking, &timeout_obj)) {
         return NULL;
     }
     cid = cid_data.cid;
 
+    PY_TIMEOUT_T timeout;
+    if (PyThread_ParseTimeoutArg(timeout_obj, blocking, &timeout) < 0) {
+        return NULL;
+    }
+
     PyObject *obj = NULL;
     int unboundop = 0;
-    int err = channel_recv(&_globals.channels, cid, &obj, &unboundop);
+    int err = 0;
+    if (blocking) {
+        err = channel_recv_wait(
+                &_globals.channels, cid, &obj, &unboundop, timeout);
+    }
+    else {
+        err = channel_recv(&_globals.channels, cid, &obj, &unboundop);
+    }
     if (err == ERR_CHANNEL_EMPTY && dflt != NULL) {
         // Use the default.
         obj = Py_NewRef(dflt);
@@ -3219,12 +5635,186 @@ channelsmod_recv(PyObject *self, PyObject *args, PyObject *kwds)
 }
 
 PyDoc_STRVAR(channelsmod_recv_doc,
-"channel_recv(cid, [default]) -> (obj, unboundop)\n\
+"channel_recv(cid, [default], *, blocking=False, timeout=None) -> (obj, unboundop)\n\
 \n\
 Return a new object from the data at the front of the channel's queue.\n\
 \n\
 If there is nothing to receive then raise ChannelEmptyError, unless\n\
-a default value is provided.  In that case return it.");
+a default value is provided.  In that case return it.\n\
+\n\
+If \"blocking\" is True then wait until an object has been sent\n\
+or the channel is closed.  TimeoutError is raised if the timeout\n\
+(in seconds) expires first.");
+
+static PyObject *
+channelsmod_recv_many(PyObject *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"cid", "max_items", "blocking", "timeout", NULL};
+    struct channel_id_converter_data cid_data = {
+        .module = self,
+    };
+    Py_ssize_t max_items;
+    int blocking = 0;
+    PyObject *timeout_obj = NULL;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "O&n|$pO:channel_recv_many",
+                                     kwlist,
+                                     channel_id_converter, &cid_data,
+                                     &max_items, &blocking, &timeout_obj)) {
+        return NULL;
+    }
+    int64_t cid = cid_data.cid;
+    if (max_items <= 0) {
+        PyErr_Format(PyExc_ValueError,
+                     "max_items must be positive, got %zd", max_items);
+        return NULL;
+    }
+
+    PY_TIMEOUT_T timeout;
+    if (PyThread_ParseTimeoutArg(timeout_obj, blocking, &timeout) < 0) {
+        return NULL;
+    }
+
+    PyObject *items = NULL;
+    int err = channel_recv_many(&_globals.channels, cid, max_items, timeout,
+                                &items);
+    if (handle_channel_error(err, self, cid)) {
+        return NULL;
+    }
+    return items;
+}
+
+PyDoc_STRVAR(channelsmod_recv_many_doc,
+"channel_recv_many(cid, max_items, *, blocking=False, timeout=None)\n\
+    -> [(obj, unboundop)]\n\
+\n\
+Return new objects from the data at the front of the channel's queue,\n\
+in order, popped under a single acquisition of the channel's lock\n\
+(unless waiting for more).  Each item is the same as what recv() returns.\n\
+\n\
+If \"blocking\" is True then wait until there are \"max_items\" or the\n\
+timeout expires, and return what there is.  If there is nothing to\n\
+receive then raise TimeoutError (or ChannelEmptyError if not blocking).");
+
+static PyObject *
+channelsmod_select(PyObject *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"recv", "send", "timeout", NULL};
+    PyObject *recv_obj;
+    PyObject *send_obj;
+    PyObject *timeout_obj = NULL;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds, "OO|$O:select", kwlist,
+                                     &recv_obj, &send_obj, &timeout_obj)) {
+        return NULL;
+    }
+    PY_TIMEOUT_T timeout;
+    if (PyThread_ParseTimeoutArg(timeout_obj, 1, &timeout) < 0) {
+        return NULL;
+    }
+
+    PyObject *recvseq = PySequence_Fast(recv_obj,
+                                        "expected a sequence of channel IDs");
+    if (recvseq == NULL) {
+        return NULL;
+    }
+    PyObject *sendseq = PySequence_Fast(
+            send_obj, "expected a sequence of (cid, obj, unboundop)");
+    if (sendseq == NULL) {
+        Py_DECREF(recvseq);
+        return NULL;
+    }
+    PyObject *res = NULL;
+    Py_ssize_t nrecv = PySequence_Fast_GET_SIZE(recvseq);
+    Py_ssize_t count = nrecv + PySequence_Fast_GET_SIZE(sendseq);
+    int64_t *cids = PyMem_Malloc(sizeof(int64_t) * (count + 1));
+    PyObject **objs = PyMem_Malloc(sizeof(PyObject *) * (count + 1));
+    int *unboundops = PyMem_Malloc(sizeof(int) * (count + 1));
+    if (cids == NULL || objs == NULL || unboundops == NULL) {
+        PyErr_NoMemory();
+        goto finally;
+    }
+    if (count == 0) {
+        PyErr_SetString(PyExc_ValueError, "no channels to select on");
+        goto finally;
+    }
+    for (Py_ssize_t i = 0; i < count; i++) {
+        struct channel_id_converter_data cid_data = {
+            .module = self,
+        };
+        if (i < nrecv) {
+            PyObject *item = PySequence_Fast_GET_ITEM(recvseq, i);
+            if (!channel_id_converter(item, &cid_data)) {
+                goto finally;
+            }
+            objs[i] = NULL;
+            unboundops[i] = 0;
+        }
+        else {
+            PyObject *item = PySequence_Fast_GET_ITEM(sendseq, i - nrecv);
+            if (!PyArg_ParseTuple(item, "O&Oi:select",
+                                  channel_id_converter, &cid_data,
+                                  &objs[i], &unboundops[i]))
+            {
+                goto finally;
+            }
+            if (!check_unbound(unboundops[i])) {
+                PyErr_Format(PyExc_ValueError,
+                             "unsupported unboundop %d", unboundops[i]);
+                goto finally;
+            }
+        }
+        cids[i] = cid_data.cid;
+    }
+
+    Py_ssize_t index = -1;
+    PyObject *obj = NULL;
+    int unboundop = 0;
+    int err = channel_select(&_globals.channels, cids, objs, unboundops,
+                             nrecv, count, timeout, &index, &obj, &unboundop);
+    if (handle_channel_error(err, self, index < 0 ? -1 : cids[index])) {
+        assert(obj == NULL);
+        goto finally;
+    }
+
+    if (index < 0) {
+        // It timed out.
+        assert(obj == NULL);
+        res = Py_NewRef(Py_None);
+    }
+    else if (index >= nrecv) {
+        // It was sent.
+        res = Py_BuildValue("nOO", index, Py_None, Py_None);
+    }
+    else if (obj == NULL) {
+        // The item was unbound.
+        res = Py_BuildValue("nOi", index, Py_None, unboundop);
+    }
+    else {
+        res = Py_BuildValue("nOO", index, obj, Py_None);
+        Py_DECREF(obj);
+    }
+
+finally:
+    PyMem_Free(cids);
+    PyMem_Free(objs);
+    PyMem_Free(unboundops);
+    Py_DECREF(recvseq);
+    Py_DECREF(sendseq);
+    return res;
+}
+
+PyDoc_STRVAR(channelsmod_select_doc,
+"select(recv, send, *, timeout=None) -> (index, obj, unboundop) | None\n\
+\n\
+Wait until one of several channel operations can proceed, then do it.\n\
+\"recv\" is a sequence of channel IDs to receive from and \"send\" is\n\
+a sequence of (cid, obj, unboundop) to send, without waiting for the\n\
+object to be received.  The operations are checked in order, receives\n\
+first, and the index of the one that was done is returned, counting\n\
+the sends after the receives.  For a receive, the object (or the\n\
+unboundop) is returned the same as with recv().\n\
+\n\
+None is returned if the timeout (in seconds) expires first.\n\
+A timeout of 0 means to only check once.");
 
 static PyObject *
 channelsmod_close(PyObject *self, PyObject *args, PyObject *kwds)
@@ -3348,6 +5938,69 @@ PyDoc_STRVAR(channelsmod_get_count_doc,
 \n\
 Return the number of items in the channel.");
 
+static PyObject *
+channelsmod_watch(PyObject *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"cid", "fd", NULL};
+    struct channel_id_converter_data cid_data = {
+        .module = self,
+    };
+    int fd;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds,
+                                     "O&i:watch", kwlist,
+                                     channel_id_converter, &cid_data, &fd)) {
+        return NULL;
+    }
+    int64_t cid = cid_data.cid;
+    if (fd < 0) {
+        PyErr_Format(PyExc_ValueError, "invalid fd %d", fd);
+        return NULL;
+    }
+
+    int err = channel_watch(&_globals.channels, cid, fd);
+    if (handle_channel_error(err, self, cid)) {
+        return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(channelsmod_watch_doc,
+"watch(cid, fd)\n\
+\n\
+Write a byte to the file descriptor whenever objects are sent to\n\
+or received from the channel, or the channel is closed.  If the\n\
+channel isn't empty then a byte is written right away.\n\
+\n\
+The fd should be non-blocking (e.g. the write end of a pipe).\n\
+It is unregistered if the current interpreter is destroyed.");
+
+static PyObject *
+channelsmod_unwatch(PyObject *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"cid", "fd", NULL};
+    struct channel_id_converter_data cid_data = {
+        .module = self,
+    };
+    int fd;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds,
+                                     "O&i:unwatch", kwlist,
+                                     channel_id_converter, &cid_data, &fd)) {
+        return NULL;
+    }
+    int64_t cid = cid_data.cid;
+
+    int err = channel_unwatch(&_globals.channels, cid, fd);
+    if (handle_channel_error(err, self, cid)) {
+        return NULL;
+    }
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(channelsmod_unwatch_doc,
+"unwatch(cid, fd)\n\
+\n\
+Stop writing to the file descriptor when the channel changes.");
+
 static PyObject *
 channelsmod_get_info(PyObject *self, PyObject *args, PyObject *kwds)
 {
@@ -3465,14 +6118,24 @@ static PyMethodDef module_functions[] = {
      METH_VARARGS | METH_KEYWORDS, channelsmod_send_doc},
     {"send_buffer",                _PyCFunction_CAST(channelsmod_send_buffer),
      METH_VARARGS | METH_KEYWORDS, channelsmod_send_buffer_doc},
+    {"send_many",                  _PyCFunction_CAST(channelsmod_send_many),
+     METH_VARARGS | METH_KEYWORDS, channelsmod_send_many_doc},
     {"recv",                       _PyCFunction_CAST(channelsmod_recv),
      METH_VARARGS | METH_KEYWORDS, channelsmod_recv_doc},
+    {"recv_many",                  _PyCFunction_CAST(channelsmod_recv_many),
+     METH_VARARGS | METH_KEYWORDS, channelsmod_recv_many_doc},
+    {"select",                     _PyCFunction_CAST(channelsmod_select),
+     METH_VARARGS | METH_KEYWORDS, channelsmod_select_doc},
     {"close",                      _PyCFunction_CAST(channelsmod_close),
      METH_VARARGS | METH_KEYWORDS, channelsmod_close_doc},
     {"release",                    _PyCFunction_CAST(channelsmod_release),
      METH_VARARGS | METH_KEYWORDS, channelsmod_release_doc},
     {"get_count",                   _PyCFunction_CAST(channelsmod_get_count),
      METH_VARARGS | METH_KEYWORDS, channelsmod_get_count_doc},
+    {"watch",                      _PyCFunction_CAST(channelsmod_watch),
+     METH_VARARGS | METH_KEYWORDS, channelsmod_watch_doc},
+    {"unwatch",                    _PyCFunction_CAST(channelsmod_unwatch),
+     METH_VARARGS | METH_KEYWORDS, channelsmod_unwatch_doc},
     {"get_info",                   _PyCFunction_CAST(channelsmod_get_info),
      METH_VARARGS | METH_KEYWORDS, channelsmod_get_info_doc},
     {"get_channel_defaults",       _PyCFunction_CAST(channelsmod_get_channel_defaults),
@@ -3527,6 +6190,32 @@ module_exec(PyObject *mod)
         goto error;
     }
 
+    // BufferPool
+    state->BufferPoolType = (PyTypeObject *)PyType_FromModuleAndSpec(
+                mod, &bufferpool_typespec, NULL);
+    if (state->BufferPoolType == NULL) {
+        goto error;
+    }
+    if (PyModule_AddType(mod, state->BufferPoolType) < 0) {
+        goto error;
+    }
+
+    // PooledBuffer
+    state->PooledBufferType = add_pooledbuffer_type(mod);
+    if (state->PooledBufferType == NULL) {
+        goto error;
+    }
+
+    // PendingSend
+    state->PendingSendType = (PyTypeObject *)PyType_FromModuleAndSpec(
+                mod, &pendingsend_typespec, NULL);
+    if (state->PendingSendType == NULL) {
+        goto error;
+    }
+    if (PyModule_AddType(mod, state->PendingSendType) < 0) {
+        goto error;
+    }
+
     /* Make sure chnnels drop objects owned by this interpreter. */
     PyInterpreterState *interp = _get_current_interp();
     PyUnstable_AtExit(interp, clear_interpreter, (void *)interp);
@@ -288,13 +288,14 @@ check_code_str(PyUnicodeObject *text)
 }
 
 static const char *
-check_code_object(PyCodeObject *code)
+check_code_object(PyCodeObject *code, int allowargs)
 {
     assert(code != NULL);
-    if (code->co_argcount > 0
-        || code->co_posonlyargcount > 0
-        || code->co_kwonlyargcount > 0
-        || code->co_flags & (CO_VARARGS | CO_VARKEYWORDS))
+    if (!allowargs
+        && (code->co_argcount > 0
+            || code->co_posonlyargcount > 0
+            || code->co_kwonlyargcount > 0
+            || code->co_flags & (CO_VARARGS | CO_VARKEYWORDS)))
     {
         return "arguments not supported";
     }
@@ -343,7 +344,7 @@ get_code_str(PyObject *arg, Py_ssize_t *len_p, PyObject **bytes_p, int *flags_p)
     }
     else {
         assert(PyCode_Check(arg)
-               && (check_code_object((PyCodeObject *)arg) == NULL));
+               && (check_code_object((PyCodeObject *)arg, 1) == NULL));
         flags = RUN_CODE;
 
         // Serialize the code object.
@@ -362,6 +363,669 @@ get_code_str(PyObject *arg, Py_ssize_t *len_p, PyObject **bytes_p, int *flags_p)
 }
 
 
+/* compiled code cache *****************************************************/
+
+// The code passed to exec() or call() arrives in the target interpreter
+// as source text or as a marshaled code object, which would otherwise
+// have to be compiled (or unmarshaled) there every time.  Instead, each
+// interpreter keeps the resulting code objects in a small LRU cache,
+// keyed by a hash of the text (or marshaled data).
+//
+// The code objects are kept in the interpreter's state dict.  The limit
+// and counters are process-global, so they may be read and set from any
+// interpreter.
+
+#define DEFAULT_CODE_CACHE_SIZE 128
+#define CODE_CACHE_KEY "_interpreters_code_cache_"
+
+typedef struct _codecache {
+    int64_t interpid;
+    Py_ssize_t maxsize;
+    Py_ssize_t size;
+    int64_t hits;
+    int64_t misses;
+    struct _codecache *next;
+} _codecache;
+
+static struct {
+    PyMutex mutex;
+    _codecache *head;
+} _codecaches = {0};
+
+// The caller must hold the mutex.
+static _codecache *
+_codecaches_find(int64_t interpid, _codecache **p_prev)
+{
+    _codecache *prev = NULL;
+    _codecache *cache = _codecaches.head;
+    while (cache != NULL && cache->interpid != interpid) {
+        prev = cache;
+        cache = cache->next;
+    }
+    if (p_prev != NULL) {
+        *p_prev = prev;
+    }
+    return cache;
+}
+
+// The caller must hold the mutex.
+static _codecache *
+_codecaches_ensure(int64_t interpid)
+{
+    _codecache *cache = _codecaches_find(interpid, NULL);
+    if (cache == NULL) {
+        cache = PyMem_RawCalloc(1, sizeof(_codecache));
+        if (cache == NULL) {
+            return NULL;
+        }
+        cache->interpid = interpid;
+        cache->maxsize = DEFAULT_CODE_CACHE_SIZE;
+        cache->next = _codecaches.head;
+        _codecaches.head = cache;
+    }
+    return cache;
+}
+
+// This is called once the interpreter has been destroyed.
+static void
+_codecache_forget(int64_t interpid)
+{
+    PyMutex_Lock(&_codecaches.mutex);
+    _codecache *prev = NULL;
+    _codecache *cache = _codecaches_find(interpid, &prev);
+    if (cache != NULL) {
+        if (prev == NULL) {
+            _codecaches.head = cache->next;
+        }
+        else {
+            prev->next = cache->next;
+        }
+    }
+    PyMutex_Unlock(&_codecaches.mutex);
+    PyMem_RawFree(cache);
+}
+
+static PyObject *
+_compile_code(const char *codestr, Py_ssize_t codestrlen, int flags)
+{
+    if (flags & RUN_TEXT) {
+        return Py_CompileStringExFlags(codestr, "<string>", Py_file_input,
+                                       NULL, -1);
+    }
+    else if (flags & RUN_CODE) {
+        return PyMarshal_ReadObjectFromString(codestr, codestrlen);
+    }
+    else {
+        Py_UNREACHABLE();
+    }
+}
+
+// Return the code object for the given text or marshaled data,
+// compiling it only if it isn't in the current interpreter's cache.
+static PyObject *
+_get_code(const char *codestr, Py_ssize_t codestrlen, int flags)
+{
+    PyInterpreterState *interp = PyInterpreterState_Get();
+    PyMutex_Lock(&_codecaches.mutex);
+    _codecache *cache = _codecaches_ensure(PyInterpreterState_GetID(interp));
+    Py_ssize_t maxsize = cache != NULL ? cache->maxsize : 0;
+    PyMutex_Unlock(&_codecaches.mutex);
+    // Past this point the cache can't go away, since we are running
+    // in the interpreter.
+
+    PyObject *interpdict = PyInterpreterState_GetDict(interp);
+    if (interpdict == NULL) {
+        return NULL;
+    }
+    PyObject *entries = _PyDict_GetItemStringWithError(interpdict,
+                                                       CODE_CACHE_KEY);
+    if (entries == NULL && PyErr_Occurred()) {
+        return NULL;
+    }
+    if (maxsize <= 0) {
+        // Caching is disabled.
+        if (entries != NULL) {
+            if (PyDict_DelItemString(interpdict, CODE_CACHE_KEY) < 0) {
+                return NULL;
+            }
+            if (cache != NULL) {
+                _Py_atomic_store_ssize(&cache->size, 0);
+            }
+        }
+        return _compile_code(codestr, codestrlen, flags);
+    }
+    if (entries == NULL) {
+        entries = PyDict_New();
+        if (entries == NULL) {
+            return NULL;
+        }
+        int res = PyDict_SetItemString(interpdict, CODE_CACHE_KEY, entries);
+        Py_DECREF(entries);  // The interpreter's dict holds it.
+        if (res < 0) {
+            return NULL;
+        }
+    }
+
+    // Each entry is (flags, text, code), with the text checked
+    // on a hit, in case of hash collisions.
+    PyObject *key = PyLong_FromSsize_t(_Py_HashBytes(codestr, codestrlen));
+    if (key == NULL) {
+        return NULL;
+    }
+    PyObject *code = NULL;
+    PyObject *entry = PyDict_GetItemWithError(entries, key);
+    if (entry != NULL) {
+        PyObject *text = PyTuple_GET_ITEM(entry, 1);
+        if (PyLong_AsLong(PyTuple_GET_ITEM(entry, 0)) == flags
+            && PyBytes_GET_SIZE(text) == codestrlen
+            && memcmp(PyBytes_AS_STRING(text), codestr, codestrlen) == 0)
+        {
+            // Move it to the end, as the most recently used.
+            Py_INCREF(entry);
+            if (PyDict_DelItem(entries, key) < 0
+                || PyDict_SetItem(entries, key, entry) < 0)
+            {
+                Py_DECREF(entry);
+                goto finally;
+            }
+            code = Py_NewRef(PyTuple_GET_ITEM(entry, 2));
+            Py_DECREF(entry);
+            _Py_atomic_add_int64(&cache->hits, 1);
+            goto finally;
+        }
+    }
+    else if (PyErr_Occurred()) {
+        goto finally;
+    }
+
+    _Py_atomic_add_int64(&cache->misses, 1);
+    code = _compile_code(codestr, codestrlen, flags);
+    if (code == NULL) {
+        goto finally;
+    }
+
+    // Make room, dropping the least recently used first.
+    while (PyDict_GET_SIZE(entries) >= maxsize) {
+        Py_ssize_t pos = 0;
+        PyObject *oldest;
+        if (!PyDict_Next(entries, &pos, &oldest, NULL)) {
+            break;
+        }
+        Py_INCREF(oldest);
+        int res = PyDict_DelItem(entries, oldest);
+        Py_DECREF(oldest);
+        if (res < 0) {
+            Py_CLEAR(code);
+            goto finally;
+        }
+    }
+    entry = Py_BuildValue("iy#O", flags, codestr, codestrlen, code);
+    if (entry == NULL) {
+        Py_CLEAR(code);
+        goto finally;
+    }
+    int res = PyDict_SetItem(entries, key, entry);
+    Py_DECREF(entry);
+    if (res < 0) {
+        Py_CLEAR(code);
+        goto finally;
+    }
+
+finally:
+    _Py_atomic_store_ssize(&cache->size, PyDict_GET_SIZE(entries));
+    Py_DECREF(key);
+    return code;
+}
+
+
+/* call arguments and results **********************************************/
+
+// The arguments passed to a function by call() and its return value are
+// shared between the interpreters as cross-interpreter data, which is
+// cheap.  Objects that aren't shareable are pickled first, as a fallback.
+
+typedef struct {
+    // The call's arguments, as (args, kwargs, defaults, kwdefaults),
+    // owned by the calling interpreter.
+    _PyXIData_t *args;
+    int args_pickled;
+    // The return value, owned by the called interpreter.
+    _PyXIData_t *result;
+    int result_pickled;
+} _xicall;
+
+static int
+_xicall_get_data(PyObject *obj, _PyXIData_t **p_data, int *p_pickled)
+{
+    PyInterpreterState *interp = PyInterpreterState_Get();
+    _PyXIData_lookup_context_t ctx;
+    if (_PyXIData_GetLookupContext(interp, &ctx) < 0) {
+        return -1;
+    }
+    _PyXIData_t *data = _PyXIData_New();
+    if (data == NULL) {
+        return -1;
+    }
+    int pickled = 0;
+    if (_PyObject_GetXIData(&ctx, obj, data) < 0) {
+        if (!PyErr_ExceptionMatches(ctx.PyExc_NotShareableError)) {
+            PyMem_RawFree(data);
+            return -1;
+        }
+        PyErr_Clear();
+        // Fall back to pickle.
+        PyObject *bytes = NULL;
+        PyObject *dumps = _PyImport_GetModuleAttrString("pickle", "dumps");
+        if (dumps != NULL) {
+            bytes = PyObject_CallOneArg(dumps, obj);
+            Py_DECREF(dumps);
+        }
+        if (bytes == NULL) {
+            PyMem_RawFree(data);
+            return -1;
+        }
+        int res = _PyObject_GetXIData(&ctx, bytes, data);
+        Py_DECREF(bytes);
+        if (res < 0) {
+            PyMem_RawFree(data);
+            return -1;
+        }
+        pickled = 1;
+    }
+    *p_data = data;
+    *p_pickled = pickled;
+    return 0;
+}
+
+static PyObject *
+_xicall_new_object(_PyXIData_t *data, int pickled)
+{
+    PyObject *obj = _PyXIData_NewObject(data);
+    if (obj == NULL || !pickled) {
+        return obj;
+    }
+    PyObject *loaded = NULL;
+    PyObject *loads = _PyImport_GetModuleAttrString("pickle", "loads");
+    if (loads != NULL) {
+        loaded = PyObject_CallOneArg(loads, obj);
+        Py_DECREF(loads);
+    }
+    Py_DECREF(obj);
+    return loaded;
+}
+
+static void
+_xicall_release_data(_PyXIData_t **p_data)
+{
+    if (*p_data == NULL) {
+        return;
+    }
+    PyObject *exc = PyErr_GetRaisedException();
+    if (_PyXIData_ReleaseAndRawFree(*p_data) < 0) {
+        // The owning interpreter is already gone.
+        PyErr_Clear();
+    }
+    PyErr_SetRaisedException(exc);
+    *p_data = NULL;
+}
+
+// Dicts aren't shareable, so kwargs are passed as a tuple of items.
+static PyObject *
+_dict_as_items(PyObject *dict)
+{
+    if (dict == NULL || dict == Py_None || PyDict_GET_SIZE(dict) == 0) {
+        return Py_NewRef(Py_None);
+    }
+    PyObject *items = PyDict_Items(dict);
+    if (items == NULL) {
+        return NULL;
+    }
+    PyObject *res = PyList_AsTuple(items);
+    Py_DECREF(items);
+    return res;
+}
+
+static PyObject *
+_dict_from_items(PyObject *items)
+{
+    if (items == Py_None) {
+        return Py_NewRef(Py_None);
+    }
+    PyObject *dict = PyDict_New();
+    if (dict == NULL) {
+        return NULL;
+    }
+    if (PyDict_MergeFromSeq2(dict, items, 1) < 0) {
+        Py_DECREF(dict);
+        return NULL;
+    }
+    return dict;
+}
+
+static int
+_xicall_init(_xicall *call, PyObject *func, PyObject *args, PyObject *kwargs)
+{
+    *call = (_xicall){0};
+
+    // The function's defaults are passed along with the arguments.
+    PyObject *defaults = Py_None;
+    PyObject *kwdefaults = NULL;
+    if (PyFunction_Check(func)) {
+        defaults = PyFunction_GetDefaults(func);
+        if (defaults == NULL) {
+            defaults = Py_None;
+        }
+        kwdefaults = PyFunction_GetKwDefaults(func);
+    }
+    if (args == NULL || args == Py_None) {
+        args = Py_None;
+    }
+
+    PyObject *kwitems = _dict_as_items(kwargs);
+    if (kwitems == NULL) {
+        return -1;
+    }
+    PyObject *kwdefaultitems = _dict_as_items(kwdefaults);
+    if (kwdefaultitems == NULL) {
+        Py_DECREF(kwitems);
+        return -1;
+    }
+    PyObject *callargs = PyTuple_Pack(4, args, kwitems, defaults,
+                                      kwdefaultitems);
+    Py_DECREF(kwitems);
+    Py_DECREF(kwdefaultitems);
+    if (callargs == NULL) {
+        return -1;
+    }
+    int res = _xicall_get_data(callargs, &call->args, &call->args_pickled);
+    Py_DECREF(callargs);
+    return res;
+}
+
+static void
+_xicall_clear(_xicall *call)
+{
+    _xicall_release_data(&call->args);
+    _xicall_release_data(&call->result);
+}
+
+// This runs in the called interpreter.
+static int
+_xicall_run(_xicall *call, PyObject *ns,
+            const char *codestr, Py_ssize_t codestrlen)
+{
+    PyObject *func = NULL;
+    PyObject *callargs = NULL;
+    PyObject *kwargs = NULL;
+    PyObject *result = NULL;
+    int res = -1;
+
+    PyObject *code = _get_code(codestr, codestrlen, RUN_CODE);
+    if (code == NULL) {
+        goto finally;
+    }
+    func = PyFunction_New(code, ns);
+    Py_DECREF(code);
+    if (func == NULL) {
+        goto finally;
+    }
+
+    // Unpack the arguments.
+    callargs = _xicall_new_object(call->args, call->args_pickled);
+    if (callargs == NULL) {
+        goto finally;
+    }
+    PyObject *args, *kwitems, *defaults, *kwdefaultitems;
+    if (!PyArg_ParseTuple(callargs, "OOOO:call", &args, &kwitems,
+                          &defaults, &kwdefaultitems))
+    {
+        goto finally;
+    }
+    if (defaults != Py_None && PyFunction_SetDefaults(func, defaults) < 0) {
+        goto finally;
+    }
+    if (kwdefaultitems != Py_None) {
+        PyObject *kwdefaults = _dict_from_items(kwdefaultitems);
+        if (kwdefaults == NULL) {
+            goto finally;
+        }
+        int err = PyFunction_SetKwDefaults(func, kwdefaults);
+        Py_DECREF(kwdefaults);
+        if (err < 0) {
+            goto finally;
+        }
+    }
+    kwargs = _dict_from_items(kwitems);
+    if (kwargs == NULL) {
+        goto finally;
+    }
+
+    // Make the call.
+    if (args == Py_None) {
+        args = PyTuple_New(0);
+    }
+    else {
+        args = PySequence_Tuple(args);
+    }
+    if (args == NULL) {
+        goto finally;
+    }
+    result = PyObject_Call(func, args, kwargs == Py_None ? NULL : kwargs);
+    Py_DECREF(args);
+    if (result == NULL) {
+        goto finally;
+    }
+
+    // Pass the return value back.
+    res = _xicall_get_data(result, &call->result, &call->result_pickled);
+
+finally:
+    Py_XDECREF(result);
+    Py_XDECREF(kwargs);
+    Py_XDECREF(callargs);
+    Py_XDECREF(func);
+    return res;
+}
+
+
+/* cached thread states ****************************************************/
+
+// Running code in an interpreter from a thread that isn't already in it
+// requires a thread state bound to that interpreter.  By default,
+// _PyXI_Enter() creates a new one for each exec() or call() and then
+// throws it away.  An interpreter may opt in to keeping them instead,
+// one per calling OS thread, so later calls can skip that churn.
+//
+// The caches are process-global, so they cannot hold PyObject values.
+
+#define MAX_CACHED_TSTATES 8
+
+typedef struct _tstatecache {
+    int64_t interpid;
+    // The least recently used thread state is first.
+    PyThreadState *tstates[MAX_CACHED_TSTATES];
+    Py_ssize_t count;
+    struct _tstatecache *next;
+} _tstatecache;
+
+static struct {
+    PyMutex mutex;
+    _tstatecache *head;
+} _tstatecaches = {0};
+
+// The caller must hold the mutex.
+static _tstatecache *
+_tstatecaches_find(int64_t interpid, _tstatecache **p_prev)
+{
+    _tstatecache *prev = NULL;
+    _tstatecache *cache = _tstatecaches.head;
+    while (cache != NULL && cache->interpid != interpid) {
+        prev = cache;
+        cache = cache->next;
+    }
+    if (p_prev != NULL) {
+        *p_prev = prev;
+    }
+    return cache;
+}
+
+// The caller must hold the mutex.
+static PyThreadState *
+_tstatecache_take(_tstatecache *cache, Py_ssize_t index)
+{
+    assert(index >= 0 && index < cache->count);
+    PyThreadState *tstate = cache->tstates[index];
+    cache->count -= 1;
+    memmove(&cache->tstates[index], &cache->tstates[index + 1],
+            sizeof(PyThreadState *) * (cache->count - index));
+    return tstate;
+}
+
+// The thread state must not be in use by any thread
+// and its interpreter must still exist.
+static void
+_dispose_tstate(PyThreadState *tstate)
+{
+    PyThreadState *save_tstate = PyThreadState_Swap(tstate);
+    PyThreadState_Clear(tstate);
+    PyThreadState_Swap(save_tstate);
+    PyThreadState_Delete(tstate);
+}
+
+static void
+_dispose_tstates(PyThreadState **tstates, Py_ssize_t count)
+{
+    for (Py_ssize_t i = 0; i < count; i++) {
+        _dispose_tstate(tstates[i]);
+    }
+}
+
+// Return a thread state bound to the interpreter for the current
+// OS thread, or NULL if the interpreter doesn't cache them.
+// Once done with it, the caller must pass it to _tstatecache_push().
+static PyThreadState *
+_tstatecache_pop(PyInterpreterState *interp)
+{
+    int64_t interpid = PyInterpreterState_GetID(interp);
+    unsigned long thread_id = PyThread_get_thread_ident();
+    PyThreadState *tstate = NULL;
+
+    PyMutex_Lock(&_tstatecaches.mutex);
+    _tstatecache *cache = _tstatecaches_find(interpid, NULL);
+    if (cache == NULL) {
+        PyMutex_Unlock(&_tstatecaches.mutex);
+        return NULL;
+    }
+    for (Py_ssize_t i = cache->count - 1; i >= 0; i--) {
+        if (cache->tstates[i]->thread_id == thread_id) {
+            tstate = _tstatecache_take(cache, i);
+            break;
+        }
+    }
+    PyMutex_Unlock(&_tstatecaches.mutex);
+
+    if (tstate == NULL) {
+        // This is the thread's first time here (or it was evicted).
+        // If this fails then _PyXI_Enter() will make one as usual.
+        tstate = _PyThreadState_NewBound(interp, _PyThreadState_WHENCE_EXEC);
+    }
+    return tstate;
+}
+
+// Put the thread state back, or throw it away if caching has since
+// been disabled for the interpreter.
+static void
+_tstatecache_push(PyInterpreterState *interp, PyThreadState *tstate)
+{
+    assert(tstate->interp == interp);
+    assert(PyThreadState_Get() != tstate);
+    int64_t interpid = PyInterpreterState_GetID(interp);
+    PyThreadState *dropped = tstate;
+
+    PyMutex_Lock(&_tstatecaches.mutex);
+    _tstatecache *cache = _tstatecaches_find(interpid, NULL);
+    if (cache != NULL) {
+        dropped = NULL;
+        if (cache->count == MAX_CACHED_TSTATES) {
+            dropped = _tstatecache_take(cache, 0);
+        }
+        cache->tstates[cache->count] = tstate;
+        cache->count += 1;
+    }
+    PyMutex_Unlock(&_tstatecaches.mutex);
+
+    if (dropped != NULL) {
+        _dispose_tstate(dropped);
+    }
+}
+
+static int
+_tstatecache_enable(PyInterpreterState *interp)
+{
+    int64_t interpid = PyInterpreterState_GetID(interp);
+    int res = 0;
+    PyMutex_Lock(&_tstatecaches.mutex);
+    if (_tstatecaches_find(interpid, NULL) == NULL) {
+        _tstatecache *cache = PyMem_RawCalloc(1, sizeof(_tstatecache));
+        if (cache == NULL) {
+            PyErr_NoMemory();
+            res = -1;
+        }
+        else {
+            cache->interpid = interpid;
+            cache->next = _tstatecaches.head;
+            _tstatecaches.head = cache;
+        }
+    }
+    PyMutex_Unlock(&_tstatecaches.mutex);
+    return res;
+}
+
+// Stop caching for the interpreter.  If "dispose" is false then the
+// interpreter has been destroyed already, along with its thread states.
+static void
+_tstatecache_disable(int64_t interpid, int dispose)
+{
+    PyMutex_Lock(&_tstatecaches.mutex);
+    _tstatecache *prev = NULL;
+    _tstatecache *cache = _tstatecaches_find(interpid, &prev);
+    if (cache != NULL) {
+        if (prev == NULL) {
+            _tstatecaches.head = cache->next;
+        }
+        else {
+            prev->next = cache->next;
+        }
+    }
+    PyMutex_Unlock(&_tstatecaches.mutex);
+
+    if (cache != NULL) {
+        if (dispose) {
+            _dispose_tstates(cache->tstates, cache->count);
+        }
+        PyMem_RawFree(cache);
+    }
+}
+
+// Throw away the cached thread states but keep caching.
+static void
+_tstatecache_clear(int64_t interpid)
+{
+    PyThreadState *tstates[MAX_CACHED_TSTATES];
+    Py_ssize_t count = 0;
+    PyMutex_Lock(&_tstatecaches.mutex);
+    _tstatecache *cache = _tstatecaches_find(interpid, NULL);
+    if (cache != NULL) {
+        count = cache->count;
+        memcpy(tstates, cache->tstates, sizeof(PyThreadState *) * count);
+        cache->count = 0;
+    }
+    PyMutex_Unlock(&_tstatecaches.mutex);
+
+    _dispose_tstates(tstates, count);
+}
+
+
 /* interpreter-specific code ************************************************/
 
 static int
@@ -427,20 +1091,12 @@ config_from_object(PyObject *configobj, PyInterpreterConfig *config)
 static int
 _run_script(PyObject *ns, const char *codestr, Py_ssize_t codestrlen, int flags)
 {
-    PyObject *result = NULL;
-    if (flags & RUN_TEXT) {
-        result = PyRun_StringFlags(codestr, Py_file_input, ns, ns, NULL);
-    }
-    else if (flags & RUN_CODE) {
-        PyObject *code = PyMarshal_ReadObjectFromString(codestr, codestrlen);
-        if (code != NULL) {
-            result = PyEval_EvalCode(code, ns, ns);
-            Py_DECREF(code);
-        }
-    }
-    else {
-        Py_UNREACHABLE();
+    PyObject *code = _get_code(codestr, codestrlen, flags);
+    if (code == NULL) {
+        return -1;
     }
+    PyObject *result = PyEval_EvalCode(code, ns, ns);
+    Py_DECREF(code);
     if (result == NULL) {
         return -1;
     }
@@ -451,14 +1107,24 @@ _run_script(PyObject *ns, const char *codestr, Py_ssize_t codestrlen, int flags)
 static int
 _run_in_interpreter(PyInterpreterState *interp,
                     const char *codestr, Py_ssize_t codestrlen,
-                    PyObject *shareables, int flags,
+                    PyObject *shareables, int flags, _xicall *call,
                     PyObject **p_excinfo)
 {
     assert(!PyErr_Occurred());
     _PyXI_session session = {0};
 
+    // Reuse a thread state, if the interpreter caches them.
+    PyThreadState *cached = NULL;
+    if (interp != PyInterpreterState_Get()) {
+        cached = _tstatecache_pop(interp);
+        session.given_tstate = cached;
+    }
+
     // Prep and switch interpreters.
     if (_PyXI_Enter(&session, interp, shareables) < 0) {
+        if (cached != NULL) {
+            _tstatecache_push(interp, cached);
+        }
         assert(!PyErr_Occurred());
         PyObject *excinfo = _PyXI_ApplyError(session.error);
         if (excinfo != NULL) {
@@ -468,11 +1134,21 @@ _run_in_interpreter(PyInterpreterState *interp,
         return -1;
     }
 
-    // Run the script.
-    int res = _run_script(session.main_ns, codestr, codestrlen, flags);
+    // Run the script (or make the call).
+    int res;
+    if (call != NULL) {
+        assert(flags & RUN_CODE);
+        res = _xicall_run(call, session.main_ns, codestr, codestrlen);
+    }
+    else {
+        res = _run_script(session.main_ns, codestr, codestrlen, flags);
+    }
 
     // Clean up and switch back.
     _PyXI_Exit(&session);
+    if (cached != NULL) {
+        _tstatecache_push(interp, cached);
+    }
 
     // Propagate any exception out to the caller.
     assert(!PyErr_Occurred());
@@ -705,7 +1381,11 @@ interp_destroy(PyObject *self, PyObject *args, PyObject *kwds)
     }
 
     // Destroy the interpreter.
+    // Any cached thread states must go first.
+    int64_t interpid = PyInterpreterState_GetID(interp);
+    _tstatecache_disable(interpid, 1);
     _PyXI_EndInterpreter(interp, NULL, NULL);
+    _codecache_forget(interpid);
 
     Py_RETURN_NONE;
 }
@@ -886,7 +1566,7 @@ convert_script_arg(PyObject *arg, const char *fname, const char *displayname,
 
 static PyCodeObject *
 convert_code_arg(PyObject *arg, const char *fname, const char *displayname,
-                 const char *expected)
+                 const char *expected, int allowargs)
 {
     const char *kind = NULL;
     PyCodeObject *code = NULL;
@@ -921,7 +1601,7 @@ convert_code_arg(PyObject *arg, const char *fname, const char *displayname,
         return NULL;
     }
 
-    const char *err = check_code_object(code);
+    const char *err = check_code_object(code, allowargs);
     if (err != NULL) {
         Py_DECREF(code);
         PyErr_Format(PyExc_ValueError,
@@ -934,7 +1614,8 @@ convert_code_arg(PyObject *arg, const char *fname, const char *displayname,
 
 static int
 _interp_exec(PyObject *self, PyInterpreterState *interp,
-             PyObject *code_arg, PyObject *shared_arg, PyObject **p_excinfo)
+             PyObject *code_arg, PyObject *shared_arg, _xicall *call,
+             PyObject **p_excinfo)
 {
     // Extract code.
     Py_ssize_t codestrlen = -1;
@@ -948,7 +1629,7 @@ _interp_exec(PyObject *self, PyInterpreterState *interp,
 
     // Run the code in the interpreter.
     int res = _run_in_interpreter(interp, codestr, codestrlen,
-                                  shared_arg, flags, p_excinfo);
+                                  shared_arg, flags, call, p_excinfo);
     Py_XDECREF(bytes_obj);
     if (res < 0) {
         return -1;
@@ -985,14 +1666,14 @@ interp_exec(PyObject *self, PyObject *args, PyObject *kwds)
     }
     else {
          code = (PyObject *)convert_code_arg(code, MODULE_NAME_STR ".exec",
-                                             "argument 2", expected);
+                                             "argument 2", expected, 0);
     }
     if (code == NULL) {
         return NULL;
     }
 
     PyObject *excinfo = NULL;
-    int res = _interp_exec(self, interp, code, shared, &excinfo);
+    int res = _interp_exec(self, interp, code, shared, NULL, &excinfo);
     Py_DECREF(code);
     if (res < 0) {
         assert((excinfo == NULL) != (PyErr_Occurred() == NULL));
@@ -1042,42 +1723,69 @@ interp_call(PyObject *self, PyObject *args, PyObject *kwds)
         return NULL;
     }
 
-    if (args_obj != NULL) {
-        PyErr_SetString(PyExc_ValueError, "got unexpected args");
+    if (args_obj != NULL && args_obj != Py_None && !PyTuple_Check(args_obj)) {
+        PyErr_Format(PyExc_TypeError,
+                     "expected args to be a tuple, got %R", args_obj);
         return NULL;
     }
-    if (kwargs_obj != NULL) {
-        PyErr_SetString(PyExc_ValueError, "got unexpected kwargs");
+    if (kwargs_obj != NULL && kwargs_obj != Py_None
+            && !PyDict_Check(kwargs_obj))
+    {
+        PyErr_Format(PyExc_TypeError,
+                     "expected kwargs to be a dict, got %R", kwargs_obj);
         return NULL;
     }
 
     PyObject *code = (PyObject *)convert_code_arg(callable, MODULE_NAME_STR ".call",
-                                                  "argument 2", "a function");
+                                                  "argument 2", "a function", 1);
     if (code == NULL) {
         return NULL;
     }
 
+    _xicall call;
+    if (_xicall_init(&call, callable, args_obj, kwargs_obj) < 0) {
+        Py_DECREF(code);
+        return NULL;
+    }
+
     PyObject *excinfo = NULL;
-    int res = _interp_exec(self, interp, code, NULL, &excinfo);
+    int res = _interp_exec(self, interp, code, NULL, &call, &excinfo);
     Py_DECREF(code);
     if (res < 0) {
+        _xicall_clear(&call);
         assert((excinfo == NULL) != (PyErr_Occurred() == NULL));
-        return excinfo;
+        if (excinfo == NULL) {
+            return NULL;
+        }
+        PyObject *packed = PyTuple_Pack(2, Py_None, excinfo);
+        Py_DECREF(excinfo);
+        return packed;
     }
-    Py_RETURN_NONE;
+
+    PyObject *result = _xicall_new_object(call.result, call.result_pickled);
+    _xicall_clear(&call);
+    if (result == NULL) {
+        return NULL;
+    }
+    PyObject *packed = PyTuple_Pack(2, result, Py_None);
+    Py_DECREF(result);
+    return packed;
 }
 
 PyDoc_STRVAR(call_doc,
-"call(id, callable, args=None, kwargs=None, *, restrict=False)\n\
+"call(id, callable, args=None, kwargs=None, *, restrict=False) -> (result, excinfo)\n\
 \n\
 Call the provided object in the identified interpreter.\n\
-Pass the given args and kwargs, if possible.\n\
+Pass the given args and kwargs and return the result.\n\
 \n\
-\"callable\" may be a plain function with no free vars that takes\n\
-no arguments.\n\
+\"callable\" may be a plain function with no free vars.\n\
 \n\
-The function's code object is used and all its state\n\
-is ignored, including its __globals__ dict.");
+The function's code object and defaults are used and the rest of its\n\
+state is ignored, including its __globals__ dict.\n\
+\n\
+The arguments and the return value are passed between the interpreters\n\
+directly if they are shareable, and otherwise are pickled.  If the call\n\
+raises then the result is None and \"excinfo\" describes the exception.");
 
 static PyObject *
 interp_run_string(PyObject *self, PyObject *args, PyObject *kwds)
@@ -1107,7 +1815,7 @@ interp_run_string(PyObject *self, PyObject *args, PyObject *kwds)
     }
 
     PyObject *excinfo = NULL;
-    int res = _interp_exec(self, interp, script, shared, &excinfo);
+    int res = _interp_exec(self, interp, script, shared, NULL, &excinfo);
     Py_DECREF(script);
     if (res < 0) {
         assert((excinfo == NULL) != (PyErr_Occurred() == NULL));
@@ -1146,13 +1854,14 @@ interp_run_func(PyObject *self, PyObject *args, PyObject *kwds)
 
     PyCodeObject *code = convert_code_arg(func, MODULE_NAME_STR ".exec",
                                           "argument 2",
-                                          "a function or a code object");
+                                          "a function or a code object", 0);
     if (code == NULL) {
         return NULL;
     }
 
     PyObject *excinfo = NULL;
-    int res = _interp_exec(self, interp, (PyObject *)code, shared, &excinfo);
+    int res = _interp_exec(self, interp, (PyObject *)code, shared, NULL,
+                           &excinfo);
     Py_DECREF(code);
     if (res < 0) {
         assert((excinfo == NULL) != (PyErr_Occurred() == NULL));
@@ -1352,11 +2061,165 @@ interp_decref(PyObject *self, PyObject *args, PyObject *kwds)
         return NULL;
     }
 
+    // If this is the last reference then the interpreter is destroyed,
+    // which any cached thread states would prevent.
+    int64_t interpid = PyInterpreterState_GetID(interp);
+    _tstatecache_clear(interpid);
     _PyInterpreterState_IDDecref(interp);
+    if (_PyInterpreterState_LookUpID(interpid) == NULL) {
+        PyErr_Clear();
+        _tstatecache_disable(interpid, 0);
+        _codecache_forget(interpid);
+    }
+
+    Py_RETURN_NONE;
+}
+
+
+
+static PyObject *
+interp_get_code_cache_info(PyObject *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"id", "restrict", NULL};
+    PyObject *id;
+    int restricted = 0;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds,
+                                     "O|$p:get_code_cache_info", kwlist,
+                                     &id, &restricted))
+    {
+        return NULL;
+    }
+
+    int reqready = 1;
+    PyInterpreterState *interp = \
+            resolve_interp(id, restricted, reqready, "get the code cache of");
+    if (interp == NULL) {
+        return NULL;
+    }
+
+    PyMutex_Lock(&_codecaches.mutex);
+    _codecache *cache = _codecaches_find(PyInterpreterState_GetID(interp),
+                                         NULL);
+    _codecache info = cache != NULL
+        ? *cache
+        : (_codecache){.maxsize = DEFAULT_CODE_CACHE_SIZE};
+    PyMutex_Unlock(&_codecaches.mutex);
+
+    PyObject *dict = Py_BuildValue("{sn,sn,sL,sL}",
+                                   "maxsize", info.maxsize,
+                                   "size", info.size,
+                                   "hits", info.hits,
+                                   "misses", info.misses);
+    if (dict == NULL) {
+        return NULL;
+    }
+    PyObject *ns = _PyNamespace_New(dict);
+    Py_DECREF(dict);
+    return ns;
+}
+
+PyDoc_STRVAR(get_code_cache_info_doc,
+"get_code_cache_info(id, *, restrict=False) -> namespace\n\
+\n\
+Return the maxsize, current size, hits, and misses of the identified\n\
+interpreter's cache of compiled code, used by exec() and call().");
+
+
+static PyObject *
+interp_set_code_cache_size(PyObject *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"id", "maxsize", "restrict", NULL};
+    PyObject *id;
+    Py_ssize_t maxsize;
+    int restricted = 0;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds,
+                                     "On|$p:set_code_cache_size", kwlist,
+                                     &id, &maxsize, &restricted))
+    {
+        return NULL;
+    }
+    if (maxsize < 0) {
+        PyErr_Format(PyExc_ValueError,
+                     "maxsize must be non-negative, got %zd", maxsize);
+        return NULL;
+    }
+
+    int reqready = 1;
+    PyInterpreterState *interp = \
+            resolve_interp(id, restricted, reqready, "set the code cache of");
+    if (interp == NULL) {
+        return NULL;
+    }
 
+    PyMutex_Lock(&_codecaches.mutex);
+    _codecache *cache = _codecaches_ensure(PyInterpreterState_GetID(interp));
+    if (cache != NULL) {
+        // The interpreter drops any extra entries the next time it
+        // adds one (or all of them once it sees a maxsize of 0).
+        cache->maxsize = maxsize;
+    }
+    PyMutex_Unlock(&_codecaches.mutex);
+    if (cache == NULL) {
+        PyErr_NoMemory();
+        return NULL;
+    }
     Py_RETURN_NONE;
 }
 
+PyDoc_STRVAR(set_code_cache_size_doc,
+"set_code_cache_size(id, maxsize, *, restrict=False)\n\
+\n\
+Set how many compiled code objects the identified interpreter keeps\n\
+for reuse by exec() and call().  A maxsize of 0 disables the cache.");
+
+static PyObject *
+interp_cache_tstates(PyObject *self, PyObject *args, PyObject *kwds)
+{
+    static char *kwlist[] = {"id", "enabled", "restrict", NULL};
+    PyObject *id;
+    int enabled = 1;
+    int restricted = 0;
+    if (!PyArg_ParseTupleAndKeywords(args, kwds,
+                                     "O|p$p:cache_tstates", kwlist,
+                                     &id, &enabled, &restricted))
+    {
+        return NULL;
+    }
+
+    int reqready = 1;
+    PyInterpreterState *interp = \
+            resolve_interp(id, restricted, reqready, "cache thread states for");
+    if (interp == NULL) {
+        return NULL;
+    }
+    if (_Py_IsMainInterpreter(interp)) {
+        PyErr_SetString(PyExc_InterpreterError,
+                        "cannot cache thread states for the main interpreter");
+        return NULL;
+    }
+
+    if (enabled) {
+        if (_tstatecache_enable(interp) < 0) {
+            return NULL;
+        }
+    }
+    else {
+        _tstatecache_disable(PyInterpreterState_GetID(interp), 1);
+    }
+    Py_RETURN_NONE;
+}
+
+PyDoc_STRVAR(cache_tstates_doc,
+"cache_tstates(id, enabled=True, *, restrict=False)\n\
+\n\
+Keep (or stop keeping) thread states for the identified interpreter,\n\
+one per calling OS thread, for reuse by exec() and call().\n\
+\n\
+Otherwise a new thread state is created and thrown away for each call\n\
+from a thread that isn't already running in the interpreter.\n\
+Only a few thread states are kept, the least recently used being\n\
+dropped first.");
+
 
 static PyObject *
 capture_exception(PyObject *self, PyObject *args, PyObject *kwds)
@@ -1463,6 +2326,12 @@ static PyMethodDef module_functions[] = {
      METH_VARARGS | METH_KEYWORDS, NULL},
     {"decref",                    _PyCFunction_CAST(interp_decref),
      METH_VARARGS | METH_KEYWORDS, NULL},
+    {"cache_tstates",             _PyCFunction_CAST(interp_cache_tstates),
+     METH_VARARGS | METH_KEYWORDS, cache_tstates_doc},
+    {"get_code_cache_info",       _PyCFunction_CAST(interp_get_code_cache_info),
+     METH_VARARGS | METH_KEYWORDS, get_code_cache_info_doc},
+    {"set_code_cache_size",       _PyCFunction_CAST(interp_set_code_cache_size),
+     METH_VARARGS | METH_KEYWORDS, set_code_cache_size_doc},
 
     {"is_shareable",              _PyCFunction_CAST(object_is_shareable),
      METH_VARARGS | METH_KEYWORDS, is_shareable_doc},
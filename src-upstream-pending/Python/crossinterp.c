@@ -1554,11 +1554,18 @@ _enter_session(_PyXI_session *session, PyInterpreterState *interp)
     PyThreadState *tstate = PyThreadState_Get();
     PyThreadState *prev = tstate;
     if (interp != tstate->interp) {
-        tstate = _PyThreadState_NewBound(interp, _PyThreadState_WHENCE_EXEC);
+        if (session->given_tstate != NULL) {
+            assert(session->given_tstate->interp == interp);
+            tstate = session->given_tstate;
+        }
+        else {
+            tstate = _PyThreadState_NewBound(interp,
+                                             _PyThreadState_WHENCE_EXEC);
+            session->own_init_tstate = 1;
+        }
         // XXX Possible GILState issues?
         session->prev_tstate = PyThreadState_Swap(tstate);
         assert(session->prev_tstate == prev);
-        session->own_init_tstate = 1;
     }
     session->init_tstate = tstate;
     session->prev_tstate = prev;
@@ -1586,11 +1593,17 @@ _exit_session(_PyXI_session *session)
     // Switch back.
     assert(session->prev_tstate != NULL);
     if (session->prev_tstate != session->init_tstate) {
-        assert(session->own_init_tstate);
-        session->own_init_tstate = 0;
-        PyThreadState_Clear(tstate);
-        PyThreadState_Swap(session->prev_tstate);
-        PyThreadState_Delete(tstate);
+        if (session->own_init_tstate) {
+            session->own_init_tstate = 0;
+            PyThreadState_Clear(tstate);
+            PyThreadState_Swap(session->prev_tstate);
+            PyThreadState_Delete(tstate);
+        }
+        else {
+            // The caller will clean it up (or reuse it).
+            assert(tstate == session->given_tstate);
+            PyThreadState_Swap(session->prev_tstate);
+        }
     }
     else {
         assert(!session->own_init_tstate);
@@ -4,6 +4,7 @@ import contextlib
 import pickle
 import textwrap
 from . import thread as _thread
+from interpreters_backport.interpreters import resolve_config
 import _interpreters
 import _interpqueues
 
@@ -42,7 +43,7 @@ UNBOUND = 2  # error; this should not happen.
 class WorkerContext(_thread.WorkerContext):
 
     @classmethod
-    def prepare(cls, initializer, initargs, shared):
+    def prepare(cls, initializer, initargs, shared, config=None):
         def resolve_task(fn, args, kwargs):
             if isinstance(fn, str):
                 # XXX Circle back to this later.
@@ -74,8 +75,9 @@ class WorkerContext(_thread.WorkerContext):
                 raise  # re-raise
         else:
             initdata = None
+        config = resolve_config(config)
         def create_context():
-            return cls(initdata, shared)
+            return cls(initdata, shared, config)
         return create_context, resolve_task
 
     @classmethod
@@ -110,9 +112,10 @@ class WorkerContext(_thread.WorkerContext):
         fn, args, kwargs = pickle.loads(pickled)
         cls._call(fn, args, kwargs, resultsid)
 
-    def __init__(self, initdata, shared=None):
+    def __init__(self, initdata, shared=None, config=None):
         self.initdata = initdata
         self.shared = dict(shared) if shared else None
+        self.config = config
         self.interpid = None
         self.resultsid = None
 
@@ -128,7 +131,7 @@ class WorkerContext(_thread.WorkerContext):
 
     def initialize(self):
         assert self.interpid is None, self.interpid
-        self.interpid = _interpreters.create(reqrefs=True)
+        self.interpid = _interpreters.create(self.config, reqrefs=True)
         try:
             _interpreters.incref(self.interpid)
 
@@ -220,11 +223,11 @@ class InterpreterPoolExecutor(_thread.ThreadPoolExecutor):
     BROKEN = BrokenInterpreterPool
 
     @classmethod
-    def prepare_context(cls, initializer, initargs, shared):
-        return WorkerContext.prepare(initializer, initargs, shared)
+    def prepare_context(cls, initializer, initargs, shared, config=None):
+        return WorkerContext.prepare(initializer, initargs, shared, config)
 
     def __init__(self, max_workers=None, thread_name_prefix='',
-                 initializer=None, initargs=(), shared=None):
+                 initializer=None, initargs=(), shared=None, config=None):
         """Initializes a new InterpreterPoolExecutor instance.
 
         Args:
@@ -236,6 +239,10 @@ class InterpreterPoolExecutor(_thread.ThreadPoolExecutor):
             initargs: A tuple of arguments to pass to the initializer.
             shared: A mapping of shareabled objects to be inserted into
                 each worker interpreter.
+            config: The config used to create each worker interpreter.
+                This may be the name of a predefined config, an object
+                returned by _interpreters.new_config(), or a dict of
+                fields that override the default ("isolated") config.
         """
         super().__init__(max_workers, thread_name_prefix,
-                         initializer, initargs, shared=shared)
+                         initializer, initargs, shared=shared, config=config)
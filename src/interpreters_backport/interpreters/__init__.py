@@ -1,6 +1,8 @@
 """Subinterpreters High Level Module."""
 
+import collections
 import threading
+import time
 import weakref
 try:
     import _interpreters
@@ -19,7 +21,8 @@ from _interpreters import (
 
 __all__ = [
     'get_current', 'get_main', 'create', 'list_all', 'is_shareable',
-    'Interpreter',
+    'new_config', 'resolve_config',
+    'Interpreter', 'InterpreterPool',
     'InterpreterError', 'InterpreterNotFoundError', 'ExecutionFailed',
     'NotShareableError',
     'create_queue', 'Queue', 'QueueEmpty', 'QueueFull',
@@ -77,9 +80,41 @@ class ExecutionFailed(InterpreterError):
             )
 
 
-def create():
-    """Return a new (idle) Python interpreter."""
-    id = _interpreters.create(reqrefs=True)
+def new_config(name='isolated', /, **overrides):
+    """Return a new interpreter config, to pass to create().
+
+    The name selects the initial values: "isolated" (the default),
+    "legacy", "default", or "empty".  The result is a namespace with
+    one attribute per field (e.g. own_gil, allow_threads,
+    check_multi_interp_extensions), which may be changed before use.
+    Any keyword arguments are applied to the corresponding fields.
+    """
+    return _interpreters.new_config(name, **overrides)
+
+
+def resolve_config(config):
+    """Return the given config in a form that create() takes.
+
+    A dict is turned into a config, as new_config(**config).  None, a
+    config name (e.g. "legacy"), or a config object (e.g. from
+    new_config()) is returned as-is.  This is how create() and the
+    other functions that take a "config" argument handle it.
+    """
+    if config is None or isinstance(config, str):
+        return config
+    if isinstance(config, dict):
+        return new_config(**config)
+    return config
+
+
+def create(config=None):
+    """Return a new (idle) Python interpreter.
+
+    "config" may be the name of a predefined config, an object returned
+    by new_config(), or a dict of fields that override the default
+    ("isolated") config.
+    """
+    id = _interpreters.create(resolve_config(config), reqrefs=True)
     return Interpreter(id, _ownsref=True)
 
 
@@ -148,6 +183,10 @@ class Interpreter:
             self._id = id
             self._whence = _whence
             self._ownsref = _ownsref
+            self._tstatecaching = False
+            self._executor = None
+            self._executor_tstatecaching = False
+            self._executor_lock = threading.Lock()
             if _ownsref:
                 # This may raise InterpreterNotFoundError:
                 _interpreters.incref(id)
@@ -160,6 +199,9 @@ class Interpreter:
         return hash(self._id)
 
     def __del__(self):
+        # Any pending submit() call would have kept us alive,
+        # so there's nothing to wait for.
+        self._shutdown_executor(wait=False)
         self._decref()
 
     # for pickling:
@@ -187,6 +229,11 @@ class Interpreter:
     def whence(self):
         return self._WHENCE_TO_STR[self._whence]
 
+    @property
+    def config(self):
+        """A copy of the config the interpreter was created with."""
+        return _interpreters.get_config(self._id)
+
     def is_running(self):
         """Return whether or not the identified interpreter is running."""
         return _interpreters.is_running(self._id)
@@ -200,8 +247,36 @@ class Interpreter:
         Attempting to destroy the current interpreter results
         in an InterpreterError.
         """
+        self._shutdown_executor()
         return _interpreters.destroy(self._id, restrict=True)
 
+    def cache_thread_states(self, enabled=True):
+        """Keep a thread state per calling thread, for reuse.
+
+        Every exec() or call() from a thread that isn't already running
+        in the interpreter needs a thread state for it.  By default one
+        is created and then thrown away for each call.  With caching
+        enabled, repeated calls from the same thread reuse one instead,
+        which makes them cheaper.  Only a few are kept at a time.
+        """
+        _interpreters.cache_tstates(self._id, enabled, restrict=True)
+        self._tstatecaching = enabled
+
+    def code_cache_info(self):
+        """Return stats about the interpreter's compiled code cache.
+
+        The result has maxsize, size, hits, and misses attributes.
+        """
+        return _interpreters.get_code_cache_info(self._id, restrict=True)
+
+    def set_code_cache_size(self, maxsize):
+        """Set how much compiled code exec() and call() keep around.
+
+        Running the same code repeatedly skips compiling it again,
+        as long as it is still in the cache.  0 disables the cache.
+        """
+        _interpreters.set_code_cache_size(self._id, maxsize, restrict=True)
+
     def prepare_main(self, ns=None, /, **kwargs):
         """Bind the given values into the interpreter's __main__.
 
@@ -232,33 +307,297 @@ class Interpreter:
         if excinfo is not None:
             raise ExecutionFailed(excinfo)
 
-    def call(self, callable, /):
+    def call(self, callable, /, *args, **kwargs):
         """Call the object in the interpreter with given args/kwargs.
 
-        Only functions that take no arguments and have no closure
-        are supported.
+        Only plain functions without a closure are supported.  Their
+        defaults are used but the rest of their state is ignored,
+        including __globals__.  The function runs with the __dict__
+        of the interpreter's __main__ module as its globals.
 
-        The return value is discarded.
+        Return the function's return value.  The arguments and the
+        return value are passed between the interpreters directly if
+        they are shareable, which is fast, and are otherwise pickled.
 
         If the callable raises an exception then the error display
         (including full traceback) is send back between the interpreters
         and an ExecutionFailed exception is raised, much like what
         happens with Interpreter.exec().
         """
-        # XXX Support args and kwargs.
         # XXX Support arbitrary callables.
-        # XXX Support returning the return value (e.g. via pickle).
-        excinfo = _interpreters.call(self._id, callable, restrict=True)
+        res, excinfo = _interpreters.call(self._id, callable, args, kwargs,
+                                          restrict=True)
         if excinfo is not None:
             raise ExecutionFailed(excinfo)
+        return res
+
+    # The threads used by submit() are kept for the interpreter's
+    # lifetime, each with its own cached thread state.
+    _SUBMIT_MAX_WORKERS = 4
+
+    def _get_executor(self):
+        with self._executor_lock:
+            if self._executor is None:
+                from concurrent.futures import ThreadPoolExecutor
+                if not self._tstatecaching:
+                    self.cache_thread_states()
+                    self._executor_tstatecaching = True
+                self._executor = ThreadPoolExecutor(
+                    self._SUBMIT_MAX_WORKERS,
+                    thread_name_prefix=f'interpreter-{self._id}',
+                )
+            return self._executor
+
+    def _shutdown_executor(self, wait=True):
+        with self._executor_lock:
+            executor = self._executor
+            self._executor = None
+            # We only turn off the caching we turned on.
+            disablecaching = self._executor_tstatecaching
+            self._executor_tstatecaching = False
+        if executor is not None:
+            # A worker thread can't wait for itself (e.g. close()
+            # called from a future's done callback).
+            if threading.current_thread() in executor._threads:
+                wait = False
+            executor.shutdown(wait=wait)
+        if disablecaching and self._tstatecaching:
+            try:
+                self.cache_thread_states(False)
+            except InterpreterNotFoundError:
+                # It was already destroyed.
+                self._tstatecaching = False
+
+    def submit(self, callable, /, *args, **kwargs):
+        """Call the object in the interpreter, in another thread.
+
+        Return a concurrent.futures.Future for the result.  If the call
+        fails then the future's exception is the ExecutionFailed that
+        Interpreter.call() would have raised.
+
+        The calls are run by a small set of threads that stays bound
+        to the interpreter until it is closed (or this object goes
+        away), so no thread is created per call.  Until then, thread
+        state caching (see cache_thread_states()) is enabled for the
+        interpreter, which also applies to exec() and call() from
+        other threads.
+        """
+        return self._get_executor().submit(self.call, callable,
+                                           *args, **kwargs)
+
+    async def call_async(self, callable, /, *args, **kwargs):
+        """Call the object in the interpreter, without blocking the loop.
+
+        This is the asyncio counterpart of submit().
+        """
+        import asyncio
+        return await asyncio.wrap_future(self.submit(callable,
+                                                     *args, **kwargs))
 
     def call_in_thread(self, callable, /):
         """Return a new thread that calls the object in the interpreter.
 
         The return value and any raised exception are discarded.
+        Use submit() to get them, without a new thread per call.
         """
         def task():
             self.call(callable)
         t = threading.Thread(target=task)
         t.start()
         return t
+
+
+class InterpreterPool:
+    """A set of idle interpreters, created ahead of time.
+
+    Creating an interpreter (and then importing modules in it) is
+    relatively slow.  The pool does that work in a background thread,
+    so get() can usually hand out a ready interpreter right away.
+    Each interpreter is handed out only once and then belongs to
+    the caller, who should close it when done.  The pool tops itself
+    back up to "size" interpreters after each get().
+
+    "preload" is a sequence of module names to import in each
+    interpreter before it is handed out.  Each must be a dotted
+    module name, like "json" or "xml.etree.ElementTree".
+
+    If "idle_timeout" is set then interpreters that stay in the pool
+    longer than that many seconds are closed, and the pool is not
+    refilled until the next get().
+
+    "config" is passed to create() for each interpreter.
+
+    The pool is closed at interpreter exit, or when it is garbage
+    collected, if close() wasn't called first.
+    """
+
+    def __init__(self, size=4, *, preload=(), idle_timeout=None,
+                 config=None):
+        if size < 1:
+            raise ValueError(f'size must be at least 1, got {size!r}')
+        if isinstance(preload, str):
+            preload = (preload,)
+        preload = tuple(preload)
+        for name in preload:
+            if not isinstance(name, str):
+                raise TypeError(f'expected module name, got {name!r}')
+            if not all(part.isidentifier() for part in name.split('.')):
+                raise ValueError(f'invalid module name {name!r}')
+        if idle_timeout is not None and idle_timeout < 0:
+            raise ValueError(f'idle_timeout must be non-negative, '
+                             f'got {idle_timeout!r}')
+        self._size = size
+        self._preload = preload
+        self._idle_timeout = idle_timeout
+        self._config = resolve_config(config)
+        # (interp, time added), oldest first
+        self._idle = collections.deque()
+        self._refill = True
+        self._closed = False
+        self._cond = threading.Condition()
+        # The thread only holds a weak reference to the pool, so
+        # an unclosed pool can still be garbage collected.
+        selfref = weakref.ref(self)
+        self._thread = threading.Thread(
+            target=self._run, args=(selfref, self._cond))
+        # Stop the thread before the runtime starts finalizing,
+        # rather than letting it create interpreters during that.
+        threading._register_atexit(_close_pool, selfref)
+        self._thread.start()
+
+    def __del__(self):
+        try:
+            thread = self._thread
+        except AttributeError:
+            # __init__() failed.
+            return
+        if thread.is_alive():
+            self.close()
+
+    def __repr__(self):
+        return f'{type(self).__name__}(size={self._size})'
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def size(self):
+        return self._size
+
+    @property
+    def preload(self):
+        return self._preload
+
+    def get(self):
+        """Return a ready interpreter, removing it from the pool.
+
+        If the pool is empty then a new interpreter is created
+        and prepared in the current thread.
+        """
+        with self._cond:
+            if self._closed:
+                raise InterpreterError('pool closed')
+            self._refill = True
+            self._cond.notify()
+            if self._idle:
+                interp, _ = self._idle.popleft()
+                return interp
+        return self._new()
+
+    def close(self):
+        """Stop refilling the pool and close any idle interpreters."""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            idle = [interp for interp, _ in self._idle]
+            self._idle.clear()
+            self._cond.notify()
+        if self._thread is not threading.current_thread():
+            self._thread.join()
+        for interp in idle:
+            self._discard(interp)
+
+    def _new(self):
+        interp = create(self._config)
+        if self._preload:
+            try:
+                interp.exec(f'import {", ".join(self._preload)}')
+            except BaseException:
+                self._discard(interp)
+                raise
+        return interp
+
+    def _discard(self, interp):
+        try:
+            interp.close()
+        except InterpreterNotFoundError:
+            pass
+
+    def _pop_expired(self):
+        # The caller must hold the lock.
+        expired = []
+        if self._idle_timeout is not None:
+            cutoff = time.monotonic() - self._idle_timeout
+            while self._idle and self._idle[0][1] <= cutoff:
+                interp, _ = self._idle.popleft()
+                expired.append(interp)
+            if expired:
+                self._refill = False
+        return expired
+
+    def _next_expiry(self):
+        # The caller must hold the lock.
+        if self._idle_timeout is None or not self._idle:
+            return None
+        added = self._idle[0][1]
+        return max(0, added + self._idle_timeout - time.monotonic())
+
+    @staticmethod
+    def _run(selfref, cond):
+        while True:
+            with cond:
+                while True:
+                    self = selfref()
+                    if self is None or self._closed:
+                        return
+                    expired = self._pop_expired()
+                    if expired:
+                        break
+                    if self._refill and len(self._idle) < self._size:
+                        break
+                    timeout = self._next_expiry()
+                    # Don't keep the pool alive while waiting.
+                    del self
+                    if selfref() is None:
+                        # It was just closed by __del__().
+                        return
+                    cond.wait(timeout)
+            if expired:
+                for interp in expired:
+                    self._discard(interp)
+                continue
+
+            try:
+                interp = self._new()
+            except Exception:
+                # get() will hit (and report) the same failure.
+                with cond:
+                    self._refill = False
+                continue
+            with cond:
+                if not self._closed:
+                    self._idle.append((interp, time.monotonic()))
+                    del self
+                    continue
+            self._discard(interp)
+            return
+
+
+def _close_pool(selfref):
+    pool = selfref()
+    if pool is not None:
+        pool.close()
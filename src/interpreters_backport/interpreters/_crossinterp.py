@@ -1,5 +1,7 @@
 """Common code between queues and channels."""
 
+import os
+
 
 class ItemInterpreterDestroyed(Exception):
     """Raised when trying to get an item whose interpreter was destroyed."""
@@ -100,3 +102,107 @@ def resolve_unbound(flag, exctype_destroyed):
         return UNBOUND
     else:
         raise NotImplementedError(repr(op))
+
+
+class Watcher:
+    """Lets coroutines wait for a cross-interpreter container to change.
+
+    The low-level module writes a byte to a pipe whenever items are
+    added to or removed from the container, and the event loop watches
+    the other end.  That way no threads are needed, regardless of how
+    many containers are being waited on.
+
+    "watch" and "unwatch" are the low-level module's functions for
+    registering the pipe, and "exctype_notfound" is the exception
+    it raises once the container is gone.
+    """
+
+    def __init__(self, id, watch, unwatch, exctype_notfound,
+                 kind='cross-interpreter container'):
+        self._id = id
+        self._unwatch = unwatch
+        self._exctype_notfound = exctype_notfound
+        self._kind = kind
+        self._rfd, self._wfd = os.pipe()
+        os.set_blocking(self._rfd, False)
+        os.set_blocking(self._wfd, False)
+        self._loop = None
+        self._waiters = set()
+        try:
+            watch(id, self._wfd)
+        except BaseException:
+            os.close(self._rfd)
+            os.close(self._wfd)
+            raise
+
+    @property
+    def fd(self):
+        """The fd that the low-level module writes to."""
+        return self._wfd
+
+    def close(self):
+        if self._rfd is None:
+            return
+        if self._waiters and not self._loop.is_closed():
+            self._loop.remove_reader(self._rfd)
+        try:
+            self._unwatch(self._id, self._wfd)
+        except self._exctype_notfound:
+            pass
+        os.close(self._rfd)
+        os.close(self._wfd)
+        self._rfd = self._wfd = None
+
+    async def wait(self, timeout=None):
+        """Return once the container may have changed.
+
+        TimeoutError is raised if "timeout" (in seconds) expires first.
+        NotImplementedError is raised if the running event loop
+        doesn't support add_reader() (e.g. the proactor loop).
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        if not self._waiters:
+            loop.add_reader(self._rfd, self._on_ready)
+            self._loop = loop
+        elif loop is not self._loop:
+            raise RuntimeError(
+                    f'{self._kind} is already being awaited '
+                    'in another event loop')
+        fut = loop.create_future()
+        self._waiters.add(fut)
+        try:
+            await asyncio.wait_for(fut, timeout)
+        finally:
+            self._waiters.discard(fut)
+            if not self._waiters and not loop.is_closed():
+                loop.remove_reader(self._rfd)
+
+    async def wait_until(self, deadline):
+        """Wait for the container to change, until the deadline (if any).
+
+        The deadline is relative to the running loop's time().
+        Return False if the deadline has passed.
+        """
+        import asyncio
+        loop = asyncio.get_running_loop()
+        timeout = None
+        if deadline is not None:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                return False
+        try:
+            await self.wait(timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    def _on_ready(self):
+        try:
+            while os.read(self._rfd, 4096):
+                pass
+        except BlockingIOError:
+            pass
+        for fut in self._waiters:
+            if not fut.done():
+                fut.set_result(None)
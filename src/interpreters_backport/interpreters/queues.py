@@ -1,8 +1,8 @@
 """Cross-interpreter Queues High Level Module."""
 
+import functools
 import pickle
 import queue
-import time
 import weakref
 try:
     import _interpqueues as _queues
@@ -15,7 +15,7 @@ from . import _crossinterp
 
 # aliases:
 from _interpqueues import (
-    QueueError, QueueNotFoundError,
+    QueueError, QueueNotFoundError, QueueStats,
 )
 from ._crossinterp import (
     UNBOUND_ERROR, UNBOUND_REMOVE,
@@ -24,9 +24,11 @@ from ._crossinterp import (
 __all__ = [
     'UNBOUND', 'UNBOUND_ERROR', 'UNBOUND_REMOVE',
     'create', 'list_all',
+    'select', 'poll', 'EVENT_GET', 'EVENT_PUT',
     'Queue',
     'QueueError', 'QueueNotFoundError', 'QueueEmpty', 'QueueFull',
     'ItemInterpreterDestroyed',
+    'QueueStats',
 ]
 
 
@@ -51,6 +53,36 @@ class ItemInterpreterDestroyed(QueueError,
 
 _SHARED_ONLY = 0
 _PICKLED = 1
+_PICKLED_OOB = 2  # protocol 5, with out-of-band buffers
+
+# Smaller buffers are cheaper to copy than to share.
+_OOB_MIN_SIZE = 4096
+
+
+def _dumps(obj, fmt):
+    if fmt != _PICKLED_OOB:
+        return pickle.dumps(obj)
+    buffers = []
+    def buffer_callback(buf):
+        try:
+            raw = buf.raw()
+        except BufferError:
+            # It isn't contiguous, so we pickle it in-band.
+            return True
+        if raw.nbytes < _OOB_MIN_SIZE:
+            return True
+        buffers.append(raw)
+        return False
+    data = pickle.dumps(obj, protocol=5, buffer_callback=buffer_callback)
+    # Each memoryview is shared with the receiving interpreter as-is.
+    return (data, *buffers)
+
+
+def _loads(data, fmt):
+    if fmt != _PICKLED_OOB:
+        return pickle.loads(data)
+    data, *buffers = data
+    return pickle.loads(data, buffers=buffers)
 
 
 UNBOUND = _crossinterp.UnboundItem.singleton('queue', __name__)
@@ -69,7 +101,8 @@ def _resolve_unbound(flag):
     return resolved
 
 
-def create(maxsize=0, *, syncobj=False, unbounditems=UNBOUND):
+def create(maxsize=0, *, syncobj=False, unbounditems=UNBOUND,
+           outofband=False, order='fifo'):
     """Return a new cross-interpreter queue.
 
     The queue may be used to pass data safely between interpreters.
@@ -80,18 +113,101 @@ def create(maxsize=0, *, syncobj=False, unbounditems=UNBOUND):
     "unbounditems" likewise sets the default.  See Queue.put() for
     supported values.  The default value is UNBOUND, which replaces
     the unbound item.
+
+    If "outofband" is true then objects that are not put with
+    "syncobj" are pickled with protocol 5, and any large buffers
+    they expose (e.g. bytearray, memoryview, or array types that
+    support PickleBuffer) are passed out-of-band.  Instead of being
+    copied into the pickle data, such buffers are shared directly
+    with the receiving interpreter, which unpickles the object
+    on top of them.  Types like bytearray still copy when they are
+    unpickled, but others (e.g. NumPy arrays) don't copy at all.
+    In that case the receiver sees any later changes to the original
+    buffer, so don't modify it after it has been put.
+
+    "order" is either "fifo" (the default) or "priority".  Items in
+    a priority queue come out in order of the "priority" (lowest
+    first) and then the "deadline" (earliest first) passed to
+    Queue.put(), and otherwise in the order they were added.
     """
-    fmt = _SHARED_ONLY if syncobj else _PICKLED
+    if order == 'fifo':
+        ordered = False
+    elif order == 'priority':
+        ordered = True
+    else:
+        raise ValueError(f'unsupported order {order!r}')
+    if syncobj and outofband:
+        raise ValueError('"outofband" only applies to pickled objects')
+    if syncobj:
+        fmt = _SHARED_ONLY
+    else:
+        fmt = _PICKLED_OOB if outofband else _PICKLED
     unbound = _serialize_unbound(unbounditems)
     unboundop, = unbound
-    qid = _queues.create(maxsize, fmt, unboundop)
+    qid = _queues.create(maxsize, fmt, unboundop, ordered=ordered)
     return Queue(qid, _fmt=fmt, _unbound=unbound)
 
 
-def list_all():
-    """Return a list of all open queues."""
-    return [Queue(qid, _fmt=fmt, _unbound=(unboundop,))
-            for qid, fmt, unboundop in _queues.list_all()]
+def list_all(*, stats=False):
+    """Return a list of all open queues.
+
+    If "stats" is true then each item is a (queue, stats) pair
+    instead, where "stats" is what Queue.stats() returns.
+    """
+    queues = [Queue(qid, _fmt=fmt, _unbound=(unboundop,))
+              for qid, fmt, unboundop in _queues.list_all()]
+    if not stats:
+        return queues
+    withstats = []
+    for queue in queues:
+        try:
+            withstats.append((queue, queue.stats()))
+        except QueueNotFoundError:
+            # It was destroyed in the meantime.
+            pass
+    return withstats
+
+
+EVENT_GET = 1  # the queue has items
+EVENT_PUT = 2  # the queue has space
+
+
+def poll(queues, timeout=None):
+    """Wait until any of the queues is ready.
+
+    "queues" is an iterable of (queue, events) pairs (e.g. the items
+    of a dict), where "events" is EVENT_GET, EVENT_PUT, or both
+    (EVENT_GET | EVENT_PUT).
+
+    Return a list of (queue, events) pairs for the queues that are
+    ready, in the given order.  The events are the ones that are
+    ready.  This blocks (without polling) until at least one queue
+    is ready.  If "timeout" (in seconds) is provided and it expires
+    then an empty list is returned.
+
+    Note that another thread or interpreter may get to a ready
+    queue first, so get_nowait() and put_nowait() may still fail.
+    """
+    if timeout is not None and timeout < 0:
+        raise ValueError(f'timeout value must be non-negative')
+    byid = {}
+    items = []
+    for queue, events in queues:
+        byid[queue.id] = queue
+        items.append((queue.id, events))
+    ready = _queues.poll(items, blocking=True, timeout=timeout)
+    return [(byid[qid], events) for qid, events in ready]
+
+
+def select(queues, timeout=None):
+    """Return the queues that have items, waiting until there are any.
+
+    This is like poll() with EVENT_GET for each queue.  If "timeout"
+    (in seconds) is provided and it expires then an empty list
+    is returned.
+    """
+    return [queue
+            for queue, _ in poll(((q, EVENT_GET) for q in queues), timeout)]
 
 
 _known_queues = weakref.WeakValueDictionary()
@@ -126,6 +242,12 @@ class Queue:
         return self
 
     def __del__(self):
+        try:
+            watcher = self._watcher
+        except AttributeError:
+            pass
+        else:
+            watcher.close()
         try:
             _queues.release(self._id)
         except QueueNotFoundError:
@@ -170,14 +292,51 @@ class Queue:
     def qsize(self):
         return _queues.get_count(self._id)
 
+    def stats(self):
+        """Return a QueueStats with the queue's counters.
+
+        These are tracked for every queue, at effectively no cost.
+        See QueueStats for the available fields.
+        """
+        return _queues.get_stats(self._id)
+
+    def _resolve_fmt(self, syncobj):
+        if syncobj is None:
+            return self._fmt
+        elif syncobj:
+            return _SHARED_ONLY
+        elif self._fmt == _PICKLED_OOB:
+            return _PICKLED_OOB
+        else:
+            return _PICKLED
+
+    def _get_watcher(self):
+        try:
+            return self._watcher
+        except AttributeError:
+            self._watcher = _crossinterp.Watcher(
+                    self._id, _queues.watch, _queues.unwatch,
+                    QueueNotFoundError, 'queue')
+            return self._watcher
+
+    async def _wait_for_change(self, deadline):
+        """Wait for the queue to change, until the deadline (if any).
+
+        Return False if the deadline has passed.
+        """
+        return await self._get_watcher().wait_until(deadline)
+
     def put(self, obj, timeout=None, *,
             syncobj=None,
             unbound=None,
-            _delay=10 / 1000,  # 10 milliseconds
+            priority=None,
+            deadline=None,
             ):
         """Add the object to the queue.
 
-        This blocks while the queue is full.
+        This blocks while the queue is full.  If "timeout" (in seconds)
+        is provided and the queue is still full once it expires then
+        QueueFull is raised.
 
         If "syncobj" is None (the default) then it uses the
         queue's default, set with create_queue().
@@ -223,97 +382,229 @@ class Queue:
 
         If "unbound" is UNBOUND then it is returned by get() in place
         of the unbound item.
+
+        "priority" and "deadline" are only supported for queues created
+        with order="priority".  The priority is an int, where lower
+        values come out first, and defaults to 0.  The deadline
+        is a time.monotonic() timestamp.  Items with the same priority
+        come out in order of their deadlines, with those that don't
+        have one last.
         """
-        if syncobj is None:
-            fmt = self._fmt
+        fmt = self._resolve_fmt(syncobj)
+        if unbound is None:
+            unboundop, = self._unbound
         else:
-            fmt = _SHARED_ONLY if syncobj else _PICKLED
+            unboundop, = _serialize_unbound(unbound)
+        if timeout is not None and timeout < 0:
+            raise ValueError(f'timeout value must be non-negative')
+        if fmt != _SHARED_ONLY:
+            obj = _dumps(obj, fmt)
+        _queues.put(self._id, obj, fmt, unboundop,
+                    blocking=True, timeout=timeout,
+                    priority=priority, deadline=deadline)
+
+    async def aput(self, obj, timeout=None, *,
+                   syncobj=None,
+                   unbound=None,
+                   priority=None,
+                   deadline=None,
+                   ):
+        """Add the object to the queue, without blocking the event loop.
+
+        This is the same as put(), except it waits asynchronously
+        while the queue is full.
+        """
+        import asyncio
+        fmt = self._resolve_fmt(syncobj)
         if unbound is None:
             unboundop, = self._unbound
         else:
             unboundop, = _serialize_unbound(unbound)
-        if timeout is not None:
-            timeout = int(timeout)
-            if timeout < 0:
-                raise ValueError(f'timeout value must be non-negative')
-            end = time.time() + timeout
-        if fmt is _PICKLED:
-            obj = pickle.dumps(obj)
+        if timeout is not None and timeout < 0:
+            raise ValueError(f'timeout value must be non-negative')
+        if fmt != _SHARED_ONLY:
+            obj = _dumps(obj, fmt)
+        loop = asyncio.get_running_loop()
+        wait_deadline = None if timeout is None else loop.time() + timeout
+        # Start watching before the first attempt, so we can't miss
+        # the queue being drained right after it fails.
+        self._get_watcher()
         while True:
             try:
-                _queues.put(self._id, obj, fmt, unboundop)
-            except QueueFull as exc:
-                if timeout is not None and time.time() >= end:
+                _queues.put(self._id, obj, fmt, unboundop,
+                            priority=priority, deadline=deadline)
+                return
+            except QueueFull:
+                try:
+                    changed = await self._wait_for_change(wait_deadline)
+                except NotImplementedError:
+                    break
+                if not changed:
                     raise  # re-raise
-                time.sleep(_delay)
-            else:
-                break
-
-    def put_nowait(self, obj, *, syncobj=None, unbound=None):
-        if syncobj is None:
-            fmt = self._fmt
+        # The event loop can't watch the queue, so we use a thread.
+        if wait_deadline is not None:
+            timeout = max(0, wait_deadline - loop.time())
+        put = functools.partial(_queues.put, self._id, obj, fmt, unboundop,
+                                blocking=True, timeout=timeout,
+                                priority=priority, deadline=deadline)
+        await loop.run_in_executor(None, put)
+
+    def put_nowait(self, obj, *, syncobj=None, unbound=None,
+                   priority=None, deadline=None):
+        fmt = self._resolve_fmt(syncobj)
+        if unbound is None:
+            unboundop, = self._unbound
         else:
-            fmt = _SHARED_ONLY if syncobj else _PICKLED
+            unboundop, = _serialize_unbound(unbound)
+        if fmt != _SHARED_ONLY:
+            obj = _dumps(obj, fmt)
+        _queues.put(self._id, obj, fmt, unboundop,
+                    priority=priority, deadline=deadline)
+
+    def put_many(self, objs, timeout=None, *, syncobj=None, unbound=None,
+                 priority=None, deadline=None):
+        """Add each of the objects to the queue, in order.
+
+        The whole batch is added at once, rather than one object at a
+        time, which is much more efficient than calling put() for each.
+        If the queue doesn't have enough space then this blocks until
+        there is, like put() does.
+
+        Return the number of objects added.  That is less than all of
+        them only if the queue filled up and "timeout" (in seconds)
+        expired.  If none could be added then QueueFull is raised.
+
+        "syncobj", "unbound", "priority" and "deadline" apply to every
+        object and have the same meaning as for put().
+        """
+        fmt = self._resolve_fmt(syncobj)
         if unbound is None:
             unboundop, = self._unbound
         else:
             unboundop, = _serialize_unbound(unbound)
-        if fmt is _PICKLED:
-            obj = pickle.dumps(obj)
-        _queues.put(self._id, obj, fmt, unboundop)
-
-    def get(self, timeout=None, *,
-            _delay=10 / 1000,  # 10 milliseconds
-            ):
+        if timeout is not None and timeout < 0:
+            raise ValueError(f'timeout value must be non-negative')
+        if fmt != _SHARED_ONLY:
+            objs = [_dumps(obj, fmt) for obj in objs]
+        return _queues.put_many(self._id, objs, fmt, unboundop,
+                                blocking=True, timeout=timeout,
+                                priority=priority, deadline=deadline)
+
+    def get(self, timeout=None, *, view=False):
         """Return the next object from the queue.
 
-        This blocks while the queue is empty.
+        This blocks while the queue is empty.  If "timeout" (in seconds)
+        is provided and the queue is still empty once it expires then
+        QueueEmpty is raised.
 
         If the next item's original interpreter has been destroyed
         then the "next object" is determined by the value of the
         "unbound" argument to put().
+
+        If "view" is true then a bytes object put with "syncobj"
+        is returned as a read-only memoryview.  If it was put by the
+        current interpreter (e.g. from another thread) then the view
+        is of the original object, rather than a copy, which makes
+        receiving large bytes objects O(1).  Likewise pickled objects
+        are unpickled directly from the sender's data.  The original
+        object is kept alive until the memoryview is released.  Bytes
+        from other interpreters are always copied, since the view could
+        otherwise outlive the interpreter that owns the original.
         """
-        if timeout is not None:
-            timeout = int(timeout)
-            if timeout < 0:
-                raise ValueError(f'timeout value must be non-negative')
-            end = time.time() + timeout
-        while True:
-            try:
-                obj, fmt, unboundop = _queues.get(self._id)
-            except QueueEmpty as exc:
-                if timeout is not None and time.time() >= end:
-                    raise  # re-raise
-                time.sleep(_delay)
-            else:
-                break
+        if timeout is not None and timeout < 0:
+            raise ValueError(f'timeout value must be non-negative')
+        obj, fmt, unboundop = _queues.get(self._id,
+                                          blocking=True, timeout=timeout,
+                                          view=view)
         if unboundop is not None:
             assert obj is None, repr(obj)
             return _resolve_unbound(unboundop)
-        if fmt == _PICKLED:
-            obj = pickle.loads(obj)
-        else:
-            assert fmt == _SHARED_ONLY
+        if fmt != _SHARED_ONLY:
+            obj = _loads(obj, fmt)
         return obj
 
-    def get_nowait(self):
+    async def aget(self, timeout=None, *, view=False):
+        """Return the next object from the queue, without blocking
+        the event loop.
+
+        This is the same as get(), except it waits asynchronously
+        while the queue is empty.
+        """
+        import asyncio
+        if timeout is not None and timeout < 0:
+            raise ValueError(f'timeout value must be non-negative')
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            try:
+                return self.get_nowait(view=view)
+            except QueueEmpty:
+                try:
+                    changed = await self._wait_for_change(deadline)
+                except NotImplementedError:
+                    break
+                if not changed:
+                    raise  # re-raise
+        # The event loop can't watch the queue, so we use a thread.
+        if deadline is not None:
+            timeout = max(0, deadline - loop.time())
+        get = functools.partial(self.get, timeout, view=view)
+        return await loop.run_in_executor(None, get)
+
+    def __aiter__(self):
+        return self._aiter()
+
+    async def _aiter(self):
+        # Iteration stops once the queue is destroyed.
+        while True:
+            try:
+                obj = await self.aget()
+            except QueueNotFoundError:
+                return
+            yield obj
+
+    def get_nowait(self, *, view=False):
         """Return the next object from the channel.
 
         If the queue is empty then raise QueueEmpty.  Otherwise this
         is the same as get().
         """
         try:
-            obj, fmt, unboundop = _queues.get(self._id)
+            obj, fmt, unboundop = _queues.get(self._id, view=view)
         except QueueEmpty as exc:
             raise  # re-raise
         if unboundop is not None:
             assert obj is None, repr(obj)
             return _resolve_unbound(unboundop)
-        if fmt == _PICKLED:
-            obj = pickle.loads(obj)
-        else:
-            assert fmt == _SHARED_ONLY
+        if fmt != _SHARED_ONLY:
+            obj = _loads(obj, fmt)
         return obj
 
+    def get_many(self, max_items, timeout=None, *, view=False):
+        """Return a list of up to max_items objects from the queue.
+
+        The objects are removed from the queue in batches, rather than
+        one at a time, which is much more efficient than calling get()
+        for each.  This blocks until there are max_items objects or
+        "timeout" (in seconds) expires, in which case the objects
+        received so far are returned.  If there are none then
+        QueueEmpty is raised.
+
+        Unbound items and "view" are handled the same as for get().
+        """
+        if timeout is not None and timeout < 0:
+            raise ValueError(f'timeout value must be non-negative')
+        items = _queues.get_many(self._id, max_items,
+                                 blocking=True, timeout=timeout, view=view)
+        objs = []
+        for obj, fmt, unboundop in items:
+            if unboundop is not None:
+                assert obj is None, repr(obj)
+                obj = _resolve_unbound(unboundop)
+            elif fmt != _SHARED_ONLY:
+                obj = _loads(obj, fmt)
+            objs.append(obj)
+        return objs
+
 
 _queues._register_heap_types(Queue, QueueEmpty, QueueFull)
@@ -1,6 +1,7 @@
 """Cross-interpreter Channels High Level Module."""
 
-import time
+import functools
+
 try:
     import _interpchannels as _channels
 except ModuleNotFoundError:
@@ -13,7 +14,8 @@ from . import _crossinterp
 # aliases:
 from _interpchannels import (
     ChannelError, ChannelNotFoundError, ChannelClosedError,
-    ChannelEmptyError, ChannelNotEmptyError,
+    ChannelEmptyError, ChannelNotEmptyError, ChannelFullError,
+    BufferPool, PooledBuffer,
 )
 from ._crossinterp import (
     UNBOUND_ERROR, UNBOUND_REMOVE,
@@ -22,9 +24,11 @@ from ._crossinterp import (
 
 __all__ = [
     'UNBOUND', 'UNBOUND_ERROR', 'UNBOUND_REMOVE',
-    'create', 'list_all',
+    'create', 'list_all', 'select', 'stats',
     'SendChannel', 'RecvChannel',
+    'BufferPool', 'PooledBuffer',
     'ChannelError', 'ChannelNotFoundError', 'ChannelEmptyError',
+    'ChannelFullError',
     'ItemInterpreterDestroyed',
 ]
 
@@ -50,7 +54,7 @@ def _resolve_unbound(flag):
     return resolved
 
 
-def create(*, unbounditems=UNBOUND):
+def create(*, unbounditems=UNBOUND, maxsize=0):
     """Return (recv, send) for a new cross-interpreter channel.
 
     The channel may be used to pass data safely between interpreters.
@@ -58,10 +62,15 @@ def create(*, unbounditems=UNBOUND):
     "unbounditems" sets the default for the send end of the channel.
     See SendChannel.send() for supported values.  The default value
     is UNBOUND, which replaces the unbound item when received.
+
+    "maxsize" is the upper limit on how many objects may be in
+    the channel at once.  If it is zero or negative then the channel
+    is unbounded.  Otherwise sending to a full channel blocks until
+    an object is received.
     """
     unbound = _serialize_unbound(unbounditems)
     unboundop, = unbound
-    cid = _channels.create(unboundop)
+    cid = _channels.create(unboundop, maxsize)
     recv, send = RecvChannel(cid), SendChannel(cid, _unbound=unbound)
     return recv, send
 
@@ -72,6 +81,66 @@ def list_all():
             for cid, unbound in _channels.list_all()]
 
 
+def stats():
+    """Return a dict mapping the ID of each open channel to its info.
+
+    Each ChannelInfo includes the channel's statistics, like how many
+    objects have been sent and received, how many senders are waiting
+    and how long the oldest queued object has been waiting.  The
+    channels are not all captured at exactly the same time.
+    """
+    infos = {}
+    for cid, _ in _channels.list_all():
+        try:
+            infos[int(cid)] = _channels.get_info(cid)
+        except ChannelNotFoundError:
+            # It was destroyed in the meantime.
+            pass
+    return infos
+
+
+def select(recv=(), send=(), timeout=None):
+    """Wait until one of the given channel operations can proceed.
+
+    "recv" is a sequence of RecvChannel and "send" is a sequence
+    of (SendChannel, obj) pairs.  The first operation that can proceed
+    is done and (channel, obj) is returned.  For a send, the object is
+    queued up without waiting for it to be received (the same as with
+    send_nowait()) and None is returned in place of the object.
+
+    A send is ready when the channel isn't full, so sending to
+    an unbounded channel is always ready.  If several operations are
+    ready then the first one (receives before sends) is picked.
+
+    If the timeout (in seconds) expires first then None is returned,
+    much like queues.select() returns an empty list.  A timeout of 0
+    means to check only once, without blocking.
+    """
+    recv = list(recv)
+    send = list(send)
+    cids = []
+    for chan in recv:
+        if not isinstance(chan, RecvChannel):
+            raise TypeError(f'expected a RecvChannel, got {chan!r}')
+        cids.append(chan._id)
+    sendargs = []
+    for chan, obj in send:
+        if not isinstance(chan, SendChannel):
+            raise TypeError(f'expected a SendChannel, got {chan!r}')
+        unboundop, = chan._unbound
+        sendargs.append((chan._id, obj, unboundop))
+    res = _channels.select(cids, sendargs, timeout=timeout)
+    if res is None:
+        return None
+    index, obj, unboundop = res
+    if index >= len(recv):
+        return send[index - len(recv)][0], None
+    if unboundop is not None:
+        assert obj is None, repr(obj)
+        obj = _resolve_unbound(unboundop)
+    return recv[index], obj
+
+
 class _ChannelEnd:
     """The base class for RecvChannel and SendChannel."""
 
@@ -88,6 +157,14 @@ class _ChannelEnd:
         self._id = cid
         return self
 
+    def __del__(self):
+        try:
+            watcher = self._watcher
+        except AttributeError:
+            pass
+        else:
+            watcher.close()
+
     def __repr__(self):
         return f'{type(self).__name__}(id={int(self._id)})'
 
@@ -122,6 +199,22 @@ class _ChannelEnd:
     def is_closed(self):
         return self._info.closed
 
+    def _get_watcher(self):
+        try:
+            return self._watcher
+        except AttributeError:
+            self._watcher = _crossinterp.Watcher(
+                    self._id, _channels.watch, _channels.unwatch,
+                    ChannelNotFoundError, 'channel')
+            return self._watcher
+
+    async def _wait_for_change(self, deadline):
+        """Wait for the channel to change, until the deadline (if any).
+
+        Return False if the deadline has passed.
+        """
+        return await self._get_watcher().wait_until(deadline)
+
 
 _NOT_SET = object()
 
@@ -131,31 +224,58 @@ class RecvChannel(_ChannelEnd):
 
     _end = 'recv'
 
-    def recv(self, timeout=None, *,
-             _sentinel=object(),
-             _delay=10 / 1000,  # 10 milliseconds
-             ):
+    def recv(self, timeout=None):
         """Return the next object from the channel.
 
         This blocks until an object has been sent, if none have been
         sent already.
         """
-        if timeout is not None:
-            timeout = int(timeout)
-            if timeout < 0:
-                raise ValueError(f'timeout value must be non-negative')
-            end = time.time() + timeout
-        obj, unboundop = _channels.recv(self._id, _sentinel)
-        while obj is _sentinel:
-            time.sleep(_delay)
-            if timeout is not None and time.time() >= end:
-                raise TimeoutError
-            obj, unboundop = _channels.recv(self._id, _sentinel)
+        obj, unboundop = _channels.recv(self._id, timeout=timeout,
+                                        blocking=True)
         if unboundop is not None:
             assert obj is None, repr(obj)
             return _resolve_unbound(unboundop)
         return obj
 
+    async def arecv(self, timeout=None):
+        """Return the next object from the channel, without blocking
+        the event loop.
+
+        This is the same as recv(), except it waits asynchronously
+        until an object has been sent.
+        """
+        import asyncio
+        if timeout is not None and timeout < 0:
+            raise ValueError(f'timeout value must be non-negative')
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            try:
+                return self.recv_nowait()
+            except ChannelEmptyError:
+                try:
+                    changed = await self._wait_for_change(deadline)
+                except NotImplementedError:
+                    break
+                if not changed:
+                    raise TimeoutError('timed out')
+        # The event loop can't watch the channel, so we use a thread.
+        if deadline is not None:
+            timeout = max(0, deadline - loop.time())
+        return await loop.run_in_executor(None, self.recv, timeout)
+
+    def __aiter__(self):
+        return self._aiter()
+
+    async def _aiter(self):
+        # Iteration stops once the channel is closed (or destroyed).
+        while True:
+            try:
+                obj = await self.arecv()
+            except (ChannelClosedError, ChannelNotFoundError):
+                return
+            yield obj
+
     def recv_nowait(self, default=_NOT_SET):
         """Return the next object from the channel.
 
@@ -172,6 +292,29 @@ class RecvChannel(_ChannelEnd):
             return _resolve_unbound(unboundop)
         return obj
 
+    def recv_many(self, max_items, timeout=None):
+        """Return a list of up to max_items objects from the channel.
+
+        The objects are received in batches, rather than one at a time,
+        which is much more efficient than calling recv() for each.
+        This blocks until there are max_items objects or "timeout"
+        (in seconds) expires, in which case the objects received so far
+        are returned.  If there are none then TimeoutError is raised.
+
+        Unbound items are handled the same as for recv().
+        """
+        if timeout is not None and timeout < 0:
+            raise ValueError(f'timeout value must be non-negative')
+        items = _channels.recv_many(self._id, max_items,
+                                    blocking=True, timeout=timeout)
+        objs = []
+        for obj, unboundop in items:
+            if unboundop is not None:
+                assert obj is None, repr(obj)
+                obj = _resolve_unbound(unboundop)
+            objs.append(obj)
+        return objs
+
     def close(self):
         _channels.close(self._id, recv=True)
 
@@ -202,7 +345,8 @@ class SendChannel(_ChannelEnd):
              ):
         """Send the object (i.e. its data) to the channel's receiving end.
 
-        This blocks until the object is received.
+        This blocks until the object is received.  If the channel
+        is full then it first blocks until there is space.
         """
         if unbound is None:
             unboundop, = self._unbound
@@ -210,13 +354,41 @@ class SendChannel(_ChannelEnd):
             unboundop, = _serialize_unbound(unbound)
         _channels.send(self._id, obj, unboundop, timeout=timeout, blocking=True)
 
+    def send_many(self, objs, timeout=None, *,
+                  unbound=None,
+                  ):
+        """Send each of the objects to the channel's receiving end,
+        in order.
+
+        The objects are added in batches, rather than one at a time,
+        which is much more efficient than calling send() for each.
+        If the channel doesn't have enough space then this blocks until
+        there is.  Unlike send(), this does not wait for the objects
+        to be received.
+
+        Return the number of objects sent.  That is less than all of
+        them only if the channel filled up and "timeout" (in seconds)
+        expired.  If none could be sent then TimeoutError is raised.
+
+        "unbound" applies to every object, as for send().
+        """
+        if unbound is None:
+            unboundop, = self._unbound
+        else:
+            unboundop, = _serialize_unbound(unbound)
+        if timeout is not None and timeout < 0:
+            raise ValueError(f'timeout value must be non-negative')
+        return _channels.send_many(self._id, objs, unboundop,
+                                   blocking=True, timeout=timeout)
+
     def send_nowait(self, obj, *,
                     unbound=None,
                     ):
         """Send the object to the channel's receiving end.
 
         If the object is immediately received then return True
-        (else False).  Otherwise this is the same as send().
+        (else False).  If the channel is full then fail with
+        ChannelFullError.  Otherwise this is the same as send().
         """
         if unbound is None:
             unboundop, = self._unbound
@@ -227,12 +399,82 @@ class SendChannel(_ChannelEnd):
         # See bpo-32604 and gh-19829.
         return _channels.send(self._id, obj, unboundop, blocking=False)
 
+    async def asend(self, obj, timeout=None, *,
+                    unbound=None,
+                    ):
+        """Send the object to the channel's receiving end, without
+        blocking the event loop.
+
+        This is the same as send(), except it waits asynchronously
+        for space and then for the object to be received.  If the
+        coroutine is cancelled before then, the object is taken back
+        out of the channel.
+        """
+        if unbound is None:
+            unboundop, = self._unbound
+        else:
+            unboundop, = _serialize_unbound(unbound)
+        await self._asend(_channels.send, obj, unboundop, timeout)
+
+    async def _asend(self, send, obj, unboundop, timeout):
+        import asyncio
+        if timeout is not None and timeout < 0:
+            raise ValueError(f'timeout value must be non-negative')
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        pending = None
+        timed_out = False
+        try:
+            try:
+                fd = self._get_watcher().fd
+                while pending is None:
+                    try:
+                        pending = send(self._id, obj, unboundop,
+                                       blocking=False, fd=fd)
+                    except ChannelFullError:
+                        if not await self._wait_for_change(deadline):
+                            raise TimeoutError('timed out')
+                while not pending.done:
+                    if not await self._wait_for_change(deadline):
+                        timed_out = True
+                        break
+            finally:
+                if pending is not None:
+                    # This is a no-op if it was received already.
+                    pending.cancel()
+        except NotImplementedError:
+            if pending is not None:
+                try:
+                    pending.result()
+                    return
+                except ChannelClosedError:
+                    pass
+            # The event loop can't watch the channel, so we use a thread.
+            if deadline is not None:
+                timeout = max(0, deadline - loop.time())
+            send = functools.partial(send, self._id, obj, unboundop,
+                                     blocking=True, timeout=timeout)
+            await loop.run_in_executor(None, send)
+            return
+        try:
+            pending.result()
+        except ChannelClosedError:
+            if timed_out:
+                raise TimeoutError('timed out')
+            raise  # re-raise
+
     def send_buffer(self, obj, timeout=None, *,
                     unbound=None,
                     ):
         """Send the object's buffer to the channel's receiving end.
 
-        This blocks until the object is received.
+        This blocks until the object is received.  If the channel
+        is full then it first blocks until there is space.
+
+        A PooledBuffer (see BufferPool.acquire()) is handed off to the
+        receiver as-is, instead of being wrapped in a memoryview.  It
+        goes back to its pool as soon as the receiver drops it.  If the
+        send fails (e.g. it times out) then the buffer stays usable.
         """
         if unbound is None:
             unboundop, = self._unbound
@@ -247,7 +489,8 @@ class SendChannel(_ChannelEnd):
         """Send the object's buffer to the channel's receiving end.
 
         If the object is immediately received then return True
-        (else False).  Otherwise this is the same as send().
+        (else False).  If the channel is full then fail with
+        ChannelFullError.  Otherwise this is the same as send().
         """
         if unbound is None:
             unboundop, = self._unbound
@@ -255,6 +498,21 @@ class SendChannel(_ChannelEnd):
             unboundop, = _serialize_unbound(unbound)
         return _channels.send_buffer(self._id, obj, unboundop, blocking=False)
 
+    async def asend_buffer(self, obj, timeout=None, *,
+                           unbound=None,
+                           ):
+        """Send the object's buffer to the channel's receiving end,
+        without blocking the event loop.
+
+        This is the same as send_buffer(), except it waits
+        asynchronously, like asend().
+        """
+        if unbound is None:
+            unboundop, = self._unbound
+        else:
+            unboundop, = _serialize_unbound(unbound)
+        await self._asend(_channels.send_buffer, obj, unboundop, timeout)
+
     def close(self):
         _channels.close(self._id, send=True)
 